@@ -0,0 +1,24 @@
+"""
+Gunicorn settings of the production serving mode (SERVER_MODE=production, see serve.sh).
+Every value can be overridden from the environment.
+"""
+
+import multiprocessing
+import os
+
+# 2 × ядра + 1, як радить gunicorn: поки одні воркери чекають на базу, інші зайняті процесором
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+# Django імпортується до fork, тож воркери ділять його пам'ять (copy-on-write) і стартують швидше.
+# З базою Django з'єднується лише на першому запиті, тож з'єднання не успадковуються
+preload_app = True
+
+# Воркер перезапускається після стількох запитів, а розкид не дає всім перезапуститись разом
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+accesslog = "-"
@@ -6,6 +6,8 @@ from celery import Celery
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "habit_tracker.settings")
 
+# Воркер закриває з'єднання з базою до і після кожної задачі лише тоді, коли воно зіпсоване або
+# старше за CONN_MAX_AGE, тож задачі одного процесу користуються тим самим з'єднанням
 app = Celery("habit_tracker")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
@@ -14,6 +14,7 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -91,9 +92,38 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST", "localhost"),
         "PORT": os.getenv("POSTGRES_PORT"),
+        # Кожен процес веб-сервера чи воркера Celery тримає з'єднання DB_CONN_MAX_AGE секунд
+        # замість нового на кожен запит і задачу; 0 закриває його щоразу
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        # Повторно використане з'єднання перевіряється на початку запиту, тож перезапуск Postgres його не ламає
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True",
     }
 }
 
+# Lets benchmarks and local experiments run without a Postgres server
+if os.getenv("DB_ENGINE") == "sqlite":
+    DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": BASE_DIR / "db.sqlite3"}}
+
+# Cache
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_CACHE_URL", "redis://redis:6379/1"),
+    }
+}
+
+HABITS_CACHE_TIMEOUT = int(os.getenv("HABITS_CACHE_TIMEOUT", 300))
+
+# Real-time events
+
+HABIT_EVENTS = {
+    "BACKEND": "habits.events.RedisEventBroker",
+    "LOCATION": os.getenv("REDIS_EVENTS_URL", "redis://redis:6379/2"),
+}
+HABIT_EVENTS_KEEPALIVE_SECONDS = int(os.getenv("HABIT_EVENTS_KEEPALIVE_SECONDS", 15))
+HABIT_EVENTS_STREAM_SECONDS = int(os.getenv("HABIT_EVENTS_STREAM_SECONDS", 300))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -127,6 +157,13 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = "static/"
+# collectstatic збирає файли сюди, а nginx роздає їх зі спільного тому
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# Generated files, e.g. habit exports. They are served only through authenticated API views.
+
+MEDIA_URL = "media/"
+MEDIA_ROOT = BASE_DIR / "media"
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -137,19 +174,67 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.StatelessJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "DEFAULT_PAGINATION_CLASS": "habits.pagination.KeysetPagination",
+    "PAGE_SIZE": 50,
 }
 
+HABIT_RECORDS_BULK_MAX_ITEMS = int(os.getenv("HABIT_RECORDS_BULK_MAX_ITEMS", 5000))
+HABIT_EXPORT_CHUNK_SIZE = int(os.getenv("HABIT_EXPORT_CHUNK_SIZE", 2000))
+HABIT_IMPORT_BATCH_SIZE = int(os.getenv("HABIT_IMPORT_BATCH_SIZE", 5000))
+# Uploads up to this size are imported within the request, larger ones by a Celery task
+HABIT_IMPORT_INLINE_MAX_BYTES = int(os.getenv("HABIT_IMPORT_INLINE_MAX_BYTES", 1024 * 1024))
+
 # Celery
 
 CELERY_BROKER_URL = "redis://redis:6379/0"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
+CELERY_BEAT_SCHEDULE = {
+    "dispatch-habit-reminders": {
+        "task": "habits.tasks.dispatch_habit_reminders",
+        "schedule": crontab(),
+    },
+    "update-habit-rollups": {
+        "task": "habits.tasks.update_habit_rollups",
+        "schedule": crontab(minute="*/5"),
+    },
+    "maintain-habit-record-partitions": {
+        "task": "habits.tasks.maintain_habit_record_partitions",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "archive-habit-records": {
+        "task": "habits.tasks.archive_habit_records",
+        "schedule": crontab(hour=3, minute=30),
+    },
+}
+
+# Habit reminders
+
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", 500))
+REMINDER_MAX_LAG_MINUTES = int(os.getenv("REMINDER_MAX_LAG_MINUTES", 15))
+REMINDER_EMAIL_CHUNK_SIZE = int(os.getenv("REMINDER_EMAIL_CHUNK_SIZE", 100))
+
+# Analytics rollups
+
+ROLLUP_BATCH_SIZE = int(os.getenv("ROLLUP_BATCH_SIZE", 1000))
+ROLLUP_SAFETY_LAG_SECONDS = int(os.getenv("ROLLUP_SAFETY_LAG_SECONDS", 60))
+
+# Habit record partitions (Postgres)
+
+HABIT_RECORD_PARTITIONS_AHEAD = int(os.getenv("HABIT_RECORD_PARTITIONS_AHEAD", 3))
+# 0 — старі розділи не від'єднуються; розділи новіші за горизонт архіву не від'єднуються ніколи
+HABIT_RECORD_RETENTION_MONTHS = int(os.getenv("HABIT_RECORD_RETENTION_MONTHS", 0))
+
+# Habit record archive
+
+HABIT_RECORD_ARCHIVE_AFTER_DAYS = int(os.getenv("HABIT_RECORD_ARCHIVE_AFTER_DAYS", 365))
+HABIT_RECORD_ARCHIVE_BATCH_SIZE = int(os.getenv("HABIT_RECORD_ARCHIVE_BATCH_SIZE", 100))
 
 # Sending emails
 
@@ -174,8 +259,12 @@ SIMPLE_JWT = {
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.UserTokenObtainPairSerializer",
 }
 
+# How long the full User row behind a stateless token stays cached
+USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT", 60))
+
 # Logging
 
 LOGGING = {
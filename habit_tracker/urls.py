@@ -24,5 +24,6 @@ urlpatterns = [
     path("api/auth/", include("users.urls")),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("api/async/", include("habits.async_urls")),
     path("api/", include("habits.urls")),
 ]
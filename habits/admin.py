@@ -1,6 +1,19 @@
 from django.contrib import admin
 
-from .models import Habit, HabitRecord, HabitSchedule
+from .cache import bump_user_version
+from .models import (
+    ExportJob,
+    Habit,
+    HabitDailyRollup,
+    HabitRecord,
+    HabitRecordArchive,
+    HabitSchedule,
+    HabitStats,
+    ImportJob,
+)
+from .records import delete_habit_record, record_moved
+from .schedule_sync import delete_habit_schedule, sync_schedule_days
+from .stats import rebuild_habit_stats
 
 
 class HabitScheduleInline(admin.TabularInline):
@@ -24,6 +37,18 @@ class HabitAdmin(admin.ModelAdmin):
 
     list_per_page = 30
 
+    def save_formset(self, request, form, formset, change):
+        # Записи й розклад не мають сигналів видалення, тому видаляємо їх через функції синхронізації
+        instances = formset.save(commit=False)
+        for obj in formset.deleted_objects:
+            if isinstance(obj, HabitRecord):
+                delete_habit_record(obj)
+            else:
+                delete_habit_schedule(obj)
+        for instance in instances:
+            instance.save()
+        formset.save_m2m()
+
 
 @admin.register(HabitSchedule)
 class HabitScheduleAdmin(admin.ModelAdmin):
@@ -31,6 +56,16 @@ class HabitScheduleAdmin(admin.ModelAdmin):
     list_filter = ("day_of_week",)
     search_fields = ("habit__name",)
 
+    def delete_model(self, request, obj):
+        delete_habit_schedule(obj)
+
+    def delete_queryset(self, request, queryset):
+        habits = list(queryset.values_list("habit_id", "habit__user_id").distinct())
+        super().delete_queryset(request, queryset)
+        for habit_id, user_id in habits:
+            sync_schedule_days(habit_id)
+            bump_user_version(user_id)
+
 
 @admin.register(HabitRecord)
 class HabitRecordAdmin(admin.ModelAdmin):
@@ -38,3 +73,60 @@ class HabitRecordAdmin(admin.ModelAdmin):
     list_filter = ("completed", "date")
     search_fields = ("habit__name",)
     date_hierarchy = "date"
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            record_moved(obj, form.initial["date"])
+
+    def delete_model(self, request, obj):
+        delete_habit_record(obj)
+
+    def delete_queryset(self, request, queryset):
+        records = list(queryset.values_list("habit_id", "habit__user_id", "date", "completed"))
+        super().delete_queryset(request, queryset)
+        for habit_id in {habit_id for habit_id, _, _, completed in records if completed}:
+            rebuild_habit_stats(habit_id)
+        for habit_id, _, day, _ in records:
+            HabitDailyRollup.objects.filter(habit_id=habit_id, date=day).delete()
+        for user_id in {user_id for _, user_id, _, _ in records}:
+            bump_user_version(user_id)
+
+
+@admin.register(HabitStats)
+class HabitStatsAdmin(admin.ModelAdmin):
+    list_display = ("habit", "current_streak", "longest_streak", "completed_count", "last_completed_date")
+    search_fields = ("habit__name",)
+    readonly_fields = ("updated_at",)
+
+
+@admin.register(HabitDailyRollup)
+class HabitDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ("habit", "user", "date", "record_count", "completed_count", "scheduled_completed_count")
+    list_filter = ("date",)
+    search_fields = ("habit__name", "user__username")
+    date_hierarchy = "date"
+
+
+@admin.register(HabitRecordArchive)
+class HabitRecordArchiveAdmin(admin.ModelAdmin):
+    list_display = ("habit", "year", "updated_at")
+    list_filter = ("year",)
+    search_fields = ("habit__name",)
+    readonly_fields = ("recorded", "completed", "updated_at")
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("user", "file_format", "status", "created_at", "finished_at")
+    list_filter = ("status", "file_format")
+    search_fields = ("user__username",)
+    readonly_fields = ("created_at", "finished_at")
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ("user", "file_format", "status", "processed_rows", "failed_rows", "created_at", "finished_at")
+    list_filter = ("status", "file_format")
+    search_fields = ("user__username",)
+    readonly_fields = ("created_at", "finished_at")
@@ -0,0 +1,290 @@
+"""
+Aggregation of habit records for HabitAnalyticsView.
+
+Per-bucket counters are computed by the database in one grouped query over HabitRecord
+(plus one over HabitDailyRollup when the rollup covers the range). The number of planned
+days per bucket does not depend on any stored rows, so it is derived from the habits'
+weekly schedules with calendar arithmetic instead of being read from the table.
+"""
+
+from datetime import date, timedelta
+
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import ExtractIsoWeekDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import HabitSchedule
+from .schedules import scheduled_days_between
+
+GRANULARITIES = ("day", "week", "month", "weekday")
+METRICS = ("completed_count", "record_count", "missed_count", "scheduled_count", "completion_rate")
+DEFAULT_METRICS = ("completed_count",)
+SCHEDULE_METRICS = {"scheduled_count", "completion_rate"}
+
+
+def bucket_expression(granularity):
+    return {
+        "day": F("date"),
+        "week": TruncWeek("date"),
+        "month": TruncMonth("date"),
+        "weekday": ExtractIsoWeekDay("date") - 1,
+    }[granularity]
+
+
+def bucket_key(granularity):
+    return "day_of_week" if granularity == "weekday" else "date"
+
+
+def bucket_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "weekday":
+        return day.weekday()
+    return day
+
+
+def next_bucket(start, granularity):
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def planned_on_record_day():
+    """True for records that fall on a day the habit is planned for (any day if it has no schedule)."""
+    schedule = HabitSchedule.objects.filter(habit=OuterRef("habit"))
+    return Exists(schedule.filter(day_of_week=ExtractIsoWeekDay(OuterRef("date")) - 1)) | ~Exists(schedule)
+
+
+def aggregate_records(records, granularity, metrics):
+    """Runs the single grouped query and returns {bucket: {counter: value}}."""
+    return {row.pop("bucket"): row for row in record_counters(records, granularity, metrics)}
+
+
+def record_counters(records, granularity, metrics):
+    """The grouped HabitRecord query behind aggregate_records, one row per bucket."""
+    aggregates = {}
+    if "completed_count" in metrics:
+        aggregates["completed_count"] = Count("id", filter=Q(completed=True))
+    if "record_count" in metrics:
+        aggregates["record_count"] = Count("id")
+    if "missed_count" in metrics:
+        aggregates["missed_count"] = Count("id", filter=Q(completed=False))
+    if "completion_rate" in metrics:
+        aggregates["planned_completed_count"] = Count("id", filter=Q(completed=True) & planned_on_record_day())
+
+    if set(metrics) == {"completed_count"}:
+        records = records.filter(completed=True)
+
+    rows = records.annotate(bucket=bucket_expression(granularity)).values("bucket").annotate(**aggregates)
+    return rows.order_by("bucket")
+
+
+def aggregate_rollups(rollups, granularity, metrics):
+    """The same counters as aggregate_records, summed from HabitDailyRollup rows."""
+    return {row.pop("bucket"): row for row in rollup_counters(rollups, granularity, metrics)}
+
+
+def rollup_counters(rollups, granularity, metrics):
+    """The grouped HabitDailyRollup query behind aggregate_rollups, one row per bucket."""
+    aggregates = {}
+    if "completed_count" in metrics:
+        aggregates["completed_count"] = Sum("completed_count")
+    if "record_count" in metrics:
+        aggregates["record_count"] = Sum("record_count")
+    if "missed_count" in metrics:
+        aggregates["missed_count"] = Sum(F("record_count") - F("completed_count"))
+    if "completion_rate" in metrics:
+        aggregates["planned_completed_count"] = Sum("scheduled_completed_count")
+
+    if set(metrics) == {"completed_count"}:
+        rollups = rollups.filter(completed_count__gt=0)
+
+    # Агрегати отримують тимчасові імена, бо імена лічильників збігаються з полями моделі
+    return (
+        rollups.annotate(bucket=bucket_expression(granularity))
+        .values("bucket")
+        .annotate(**{f"total_{name}": aggregate for name, aggregate in aggregates.items()})
+        .annotate(**{name: F(f"total_{name}") for name in aggregates})
+        .values("bucket", *aggregates)
+        .order_by("bucket")
+    )
+
+
+def count_records(records, masks, granularity, metrics):
+    """
+    The counters of aggregate_records for records held in memory, such as the archived ones
+    (see habits.archive). `masks` maps habit ids to their weekday masks.
+    """
+    counted = set(metrics) - SCHEDULE_METRICS
+    if "completion_rate" in metrics:
+        counted.add("planned_completed_count")
+
+    counters = {}
+    for record in records:
+        if counted == {"completed_count"} and not record.completed:
+            continue
+        mask = masks.get(record.habit_id, 0)
+        counts = {
+            "completed_count": record.completed,
+            "record_count": True,
+            "missed_count": not record.completed,
+            "planned_completed_count": record.completed and (not mask or mask >> record.date.weekday() & 1),
+        }
+        values = counters.setdefault(bucket_start(record.date, granularity), {})
+        for name in counted:
+            values[name] = values.get(name, 0) + int(counts[name])
+    return counters
+
+
+def schedule_masks(schedule_rows):
+    masks = {}
+    for habit_id, day_of_week in schedule_rows:
+        masks[habit_id] = masks.get(habit_id, 0) | 1 << day_of_week
+    return masks
+
+
+def merge_counters(*sources):
+    merged = {}
+    for source in sources:
+        for bucket, values in source.items():
+            target = merged.setdefault(bucket, {})
+            for name, value in values.items():
+                target[name] = target.get(name, 0) + value
+    return merged
+
+
+def scheduled_counts(habits, start, end, granularity):
+    """
+    Counts planned days per bucket within [start, end], summed over the given habits.
+    `habits` is an iterable of (start_date, weekday_mask) pairs.
+    """
+    counts = {}
+    for habit_start, mask in habits:
+        first = max(start, habit_start)
+        if first > end:
+            continue
+
+        if granularity == "weekday":
+            for day_of_week in range(7):
+                if not mask or mask >> day_of_week & 1:
+                    planned = scheduled_days_between(first, end, 1 << day_of_week)
+                    counts[day_of_week] = counts.get(day_of_week, 0) + planned
+            continue
+
+        bucket = bucket_start(first, granularity)
+        while bucket <= end:
+            following = next_bucket(bucket, granularity)
+            planned = scheduled_days_between(max(bucket, first), min(following - timedelta(days=1), end), mask)
+            counts[bucket] = counts.get(bucket, 0) + planned
+            bucket = following
+
+    return {bucket: count for bucket, count in counts.items() if count}
+
+
+def planned_counts(habit_rows, schedule_rows, start_date, end_date, granularity):
+    """
+    Planned days per bucket for (habit_id, start_date) rows and the (habit_id, day_of_week)
+    rows of their schedules, between start_date (the earliest habit start by default) and
+    end_date (today by default).
+    """
+    masks = schedule_masks(schedule_rows)
+    start = start_date or min((habit_start for _, habit_start in habit_rows), default=date.max)
+    end = end_date or timezone.localdate()
+    return scheduled_counts(
+        ((habit_start, masks.get(habit_id, 0)) for habit_id, habit_start in habit_rows), start, end, granularity
+    )
+
+
+def analytics_rows(counters, planned, granularity, metrics):
+    """Turns per-bucket counters and planned days into the rows the analytics endpoints return."""
+    key = bucket_key(granularity)
+    result = []
+    for bucket in sorted(counters.keys() | planned.keys()):
+        row = {key: bucket}
+        values = counters.get(bucket, {})
+        for metric in metrics:
+            if metric == "scheduled_count":
+                row[metric] = planned.get(bucket, 0)
+            elif metric == "completion_rate":
+                scheduled = planned.get(bucket, 0)
+                completed = values.get("planned_completed_count", 0)
+                row[metric] = round(min(completed / scheduled, 1), 4) if scheduled else None
+            else:
+                row[metric] = values.get(metric, 0)
+        result.append(row)
+
+    return result
+
+
+def habit_analytics(
+    records,
+    habits,
+    granularity="day",
+    metrics=DEFAULT_METRICS,
+    start_date=None,
+    end_date=None,
+    rollups=None,
+    archived=None,
+):
+    """
+    Builds analytics rows for the given records and habits.
+
+    `records` is a HabitRecord queryset already limited to the user and the requested range,
+    `habits` a queryset of the same habits, needed only for schedule based metrics. When
+    `rollups` (HabitDailyRollup rows for the same range) is given, `records` only has to hold
+    the records the rollup does not cover yet. `archived` holds the archived records of the
+    range (see habits.archive), which the rollup already covers.
+    """
+    counters = aggregate_records(records, granularity, metrics)
+    if rollups is not None:
+        counters = merge_counters(aggregate_rollups(rollups, granularity, metrics), counters)
+    planned = {}
+    schedule_rows = []
+
+    if SCHEDULE_METRICS & set(metrics):
+        habit_rows = list(habits.values_list("id", "start_date"))
+        schedule_rows = list(HabitSchedule.objects.filter(habit__in=habits).values_list("habit_id", "day_of_week"))
+        planned = planned_counts(habit_rows, schedule_rows, start_date, end_date, granularity)
+
+    if archived:
+        counters = merge_counters(
+            counters, count_records(archived, schedule_masks(schedule_rows), granularity, metrics)
+        )
+
+    return analytics_rows(counters, planned, granularity, metrics)
+
+
+async def ahabit_analytics(
+    records,
+    habits,
+    granularity="day",
+    metrics=DEFAULT_METRICS,
+    start_date=None,
+    end_date=None,
+    rollups=None,
+    archived=None,
+):
+    """habit_analytics for async views: the same queries, read with async iteration."""
+    counters = {row.pop("bucket"): row async for row in record_counters(records, granularity, metrics)}
+    if rollups is not None:
+        summed = {row.pop("bucket"): row async for row in rollup_counters(rollups, granularity, metrics)}
+        counters = merge_counters(summed, counters)
+    planned = {}
+    schedule_rows = []
+
+    if SCHEDULE_METRICS & set(metrics):
+        habit_rows = [row async for row in habits.values_list("id", "start_date")]
+        schedules = HabitSchedule.objects.filter(habit__in=habits).values_list("habit_id", "day_of_week")
+        schedule_rows = [row async for row in schedules]
+        planned = planned_counts(habit_rows, schedule_rows, start_date, end_date, granularity)
+
+    if archived:
+        counters = merge_counters(
+            counters, count_records(archived, schedule_masks(schedule_rows), granularity, metrics)
+        )
+
+    return analytics_rows(counters, planned, granularity, metrics)
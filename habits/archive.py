@@ -0,0 +1,202 @@
+"""
+Cold storage of old habit records.
+
+archive_records moves the records older than HABIT_RECORD_ARCHIVE_AFTER_DAYS into
+HabitRecordArchive, one row per habit and year holding bitmaps of the recorded and the
+completed days, so the hot table and its indexes only keep recent history. Reads whose range
+reaches past the horizon (the records list, analytics, the calendar, exports, stats rebuilds)
+merge the decoded archive days with the hot records. A hot record written later for an
+archived day (e.g. by an import) takes precedence until the next run folds it in.
+
+Archived records keep only their date and whether they were completed: they come back as
+unsaved HabitRecords without id, completed_at or updated_at.
+"""
+
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .bitmaps import bitmap_bytes, bitmap_days, bytes_bitmap, days_in_year, year_bounds
+from .models import HabitRecord, HabitRecordArchive
+from .rollups import get_rollup_watermark
+from .utils import chunked
+
+
+def archive_horizon(today=None):
+    """Records dated before this day belong to the archive."""
+    return (today or timezone.localdate()) - timedelta(days=settings.HABIT_RECORD_ARCHIVE_AFTER_DAYS)
+
+
+def reaches_archive(start_date=None):
+    return start_date is None or start_date < archive_horizon()
+
+
+def archive_days(archive, start=None, end=None):
+    """(habit_id, date, completed) of the days recorded in an archive row within [start, end], ascending."""
+    completed = bytes_bitmap(archive.completed)
+    first_day, _ = year_bounds(archive.year)
+    for day in bitmap_days(archive.year, bytes_bitmap(archive.recorded)):
+        if (start is None or day >= start) and (end is None or day <= end):
+            yield archive.habit_id, day, bool(completed >> (day - first_day).days & 1)
+
+
+def merge_archived(hot_rows, archived_rows):
+    """
+    Merges rows of hot records and of archived days, both starting with (habit_id, date) and
+    sorted by them, into one sorted stream; a hot record replaces the archived day it shares.
+    """
+    tagged = heapq.merge(((row[:2], 0, row) for row in hot_rows), ((row[:2], 1, row) for row in archived_rows))
+    previous = None
+    for key, _, row in tagged:
+        if key != previous:
+            yield row
+        previous = key
+
+
+def archive_rows(habits, start=None, end=None):
+    """Archive rows of `habits` (a queryset or ids) for the years of [start, end], by habit and year."""
+    archives = HabitRecordArchive.objects.filter(habit__in=habits).order_by("habit_id", "year")
+    if start is not None:
+        archives = archives.filter(year__gte=start.year)
+    if end is not None:
+        archives = archives.filter(year__lte=end.year)
+    return archives
+
+
+def hot_days(habits, archives, start=None, end=None):
+    """(habit_id, date) of the hot records within the years of `archives`, which hide the archived days."""
+    years = [archive.year for archive in archives]
+    first_day, last_day = year_bounds(min(years))[0], year_bounds(max(years))[1]
+    first_day = max(first_day, start) if start is not None else first_day
+    last_day = min(last_day, end) if end is not None else last_day
+    return HabitRecord.objects.filter(habit__in=habits, date__range=(first_day, last_day)).values_list(
+        "habit_id", "date"
+    )
+
+
+def build_records(archives, hidden, start, end, completed):
+    return [
+        HabitRecord(habit_id=habit_id, date=day, completed=done)
+        for archive in archives
+        for habit_id, day, done in archive_days(archive, start, end)
+        if (habit_id, day) not in hidden and completed in (None, done)
+    ]
+
+
+def archived_records(habits, start=None, end=None, completed=None):
+    """
+    Unsaved HabitRecords of the archived days of `habits` within [start, end] (and with the
+    given `completed`, if any) that have no hot record, ordered by habit and date. Nothing is
+    read when the range starts after the archive horizon.
+    """
+    if not reaches_archive(start):
+        return []
+    archives = list(archive_rows(habits, start, end))
+    if not archives:
+        return []
+    return build_records(archives, set(hot_days(habits, archives, start, end)), start, end, completed)
+
+
+async def aarchived_records(habits, start=None, end=None, completed=None):
+    """archived_records for async views."""
+    if not reaches_archive(start):
+        return []
+    archives = [archive async for archive in archive_rows(habits, start, end)]
+    if not archives:
+        return []
+    hidden = {row async for row in hot_days(habits, archives, start, end)}
+    return build_records(archives, hidden, start, end, completed)
+
+
+def fold_records(rows):
+    """Writes (id, habit_id, date, completed) rows into the archive rows of their habit and year."""
+    folded = {}
+    for _, habit_id, day, completed in rows:
+        bits = folded.setdefault((habit_id, day.year), [0, 0])
+        bit = 1 << (day - year_bounds(day.year)[0]).days
+        bits[0] |= bit
+        if completed:
+            bits[1] |= bit
+
+    existing = HabitRecordArchive.objects.select_for_update().filter(
+        habit_id__in={habit_id for habit_id, _ in folded}, year__in={year for _, year in folded}
+    )
+    for archive in existing:
+        bits = folded.get((archive.habit_id, archive.year))
+        if bits is not None:
+            # Записи заміняють архівні дні з тими самими датами
+            bits[1] |= bytes_bitmap(archive.completed) & ~bits[0]
+            bits[0] |= bytes_bitmap(archive.recorded)
+
+    HabitRecordArchive.objects.bulk_create(
+        [
+            HabitRecordArchive(
+                habit_id=habit_id,
+                year=year,
+                recorded=bitmap_bytes(recorded, days_in_year(year)),
+                completed=bitmap_bytes(completed, days_in_year(year)),
+            )
+            for (habit_id, year), (recorded, completed) in folded.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["habit", "year"],
+        update_fields=["recorded", "completed", "updated_at"],
+    )
+
+
+def archive_records(before=None, batch_size=None):
+    """
+    Moves the records dated before `before` (the archive horizon by default) into
+    HabitRecordArchive, `batch_size` habits per transaction. While the rollup table is in use,
+    records it does not cover yet are left for a later run, so analytics read from the rollup
+    never miss an archived day. Returns the number of archived records.
+    """
+    before = before or archive_horizon()
+    batch_size = batch_size or settings.HABIT_RECORD_ARCHIVE_BATCH_SIZE
+    records = HabitRecord.objects.filter(date__lt=before)
+    watermark = get_rollup_watermark()
+    if watermark is not None:
+        records = records.filter(updated_at__lte=watermark)
+
+    habit_ids = list(records.order_by("habit_id").values_list("habit_id", flat=True).distinct())
+    total = 0
+    for batch in chunked(habit_ids, batch_size):
+        with transaction.atomic():
+            rows = list(
+                records.filter(habit_id__in=batch)
+                .select_for_update()
+                .values_list("id", "habit_id", "date", "completed")
+            )
+            fold_records(rows)
+            for ids in chunked((row[0] for row in rows), 1000):
+                HabitRecord.objects.filter(date__lt=before, pk__in=ids).delete()
+        total += len(rows)
+    return total
+
+
+def restore_records(batch_size=None):
+    """
+    Moves every archived day back into HabitRecord, e.g. after HABIT_RECORD_ARCHIVE_AFTER_DAYS
+    was raised; days that already have a hot record keep it. Returns the number of archive rows restored.
+    """
+    batch_size = batch_size or settings.HABIT_RECORD_ARCHIVE_BATCH_SIZE
+    total = 0
+    while True:
+        with transaction.atomic():
+            archives = list(HabitRecordArchive.objects.select_for_update().order_by("id")[:batch_size])
+            HabitRecord.objects.bulk_create(
+                [
+                    HabitRecord(habit_id=habit_id, date=day, completed=completed)
+                    for archive in archives
+                    for habit_id, day, completed in archive_days(archive)
+                ],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            HabitRecordArchive.objects.filter(pk__in=[archive.id for archive in archives]).delete()
+        total += len(archives)
+        if len(archives) < batch_size:
+            return total
@@ -0,0 +1,16 @@
+from django.urls import path
+
+from .async_views import (
+    AsyncHabitAnalyticsView,
+    AsyncHabitListView,
+    AsyncTodayView,
+    HabitEventStreamView,
+)
+
+urlpatterns = [
+    path("habits/", AsyncHabitListView.as_view(), name="async-habit-list"),
+    path("today/", AsyncTodayView.as_view(), name="async-today"),
+    path("analytics/", AsyncHabitAnalyticsView.as_view(), name="async-analytics"),
+    path("habits/<int:habit_pk>/analytics/", AsyncHabitAnalyticsView.as_view(), name="async-habit-analytics"),
+    path("events/", HabitEventStreamView.as_view(), name="habit-events"),
+]
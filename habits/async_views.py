@@ -0,0 +1,178 @@
+"""
+Async variants of the read-heavy endpoints: habit list, today dashboard and analytics.
+
+They are plain async Django views served under /api/async/. Authentication, queries and the
+response cache go through the async APIs, so under an ASGI server a request that waits for
+the database or a slow client does not hold a worker thread. Everything that does not touch
+the database (serializers, filters, the keyset paginator) is shared with the sync views, so
+both paths return the same payloads.
+"""
+
+import asyncio
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, ValidationError
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from users.authentication import AsyncJWTAuthentication
+from users.utils import user_localdate
+
+from .analytics import ahabit_analytics
+from .archive import aarchived_records
+from .cache import AsyncCachedResponseMixin
+from .dashboard import due_habits
+from .events import get_event_broker
+from .filters import HabitAnalyticsFilter
+from .models import Habit, HabitRecord
+from .pagination import KeysetPagination
+from .rollups import aget_rollup_watermark, analytics_sources
+from .serializers import (
+    HabitAnalyticsParamsSerializer,
+    HabitSerializer,
+    TodayHabitSerializer,
+    TodayParamsSerializer,
+)
+from .views import HabitViewSet, TodayView
+
+
+class AsyncAPIView(View):
+    """
+    Base of the async views: authenticates the JWT, wraps the request in a DRF Request for
+    query_params and answers DRF exceptions the way DRF views do.
+    """
+
+    http_method_names = ["get", "head", "options"]
+    authentication = AsyncJWTAuthentication()
+
+    async def dispatch(self, request, *args, **kwargs):
+        drf_request = Request(request, authenticators=[])
+        try:
+            auth = await self.authentication.aauthenticate(request)
+            if auth is None:
+                raise NotAuthenticated()
+            drf_request.user, drf_request.auth = auth
+            return await super().dispatch(drf_request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+
+    def handle_exception(self, request, exc):
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        headers = {}
+        if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+            headers["WWW-Authenticate"] = self.authentication.authenticate_header(request)
+        return self.render(detail, status=exc.status_code, headers=headers)
+
+    def render(self, data, status=status.HTTP_200_OK, headers=None):
+        if data is None:
+            response = HttpResponse(status=status)
+        else:
+            # Той самий JSON, що й у JSONRenderer DRF
+            response = JsonResponse(
+                data,
+                status=status,
+                safe=False,
+                encoder=JSONEncoder,
+                json_dumps_params={"ensure_ascii": False, "separators": (",", ":")},
+            )
+        for name, value in (headers or {}).items():
+            response[name] = value
+        return response
+
+
+class AsyncHabitListView(AsyncCachedResponseMixin, AsyncAPIView):
+    """The habit list of HabitViewSet with the same keyset pagination."""
+
+    cursor_ordering = HabitViewSet.cursor_ordering
+
+    async def get(self, request):
+        return await self.cached_response(request, self.build_list)
+
+    async def build_list(self, request):
+        paginator = KeysetPagination()
+        queryset = Habit.objects.filter(user_id=request.user.id).select_related("stats", "user__profile")
+        page = await paginator.apaginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_data(HabitSerializer(page, many=True, context={"request": request}).data)
+
+
+class AsyncTodayView(AsyncCachedResponseMixin, AsyncAPIView):
+    """GET of TodayView."""
+
+    cache_variant = TodayView.cache_variant
+
+    async def get(self, request):
+        # Часовий пояс береться з профілю, тож повного користувача завантажуємо заздалегідь
+        await request.user.aget_user()
+        return await self.cached_response(request, self.build_today)
+
+    async def build_today(self, request):
+        params = TodayParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        day = params.validated_data.get("date") or user_localdate(request.user)
+
+        habits = [habit async for habit in due_habits(request.user, day)]
+        return {"date": day, "habits": TodayHabitSerializer(habits, many=True, context={"date": day}).data}
+
+
+class AsyncHabitAnalyticsView(AsyncCachedResponseMixin, AsyncAPIView):
+    """HabitAnalyticsView with the same parameters and rollup handling."""
+
+    async def get(self, request, habit_pk=None):
+        return await self.cached_response(request, self.build_analytics, habit_pk=habit_pk)
+
+    async def build_analytics(self, request, habit_pk=None):
+        params = HabitAnalyticsParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filterset = HabitAnalyticsFilter(request.query_params, queryset=HabitRecord.objects.all(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+
+        records, habits, rollups = analytics_sources(
+            request.user,
+            filterset.qs,
+            params.validated_data,
+            await aget_rollup_watermark(),
+            habit_pk=habit_pk,
+            use_rollups="completed" not in request.query_params,
+        )
+        archived = None
+        if rollups is None:
+            archived = await aarchived_records(
+                habits,
+                params.validated_data.get("start_date"),
+                params.validated_data.get("end_date"),
+                filterset.form.cleaned_data["completed"],
+            )
+        return await ahabit_analytics(records, habits, rollups=rollups, archived=archived, **params.validated_data)
+
+
+class HabitEventStreamView(AsyncAPIView):
+    """
+    Server-sent events with the changes of the user's habits and records (see habits.events).
+
+    A stream ends after HABIT_EVENTS_STREAM_SECONDS and the client reconnects, so connections
+    of clients that went away without closing are released in bounded time. Events published
+    while a device is reconnecting are not replayed; on reconnect it should refetch the data
+    it shows, which costs a 304 when nothing has changed.
+    """
+
+    async def get(self, request):
+        response = StreamingHttpResponse(self.stream(request.user.id), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Інакше nginx буферизує відповідь і події приходять пачками
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self, user_id):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.HABIT_EVENTS_STREAM_SECONDS
+        async with get_event_broker().listen(user_id) as queue:
+            yield "retry: 3000\n\n"
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    yield await asyncio.wait_for(queue.get(), min(settings.HABIT_EVENTS_KEEPALIVE_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
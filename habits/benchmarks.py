@@ -0,0 +1,661 @@
+"""
+Query-count and latency benchmarks of the API, run by the benchmark_api command.
+
+A synthetic dataset is seeded with bulk inserts, then every route of habits.urls and
+users.urls is called through the test client on behalf of one "probe" user. For each
+endpoint the number of queries, p50/p95 latency and peak Python memory are recorded and
+compared with a stored baseline. More queries than in the baseline is always a regression;
+latency and memory are compared with a tolerance, and only when the baseline was recorded
+on the same database vendor and dataset size.
+"""
+
+import json
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from importlib import import_module
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    close_old_connections,
+    connection,
+    connections,
+    transaction,
+)
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+
+from users.authentication import UserRefreshToken
+from users.models import Profile
+from users.utils import get_timezone
+
+from .models import ExportJob, Habit, HabitRecord, HabitSchedule, ImportJob
+from .reminders import schedule_next_fire_at
+from .rollups import roll_up_records, update_rollups
+from .stats import rebuild_all_habit_stats, rebuild_habit_stats
+from .tasks import generate_habit_export, send_habit_email
+from .utils import chunked
+
+User = get_user_model()
+
+BENCHMARK_URLCONFS = ("habits.urls", "habits.async_urls", "users.urls")
+DEFAULT_DATASET = {"users": 10000, "habits_per_user": 10, "records_per_habit": 100}
+PROBE_USERNAME = "bench-0"
+PROBE_PASSWORD = "bench-password"
+SCHEDULE_DAYS = (0, 2, 4)
+RANDOM_SEED = 2025
+
+# Read endpoints and the reminder task mixed by measure_connection_churn
+CHURN_SCENARIOS = ("habit-list GET", "today GET", "analytics GET")
+
+# Latency and memory of fast endpoints are noisy, so a regression also has to exceed these
+LATENCY_SLACK_MS = 5
+MEMORY_SLACK_KIB = 64
+
+
+def route_names(urlconf):
+    """Names of all routes of a urlconf, including the nested router ones."""
+
+    def walk(patterns):
+        for pattern in patterns:
+            if hasattr(pattern, "url_patterns"):
+                yield from walk(pattern.url_patterns)
+            elif pattern.name:
+                yield pattern.name
+
+    return set(walk(import_module(urlconf).urlpatterns))
+
+
+def uncovered_routes():
+    """Routes of the benchmarked urlconfs that no scenario calls."""
+    covered = {scenario["route"] for scenario in SCENARIOS}
+    return sorted(set().union(*(route_names(urlconf) for urlconf in BENCHMARK_URLCONFS)) - covered)
+
+
+def seed_dataset(users, habits_per_user, records_per_habit, batch_size=5000):
+    """
+    Fills an empty database with `users` users, each with `habits_per_user` habits that
+    have a weekly schedule and `records_per_habit` daily records up to today. Only bulk
+    inserts are used, so no signals run; stats and rollups are built afterwards in one pass.
+    """
+    password = make_password(PROBE_PASSWORD)
+    for batch in chunked(range(users), batch_size):
+        User.objects.bulk_create(
+            User(username=f"bench-{n}", email=f"bench-{n}@example.com", password=password) for n in batch
+        )
+
+    user_ids = User.objects.filter(username__startswith="bench-").order_by("id").values_list("id", flat=True)
+    for batch in chunked(user_ids.iterator(chunk_size=batch_size), batch_size):
+        Profile.objects.bulk_create(Profile(user_id=user_id) for user_id in batch)
+
+    seed_habits(user_ids, habits_per_user, records_per_habit, batch_size)
+    rebuild_all_habit_stats(batch_size=batch_size)
+    with override_settings(ROLLUP_SAFETY_LAG_SECONDS=0):
+        update_rollups(batch_size=batch_size, rebuild=True)
+
+
+def seed_probe_user(password, habits_per_user, records_per_habit, batch_size=5000):
+    """
+    Creates only the probe user with the habits of seed_dataset, for a database that already
+    holds real users: the stats and rollup rows of the new habits are built, those of every
+    other habit are left alone.
+    """
+    with transaction.atomic():
+        user = User.objects.create_user(PROBE_USERNAME, f"{PROBE_USERNAME}@example.com", password)
+        habit_ids = seed_habits([user.id], habits_per_user, records_per_habit, batch_size)
+        for habit_id in habit_ids:
+            rebuild_habit_stats(habit_id)
+        roll_up_records(HabitRecord.objects.filter(habit_id__in=habit_ids), batch_size)
+    return user
+
+
+def seed_habits(user_ids, habits_per_user, records_per_habit, batch_size):
+    """Bulk-inserts the habits, schedules and records of seed_dataset for the users; returns the habit ids."""
+    rng = random.Random(RANDOM_SEED)
+    first_day = timezone.localdate() - timedelta(days=records_per_habit - 1)
+
+    habits = ((user_id, n) for user_id in user_ids for n in range(habits_per_user))
+    for batch in chunked(habits, batch_size):
+        Habit.objects.bulk_create(
+            Habit(user_id=user_id, name=f"Habit {n}", start_date=first_day) for user_id, n in batch
+        )
+
+    habit_ids = list(Habit.objects.filter(user_id__in=user_ids).order_by("id").values_list("id", flat=True))
+    tzinfo = get_timezone()
+    now = timezone.now()
+    schedules = (
+        HabitSchedule(habit_id=habit_id, day_of_week=day, remind_hour=rng.randrange(6, 22), remind_minute=0)
+        for habit_id in habit_ids
+        for day in SCHEDULE_DAYS
+    )
+    for batch in chunked(schedules, batch_size):
+        for schedule in batch:
+            schedule.next_fire_at = schedule_next_fire_at(schedule, tzinfo, now)
+        HabitSchedule.objects.bulk_create(batch)
+
+    records = ((habit_id, offset) for habit_id in habit_ids for offset in range(records_per_habit))
+    for batch in chunked(records, batch_size):
+        HabitRecord.objects.bulk_create(
+            HabitRecord(habit_id=habit_id, date=first_day + timedelta(days=offset), completed=rng.random() < 0.7)
+            for habit_id, offset in batch
+        )
+    return habit_ids
+
+
+def build_context():
+    """Objects of the probe user the scenarios refer to."""
+    user = User.objects.get(username=PROBE_USERNAME)
+    habit = Habit.objects.filter(user=user).order_by("id").first()
+    records = HabitRecord.objects.filter(habit=habit)
+
+    export = ExportJob.objects.filter(user=user, status="done").first()
+    if export is None or not export.file.storage.exists(export.file.name):
+        export = ExportJob.objects.create(user=user)
+        generate_habit_export(export.id)
+
+    return {
+        "user": user,
+        "habit": habit,
+        "habit_ids": list(Habit.objects.filter(user=user).order_by("id").values_list("id", flat=True)),
+        "schedule": HabitSchedule.objects.filter(habit=habit).order_by("id").first(),
+        "record": records.order_by("-date").first(),
+        "first_day": records.order_by("date").values_list("date", flat=True).first(),
+        "uidb64": urlsafe_base64_encode(force_bytes(user.pk)),
+        "token": default_token_generator.make_token(user),
+        "export": export,
+        "import": ImportJob.objects.filter(user=user).first() or ImportJob.objects.create(user=user, status="done"),
+    }
+
+
+def import_upload(context):
+    lines = (
+        json.dumps({"habit": context["habit"].name, "date": str(context["first_day"] - timedelta(days=n))})
+        for n in range(1, 1001)
+    )
+    return {"file": SimpleUploadedFile("history.ndjson", "\n".join(lines).encode())}
+
+
+def bulk_items(context):
+    first_day = context["first_day"]
+    return [
+        {"habit": context["habit"].id, "date": (first_day - timedelta(days=n)).isoformat(), "completed": True}
+        for n in range(1, 101)
+    ]
+
+
+# Every scenario runs inside a transaction that is rolled back, so writes can be repeated
+SCENARIOS = (
+    {"name": "api-root GET", "route": "api-root", "method": "get", "url": lambda c: reverse("api-root")},
+    {"name": "habit-list GET", "route": "habit-list", "method": "get", "url": lambda c: reverse("habit-list")},
+    {
+        "name": "habit-list POST",
+        "route": "habit-list",
+        "method": "post",
+        "url": lambda c: reverse("habit-list"),
+        "data": lambda c: {"name": "Benchmark habit", "start_date": c["first_day"].isoformat()},
+        "status": 201,
+    },
+    {
+        "name": "habit-detail GET",
+        "route": "habit-detail",
+        "method": "get",
+        "url": lambda c: reverse("habit-detail", args=[c["habit"].id]),
+    },
+    {
+        "name": "habit-detail PATCH",
+        "route": "habit-detail",
+        "method": "patch",
+        "url": lambda c: reverse("habit-detail", args=[c["habit"].id]),
+        "data": lambda c: {"description": "Updated by the benchmark"},
+    },
+    {
+        "name": "habit-detail DELETE",
+        "route": "habit-detail",
+        "method": "delete",
+        "url": lambda c: reverse("habit-detail", args=[c["habit"].id]),
+        "status": 204,
+    },
+    {
+        "name": "habit-schedule-list GET",
+        "route": "habit-schedule-list",
+        "method": "get",
+        "url": lambda c: reverse("habit-schedule-list", args=[c["habit"].id]),
+    },
+    {
+        "name": "habit-schedule-list POST",
+        "route": "habit-schedule-list",
+        "method": "post",
+        "url": lambda c: reverse("habit-schedule-list", args=[c["habit"].id]),
+        "data": lambda c: {"day_of_week": 1, "remind_hour": 8},
+        "status": 201,
+    },
+    {
+        "name": "habit-schedule-detail GET",
+        "route": "habit-schedule-detail",
+        "method": "get",
+        "url": lambda c: reverse("habit-schedule-detail", args=[c["habit"].id, c["schedule"].id]),
+    },
+    {
+        "name": "habit-schedule-detail PATCH",
+        "route": "habit-schedule-detail",
+        "method": "patch",
+        "url": lambda c: reverse("habit-schedule-detail", args=[c["habit"].id, c["schedule"].id]),
+        "data": lambda c: {"remind_hour": 7},
+    },
+    {
+        "name": "habit-schedule-detail DELETE",
+        "route": "habit-schedule-detail",
+        "method": "delete",
+        "url": lambda c: reverse("habit-schedule-detail", args=[c["habit"].id, c["schedule"].id]),
+        "status": 204,
+    },
+    {
+        "name": "habit-schedule-bulk PUT",
+        "route": "habit-schedule-bulk",
+        "method": "put",
+        "url": lambda c: reverse("habit-schedule-bulk", args=[c["habit"].id]),
+        "data": lambda c: [{"day_of_week": day, "remind_hour": 7} for day in range(5)],
+    },
+    {
+        "name": "habit-records-list GET",
+        "route": "habit-records-list",
+        "method": "get",
+        "url": lambda c: reverse("habit-records-list", args=[c["habit"].id]),
+    },
+    {
+        "name": "habit-records-list GET completed",
+        "route": "habit-records-list",
+        "method": "get",
+        "url": lambda c: reverse("habit-records-list", args=[c["habit"].id]) + "?completed=true",
+    },
+    {
+        "name": "habit-records-list POST",
+        "route": "habit-records-list",
+        "method": "post",
+        "url": lambda c: reverse("habit-records-list", args=[c["habit"].id]),
+        "data": lambda c: {"date": (c["first_day"] - timedelta(days=1)).isoformat(), "completed": True},
+        "status": 201,
+    },
+    {
+        "name": "habit-records-detail GET",
+        "route": "habit-records-detail",
+        "method": "get",
+        "url": lambda c: reverse("habit-records-detail", args=[c["habit"].id, c["record"].id]),
+    },
+    {
+        "name": "habit-records-detail PATCH",
+        "route": "habit-records-detail",
+        "method": "patch",
+        "url": lambda c: reverse("habit-records-detail", args=[c["habit"].id, c["record"].id]),
+        "data": lambda c: {"completed": not c["record"].completed},
+    },
+    {
+        "name": "habit-records-detail DELETE",
+        "route": "habit-records-detail",
+        "method": "delete",
+        "url": lambda c: reverse("habit-records-detail", args=[c["habit"].id, c["record"].id]),
+        "status": 204,
+    },
+    {
+        "name": "habit-records-bulk POST",
+        "route": "habit-records-bulk",
+        "method": "post",
+        "url": lambda c: reverse("habit-records-bulk"),
+        "data": bulk_items,
+    },
+    {"name": "analytics GET", "route": "analytics", "method": "get", "url": lambda c: reverse("analytics")},
+    {
+        "name": "analytics GET weekly completion rate",
+        "route": "analytics",
+        "method": "get",
+        "url": lambda c: reverse("analytics") + "?granularity=week&metrics=completed_count,completion_rate",
+    },
+    {
+        "name": "habit-analytics GET",
+        "route": "habit-analytics",
+        "method": "get",
+        "url": lambda c: reverse("habit-analytics", args=[c["habit"].id]) + "?metrics=completed_count,missed_count",
+    },
+    {"name": "today GET", "route": "today", "method": "get", "url": lambda c: reverse("today")},
+    {
+        "name": "today POST check-off",
+        "route": "today",
+        "method": "post",
+        "url": lambda c: reverse("today"),
+        "data": lambda c: {"habits": [{"habit": habit_id, "completed": True} for habit_id in c["habit_ids"]]},
+    },
+    {"name": "calendar GET", "route": "calendar", "method": "get", "url": lambda c: reverse("calendar")},
+    {
+        "name": "habit-calendar GET",
+        "route": "habit-calendar",
+        "method": "get",
+        "url": lambda c: reverse("habit-calendar", args=[c["habit"].id]),
+    },
+    {"name": "habit-export GET", "route": "habit-export", "method": "get", "url": lambda c: reverse("habit-export")},
+    {
+        "name": "habit-export GET csv",
+        "route": "habit-export",
+        "method": "get",
+        "url": lambda c: reverse("habit-export") + "?file_format=csv",
+    },
+    {
+        "name": "export-job-list GET",
+        "route": "export-job-list",
+        "method": "get",
+        "url": lambda c: reverse("export-job-list"),
+    },
+    {
+        "name": "export-job-list POST",
+        "route": "export-job-list",
+        "method": "post",
+        "url": lambda c: reverse("export-job-list"),
+        "data": lambda c: {"file_format": "csv"},
+        "status": 201,
+    },
+    {
+        "name": "export-job-detail GET",
+        "route": "export-job-detail",
+        "method": "get",
+        "url": lambda c: reverse("export-job-detail", args=[c["export"].id]),
+    },
+    {
+        "name": "export-job-download GET",
+        "route": "export-job-download",
+        "method": "get",
+        "url": lambda c: reverse("export-job-download", args=[c["export"].id]),
+    },
+    {
+        "name": "import-job-list GET",
+        "route": "import-job-list",
+        "method": "get",
+        "url": lambda c: reverse("import-job-list"),
+    },
+    {
+        "name": "import-job-list POST 1000 rows",
+        "route": "import-job-list",
+        "method": "post",
+        "url": lambda c: reverse("import-job-list"),
+        "data": import_upload,
+        "format": "multipart",
+        "status": 201,
+    },
+    {
+        "name": "import-job-detail GET",
+        "route": "import-job-detail",
+        "method": "get",
+        "url": lambda c: reverse("import-job-detail", args=[c["import"].id]),
+    },
+    # Асинхронні варіанти; "sync" вказує сценарій, з яким їх порівнювати
+    {
+        "name": "async-habit-list GET",
+        "route": "async-habit-list",
+        "method": "get",
+        "url": lambda c: reverse("async-habit-list"),
+        "sync": "habit-list GET",
+    },
+    {
+        "name": "async-today GET",
+        "route": "async-today",
+        "method": "get",
+        "url": lambda c: reverse("async-today"),
+        "sync": "today GET",
+    },
+    {
+        "name": "async-analytics GET",
+        "route": "async-analytics",
+        "method": "get",
+        "url": lambda c: reverse("async-analytics"),
+        "sync": "analytics GET",
+    },
+    {
+        "name": "async-habit-analytics GET",
+        "route": "async-habit-analytics",
+        "method": "get",
+        "url": lambda c: reverse("async-habit-analytics", args=[c["habit"].id])
+        + "?metrics=completed_count,missed_count",
+        "sync": "habit-analytics GET",
+    },
+    # Потік подій закривається одразу після підписки, тож вимірюється вартість підключення
+    {
+        "name": "habit-events GET",
+        "route": "habit-events",
+        "method": "get",
+        "url": lambda c: reverse("habit-events"),
+        "settings": {
+            "HABIT_EVENTS_STREAM_SECONDS": 0,
+            "HABIT_EVENTS": {"BACKEND": "habits.events.InMemoryEventBroker"},
+        },
+    },
+    {
+        "name": "register POST",
+        "route": "register",
+        "method": "post",
+        "url": lambda c: reverse("register"),
+        "data": lambda c: {"username": "bench-new", "email": "bench-new@example.com", "password": "bench-password"},
+        "status": 201,
+        "anonymous": True,
+    },
+    {
+        "name": "profile GET",
+        "route": "profile",
+        "method": "get",
+        "url": lambda c: reverse("profile"),
+    },
+    {
+        "name": "profile PATCH",
+        "route": "profile",
+        "method": "patch",
+        "url": lambda c: reverse("profile"),
+        "data": lambda c: {"timezone": "America/New_York"},
+    },
+    {
+        "name": "verify-email GET",
+        "route": "verify-email",
+        "method": "get",
+        "url": lambda c: reverse("verify-email", args=[c["uidb64"], c["token"]]),
+        "anonymous": True,
+    },
+)
+
+
+async def read_async_stream(content):
+    return b"".join([chunk async for chunk in content])
+
+
+def call_scenario(client, scenario, context):
+    """Performs one request, rolls back everything it wrote and returns (queries, milliseconds)."""
+    url = scenario["url"](context)
+    data = scenario["data"](context) if "data" in scenario else None
+    with override_settings(**scenario.get("settings", {})), transaction.atomic():
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(client, scenario["method"])(url, data, format=scenario.get("format", "json"))
+            if response.streaming:
+                if response.is_async:
+                    async_to_sync(read_async_stream)(response.streaming_content)
+                else:
+                    b"".join(response.streaming_content)
+            elapsed = (time.perf_counter() - started) * 1000
+        transaction.set_rollback(True)
+
+    expected = scenario.get("status", 200)
+    if response.status_code != expected:
+        raise AssertionError(f"{scenario['name']}: expected {expected}, got {response.status_code}")
+    return len(captured), elapsed
+
+
+def run_benchmarks(iterations=20, warmup=2):
+    """
+    Runs every scenario and returns {name: {"queries", "p50_ms", "p95_ms", "peak_kib"}}.
+    The cache is cleared before each call, so read endpoints are measured on their slow path.
+    """
+    context = build_context()
+    access = UserRefreshToken.for_user(context["user"]).access_token
+    clients = {False: APIClient(), True: APIClient()}
+    clients[False].credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    results = {}
+    for scenario in SCENARIOS:
+        client = clients[scenario.get("anonymous", False)]
+        for _ in range(warmup):
+            cache.clear()
+            call_scenario(client, scenario, context)
+
+        timings = []
+        queries = 0
+        for _ in range(iterations):
+            cache.clear()
+            count, elapsed = call_scenario(client, scenario, context)
+            queries = max(queries, count)
+            timings.append(elapsed)
+
+        # tracemalloc slows everything down, so memory is measured in a separate call
+        cache.clear()
+        tracemalloc.start()
+        try:
+            call_scenario(client, scenario, context)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        timings.sort()
+        results[scenario["name"]] = {
+            "queries": queries,
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(timings[round(0.95 * (len(timings) - 1))], 2),
+            "peak_kib": round(peak / 1024, 1),
+        }
+
+    return results
+
+
+def measure_connection_churn(conn_max_age, threads=8, calls_per_thread=50):
+    """
+    Calls CHURN_SCENARIOS and runs send_habit_email in turns from `threads` threads with
+    CONN_MAX_AGE set to `conn_max_age`, closing obsolete connections around every call the way
+    Django's request handler and Celery's worker do. Returns {"calls", "connections", "p50_ms",
+    "p95_ms"}, where "connections" is the number of database connections opened meanwhile.
+    """
+    user = User.objects.get(username=PROBE_USERNAME)
+    habit = Habit.objects.filter(user=user).order_by("id").first()
+    context = {"user": user, "habit": habit}
+    access = UserRefreshToken.for_user(user).access_token
+    scenarios = [scenario for scenario in SCENARIOS if scenario["name"] in CHURN_SCENARIOS]
+
+    lock = threading.Lock()
+    opened = []
+    timings = []
+
+    def count_connection(sender, connection, **kwargs):
+        with lock:
+            opened.append(connection.alias)
+
+    def call(client, n):
+        if n % (len(scenarios) + 1) == len(scenarios):
+            send_habit_email.apply(args=(user.id, habit.id), throw=True)
+            return
+        scenario = scenarios[n % (len(scenarios) + 1)]
+        response = client.get(scenario["url"](context))
+        if response.status_code != 200:
+            raise AssertionError(f"{scenario['name']}: expected 200, got {response.status_code}")
+
+    def work(thread):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        try:
+            for n in range(thread, thread + calls_per_thread):
+                started = time.perf_counter()
+                close_old_connections()
+                call(client, n)
+                close_old_connections()
+                with lock:
+                    timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connections.close_all()
+
+    # Усі потоки створюють свої з'єднання з того самого словника налаштувань
+    settings_dict = connections[DEFAULT_DB_ALIAS].settings_dict
+    previous = settings_dict["CONN_MAX_AGE"]
+    settings_dict["CONN_MAX_AGE"] = conn_max_age
+    connection_created.connect(count_connection)
+    try:
+        with ThreadPoolExecutor(threads) as pool:
+            for future in [pool.submit(work, n) for n in range(threads)]:
+                future.result()
+    finally:
+        connection_created.disconnect(count_connection)
+        settings_dict["CONN_MAX_AGE"] = previous
+
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "connections": len(opened),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[round(0.95 * (len(timings) - 1))], 2),
+    }
+
+
+def compare_async(results):
+    """
+    Pairs every async scenario with its sync counterpart and returns human readable lines
+    with the query counts and p50 latency of both paths.
+    """
+    lines = []
+    for scenario in SCENARIOS:
+        if "sync" not in scenario or scenario["name"] not in results or scenario["sync"] not in results:
+            continue
+        async_result, sync_result = results[scenario["name"]], results[scenario["sync"]]
+        lines.append(
+            f"{scenario['sync']}: sync {sync_result['queries']} queries, p50 {sync_result['p50_ms']} ms; "
+            f"async {async_result['queries']} queries, p50 {async_result['p50_ms']} ms"
+        )
+    return lines
+
+
+def compare_with_baseline(results, baseline, environment, tolerance=1.5):
+    """
+    Returns (regressions, notes) as lists of human readable lines. Timing and memory are
+    only compared when `environment` equals the one the baseline was recorded in.
+    """
+    regressions, notes = [], []
+    comparable = baseline.get("environment") == environment
+    if not comparable:
+        notes.append("Baseline was recorded on a different database or dataset; only query counts are compared.")
+
+    expected = baseline.get("endpoints", {})
+    for name, result in results.items():
+        if name not in expected:
+            notes.append(f"{name}: no baseline yet.")
+            continue
+
+        reference = expected[name]
+        if result["queries"] > reference["queries"]:
+            regressions.append(f"{name}: {result['queries']} queries, baseline {reference['queries']}.")
+        if not comparable:
+            continue
+
+        if result["p95_ms"] > reference["p95_ms"] * tolerance + LATENCY_SLACK_MS:
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms, baseline {reference['p95_ms']} ms.")
+        if result["peak_kib"] > reference["peak_kib"] * tolerance + MEMORY_SLACK_KIB:
+            regressions.append(f"{name}: peak memory {result['peak_kib']} KiB, baseline {reference['peak_kib']} KiB.")
+
+    for name in expected.keys() - results.keys():
+        notes.append(f"{name}: in the baseline but no longer benchmarked.")
+
+    return regressions, notes
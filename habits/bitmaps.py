@@ -0,0 +1,122 @@
+"""
+Day bitmaps for calendar heatmaps.
+
+A year is an integer in which bit N stands for the N-th day of the year (January 1st is bit 0).
+It is sent as base64 of its little-endian bytes, so byte 0 holds January 1st-8th with January
+1st in the lowest bit; a whole year takes 46 bytes, 64 characters of base64.
+"""
+
+import base64
+from datetime import date, timedelta
+
+from django.db.models import FilteredRelation, Q
+
+from .schedules import EVERY_DAY
+
+
+def year_bounds(year):
+    return date(year, 1, 1), date(year, 12, 31)
+
+
+def days_in_year(year):
+    first_day, last_day = year_bounds(year)
+    return (last_day - first_day).days + 1
+
+
+def range_bitmap(start, end):
+    """Bits start..end inclusive, both given as day offsets."""
+    if end < start:
+        return 0
+    return ((1 << (end - start + 1)) - 1) << start
+
+
+def weekday_bitmap(mask, first_day, length):
+    """
+    Bits of the planned days among the `length` days from first_day for a weekday mask
+    (see habits.schedules), built by repeating one week instead of checking every day.
+    """
+    mask = mask or EVERY_DAY
+    week = 0
+    for offset in range(7):
+        if mask >> (first_day.weekday() + offset) % 7 & 1:
+            week |= 1 << offset
+
+    bits = 0
+    for start in range(0, length, 7):
+        bits |= week << start
+    return bits & range_bitmap(0, length - 1)
+
+
+def bitmap_bytes(bits, length):
+    return bits.to_bytes((length + 7) // 8, "little")
+
+
+def bytes_bitmap(value):
+    return int.from_bytes(bytes(value), "little")
+
+
+def encode_bitmap(bits, length):
+    return base64.b64encode(bitmap_bytes(bits, length)).decode()
+
+
+def decode_bitmap(value):
+    return bytes_bitmap(base64.b64decode(value))
+
+
+def bitmap_offsets(bits):
+    """Ascending offsets of the set bits."""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def bitmap_days(year, bits):
+    """Ascending dates of the set bits of a year bitmap."""
+    first_day = date(year, 1, 1)
+    for offset in bitmap_offsets(bits):
+        yield first_day + timedelta(days=offset)
+
+
+def habit_calendar(habits, year, archived=()):
+    """
+    Bitmaps of completed and scheduled days of every habit in the `habits` queryset for one
+    year, read with a single query that LEFT JOINs the habits with their completed records of
+    that year. Scheduled days come from the weekday mask kept in HabitStats and start at the
+    habit's start date. `archived` adds the completed archived records of the year (see
+    habits.archive).
+    """
+    first_day, last_day = year_bounds(year)
+    length = days_in_year(year)
+    rows = (
+        habits.alias(
+            year_records=FilteredRelation(
+                "records", condition=Q(records__completed=True, records__date__range=(first_day, last_day))
+            )
+        )
+        .values_list("id", "start_date", "stats__weekday_mask", "year_records__date")
+        .order_by("id")
+    )
+
+    calendar = {}
+    for habit_id, start_date, weekday_mask, day in rows:
+        entry = calendar.get(habit_id)
+        if entry is None:
+            scheduled = weekday_bitmap(weekday_mask, first_day, length)
+            scheduled &= range_bitmap(max((start_date - first_day).days, 0), length - 1)
+            entry = calendar[habit_id] = {"habit": habit_id, "completed": 0, "scheduled": scheduled}
+        if day is not None:
+            entry["completed"] |= 1 << (day - first_day).days
+
+    for record in archived:
+        if record.habit_id in calendar:
+            calendar[record.habit_id]["completed"] |= 1 << (record.date - first_day).days
+
+    return [
+        {
+            "habit": entry["habit"],
+            "completed": encode_bitmap(entry["completed"], length),
+            "scheduled": encode_bitmap(entry["scheduled"], length),
+        }
+        for entry in calendar.values()
+    ]
@@ -0,0 +1,122 @@
+"""
+Per-user caching of habit read endpoints.
+
+Every user has a version number in the cache that is bumped whenever a change to one of
+their habits, schedules or records is committed. Cached responses and ETags are derived from
+that version, so a write makes all of the user's cached reads unreachable at once instead of
+deleting them one by one; stale entries simply expire.
+"""
+
+import time
+from functools import partial
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def version_key(user_id):
+    return f"habits:version:{user_id}"
+
+
+def get_user_version(user_id):
+    version = cache.get(version_key(user_id))
+    if version is None:
+        # Починаємо з поточного часу, щоб після витіснення ключа версія не повторилась
+        cache.add(version_key(user_id), time.time_ns(), timeout=None)
+        version = cache.get(version_key(user_id))
+    return version
+
+
+async def aget_user_version(user_id):
+    version = await cache.aget(version_key(user_id))
+    if version is None:
+        await cache.aadd(version_key(user_id), time.time_ns(), timeout=None)
+        version = await cache.aget(version_key(user_id))
+    return version
+
+
+def increment_user_version(user_id):
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        cache.add(version_key(user_id), time.time_ns(), timeout=None)
+
+
+def bump_user_version(user_id):
+    """
+    Invalidates the user's cached reads once the current transaction commits. Bumping before
+    the commit would let a concurrent read cache the old data under the new version.
+    """
+    transaction.on_commit(partial(increment_user_version, user_id))
+
+
+def response_digest(request, version, variant=""):
+    # Дата входить у ключ, бо серії та аналітика залежать від поточного дня
+    source = f"{request.user.id}:{version}:{timezone.localdate()}:{variant}:{request.build_absolute_uri()}"
+    return md5(source.encode(), usedforsecurity=False).hexdigest()
+
+
+class CachedResponseMixin:
+    """
+    Caches successful responses of the wrapped handlers per user and URL, and answers
+    requests carrying a matching If-None-Match with 304 Not Modified.
+    """
+
+    cache_timeout = settings.HABITS_CACHE_TIMEOUT
+
+    def cache_variant(self, request):
+        """Anything besides the user and URL the response depends on."""
+        return ""
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        digest = response_digest(request, get_user_version(request.user.id), self.cache_variant(request))
+        etag = f'"{digest}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if etag in request.headers.get("If-None-Match", ""):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        key = f"habits:response:{digest}"
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers=headers)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout=self.cache_timeout)
+            for name, value in headers.items():
+                response[name] = value
+        return response
+
+
+class AsyncCachedResponseMixin:
+    """
+    CachedResponseMixin for the async views of habits.async_views: the same keys, ETags and
+    304 handling, with the cache accessed through its async API. Handlers return response
+    data instead of a Response and are only called on a cache miss.
+    """
+
+    cache_timeout = settings.HABITS_CACHE_TIMEOUT
+
+    def cache_variant(self, request):
+        return ""
+
+    async def cached_response(self, request, handler, *args, **kwargs):
+        digest = response_digest(request, await aget_user_version(request.user.id), self.cache_variant(request))
+        etag = f'"{digest}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if etag in request.headers.get("If-None-Match", ""):
+            return self.render(None, status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        key = f"habits:response:{digest}"
+        data = await cache.aget(key)
+        if data is None:
+            data = await handler(request, *args, **kwargs)
+            await cache.aset(key, data, timeout=self.cache_timeout)
+        return self.render(data, headers=headers)
@@ -0,0 +1,32 @@
+"""
+The "today" dashboard: every active habit planned for a day, with its record for that day
+and its current streak, so a client's home screen needs one request instead of one per habit.
+"""
+
+from django.db.models import F, FilteredRelation, Q
+
+from .models import Habit
+
+
+def due_habits(user, day):
+    """
+    Active habits of the user planned for `day`, read with one query: stats come through
+    select_related and the day's record through a FilteredRelation, exposed as record_id,
+    record_completed and record_completed_at (None when there is no record yet).
+    """
+    return (
+        Habit.objects.filter(user_id=user.id, is_active=True, start_date__lte=day)
+        .select_related("stats")
+        .alias(
+            planned=F("stats__weekday_mask").bitand(1 << day.weekday()),
+            day_record=FilteredRelation("records", condition=Q(records__date=day)),
+        )
+        # Порожня маска означає, що звичка запланована на кожен день
+        .filter(Q(stats__weekday_mask=0) | Q(stats__weekday_mask__isnull=True) | Q(planned__gt=0))
+        .annotate(
+            record_id=F("day_record__id"),
+            record_completed=F("day_record__completed"),
+            record_completed_at=F("day_record__completed_at"),
+        )
+        .order_by("id")
+    )
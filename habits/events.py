@@ -0,0 +1,146 @@
+"""
+Real-time events about a user's habits and records for their connected devices.
+
+Writes publish small deltas ("habit.saved", "record.saved", ...) to a per-user channel once
+their transaction commits; the async stream view of habits.async_views forwards them to every
+open connection of that user as server-sent events, so other devices do not have to poll the
+list endpoints.
+
+Events travel through a broker chosen by settings.HABIT_EVENTS. RedisEventBroker publishes
+over Redis pub/sub, so events from any web or worker process reach streams in any ASGI
+process; each ASGI process keeps a single pub/sub connection and fans messages out to its
+local listeners. InMemoryEventBroker only reaches listeners in the same process and serves
+tests and single-process development.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import partial
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "habits:events:"
+
+
+def channel_name(user_id):
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+
+def format_event(event, data):
+    """One server-sent event frame; compact JSON never contains a newline."""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))}\n\n"
+
+
+class InMemoryEventBroker:
+    """Delivers events to the listeners of the current process."""
+
+    def __init__(self, location=None):
+        self.listeners = defaultdict(set)
+
+    def publish(self, user_id, frame):
+        self.deliver(user_id, frame)
+
+    def deliver(self, user_id, frame):
+        for loop, queue in list(self.listeners.get(user_id, ())):
+            # Публікують із синхронного коду, тож у чергу кладемо через цикл подій слухача
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, frame)
+            except RuntimeError:
+                pass
+
+    @asynccontextmanager
+    async def listen(self, user_id):
+        """Yields a queue that receives every frame published for the user while open."""
+        listener = (asyncio.get_running_loop(), asyncio.Queue())
+        first = not self.listeners.get(user_id)
+        self.listeners[user_id].add(listener)
+        try:
+            if first:
+                await self.subscribe(user_id)
+            yield listener[1]
+        finally:
+            self.listeners[user_id].discard(listener)
+            if not self.listeners[user_id]:
+                del self.listeners[user_id]
+                await self.unsubscribe(user_id)
+
+    async def subscribe(self, user_id):
+        pass
+
+    async def unsubscribe(self, user_id):
+        pass
+
+
+class RedisEventBroker(InMemoryEventBroker):
+    """
+    Publishes events over Redis pub/sub. A process subscribes to a user's channel while it
+    has listeners of that user, and a single reader task delivers incoming messages to them.
+    """
+
+    def __init__(self, location):
+        super().__init__()
+        self.location = location
+        self.client = redis.Redis.from_url(location)
+        self.loop = None
+        self.pubsub = None
+        self.reader = None
+
+    def publish(self, user_id, frame):
+        self.client.publish(channel_name(user_id), frame)
+
+    async def subscribe(self, user_id):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # З'єднання pub/sub прив'язане до циклу подій, у якому його створено
+            self.loop = loop
+            self.pubsub = redis.asyncio.Redis.from_url(self.location).pubsub(ignore_subscribe_messages=True)
+            self.reader = None
+        await self.pubsub.subscribe(channel_name(user_id))
+        if self.reader is None or self.reader.done():
+            self.reader = loop.create_task(self.read(self.pubsub))
+
+    async def unsubscribe(self, user_id):
+        if self.loop is asyncio.get_running_loop():
+            await self.pubsub.unsubscribe(channel_name(user_id))
+
+    async def read(self, pubsub):
+        try:
+            async for message in pubsub.listen():
+                user_id = int(message["channel"].decode().removeprefix(CHANNEL_PREFIX))
+                self.deliver(user_id, message["data"].decode())
+        except redis.RedisError:
+            logger.exception("Habit event reader stopped")
+
+
+_brokers = {}
+
+
+def get_event_broker():
+    backend = settings.HABIT_EVENTS["BACKEND"]
+    location = settings.HABIT_EVENTS.get("LOCATION")
+    if (backend, location) not in _brokers:
+        _brokers[backend, location] = import_string(backend)(location)
+    return _brokers[backend, location]
+
+
+def send_event(user_id, frame):
+    try:
+        get_event_broker().publish(user_id, frame)
+    except redis.RedisError:
+        # Подія лише підказка клієнтам, тож збій Redis не має ламати запис
+        logger.warning("Could not publish a habit event for user %s", user_id, exc_info=True)
+
+
+def publish_event(user_id, event, data):
+    """Sends an event to the user's connected devices once the current transaction commits."""
+    transaction.on_commit(partial(send_event, user_id, format_event(event, data)))
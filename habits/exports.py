@@ -0,0 +1,117 @@
+"""
+Export of a user's full habit history as NDJSON or CSV.
+
+Rows come from three server-side cursors (habits, schedules, records), so memory stays
+constant however long the history is. The same generators back the streaming endpoint and
+the gzip files built by the generate_habit_export task.
+"""
+
+import csv
+import gzip
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .archive import archive_days, archive_rows, merge_archived
+from .models import Habit, HabitRecord, HabitSchedule
+
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_COLUMNS = (
+    "type",
+    "id",
+    "habit_id",
+    "name",
+    "description",
+    "start_date",
+    "is_active",
+    "created_at",
+    "day_of_week",
+    "remind_hour",
+    "remind_minute",
+    "date",
+    "completed",
+    "completed_at",
+)
+
+
+def export_rows(user):
+    """
+    Yields every habit, then every schedule entry, then every record of the user as flat
+    dicts; archived records (see habits.archive) are merged in with an empty id.
+    """
+    chunk_size = settings.HABIT_EXPORT_CHUNK_SIZE
+    sources = (
+        (
+            "habit",
+            Habit.objects.filter(user_id=user.id)
+            .order_by("id")
+            .values("id", "name", "description", "start_date", "is_active", "created_at"),
+        ),
+        (
+            "schedule",
+            HabitSchedule.objects.filter(habit__user_id=user.id)
+            .order_by("habit_id", "day_of_week")
+            .values("id", "habit_id", "day_of_week", "remind_hour", "remind_minute"),
+        ),
+    )
+    for row_type, queryset in sources:
+        for row in queryset.iterator(chunk_size=chunk_size):
+            yield {"type": row_type, **row}
+
+    records = (
+        HabitRecord.objects.filter(habit__user_id=user.id)
+        .order_by("habit_id", "date")
+        .values_list("habit_id", "date", "completed", "id", "completed_at")
+        .iterator(chunk_size=chunk_size)
+    )
+    archives = archive_rows(Habit.objects.filter(user_id=user.id)).iterator(chunk_size=chunk_size)
+    # Архівні дні не мають id і completed_at
+    archived = ((*day, None, None) for archive in archives for day in archive_days(archive))
+    for habit_id, day, completed, record_id, completed_at in merge_archived(records, archived):
+        yield {
+            "type": "record",
+            "id": record_id,
+            "habit_id": habit_id,
+            "date": day,
+            "completed": completed,
+            "completed_at": completed_at,
+        }
+
+
+class Echo:
+    """A write-only file that returns what is written, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def csv_lines(rows):
+    writer = csv.DictWriter(Echo(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(
+            {name: value.isoformat() if hasattr(value, "isoformat") else value for name, value in row.items()}
+        )
+
+
+def export_lines(user, file_format):
+    rows = export_rows(user)
+    return csv_lines(rows) if file_format == "csv" else ndjson_lines(rows)
+
+
+def build_export_file(job):
+    """Writes the job's export into a gzip file in the default storage and attaches it to the job."""
+    with tempfile.TemporaryFile() as buffer:
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as archive:
+            for line in export_lines(job.user, job.file_format):
+                archive.write(line.encode())
+        buffer.seek(0)
+        job.file.save(f"habits-{job.user_id}-{job.id}.{job.file_format}.gz", File(buffer), save=False)
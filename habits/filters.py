@@ -20,3 +20,10 @@ class HabitAnalyticsFilter(django_filters.FilterSet):
     class Meta:
         model = HabitRecord
         fields = ["completed", "start_date", "end_date"]
+
+
+def filter_values(view, request):
+    """The cleaned values of the view's filterset, e.g. to apply the same filters to archived records."""
+    filterset = view.filterset_class(request.query_params, queryset=view.get_queryset(), request=request)
+    filterset.is_valid()
+    return filterset.form.cleaned_data
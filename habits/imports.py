@@ -0,0 +1,205 @@
+"""
+Import of a habit history from NDJSON or CSV, e.g. when a user moves over from another tracker.
+
+The file is parsed as a stream and handled in batches of HABIT_IMPORT_BATCH_SIZE rows: the
+rows are validated, habits the user does not have yet are created, and schedules and records
+are written with one INSERT ... ON CONFLICT per batch. Nothing is saved row by row, so no
+per-row signals or queries run; stats, rollups and cached responses are refreshed once at the end.
+
+The format is the one habits.exports produces, so an export can be imported back. Habits are
+matched by name, which also makes hand-made files simple: a record row only needs `habit`
+and `date`.
+"""
+
+import csv
+import gzip
+import io
+import json
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework import serializers
+
+from users.utils import get_user_timezone
+
+from .cache import bump_user_version
+from .events import publish_event
+from .models import Habit, HabitRecord, HabitSchedule, HabitStats
+from .reminders import schedule_next_fire_at
+from .rollups import refresh_rollup_schedule
+from .serializers import HabitImportRowSerializer
+from .stats import rebuild_habit_stats
+from .utils import chunked
+
+MAX_REPORTED_ERRORS = 100
+
+
+def open_import_stream(stream):
+    """Transparently decompresses gzip files; `stream` must be a seekable binary file."""
+    magic = stream.read(2)
+    stream.seek(0)
+    return gzip.GzipFile(fileobj=stream) if magic == b"\x1f\x8b" else stream
+
+
+def read_rows(stream, file_format):
+    """Yields the rows of a binary stream one at a time; an unparsable NDJSON line yields None."""
+    text = io.TextIOWrapper(open_import_stream(stream), encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        for row in csv.DictReader(text):
+            yield {name: value for name, value in row.items() if name and value not in ("", None)}
+        return
+
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def normalize_row(row, exported_names):
+    """
+    Maps a row of a habits.exports file onto HabitImportRowSerializer fields: exported habits
+    carry `name` and `id`, and schedules and records point to them through `habit_id`.
+    """
+    row = dict(row)
+    if row.get("type") == "habit":
+        row.setdefault("habit", row.get("name"))
+        if "id" in row:
+            exported_names[str(row["id"])] = row["habit"]
+    elif "habit" not in row and "habit_id" in row:
+        row["habit"] = exported_names.get(str(row["habit_id"]))
+    return row
+
+
+def create_missing_habits(user, rows, habit_ids, implicit):
+    """
+    Creates the habits the rows refer to that the user does not have yet and adds them to
+    `habit_ids` (name -> id). Habits created without an explicit start date are added to
+    `implicit`; they are moved to their first imported record at the end.
+    """
+    new = {}
+    implicit_names = set()
+    for data in rows:
+        name = data["habit"]
+        if name in habit_ids or (name in new and data["type"] != "habit"):
+            continue
+        new[name] = Habit(
+            user_id=user.id,
+            name=name,
+            description=data.get("description", ""),
+            start_date=data.get("start_date") or data.get("date") or date.today(),
+            is_active=data["is_active"],
+        )
+        if "start_date" in data:
+            implicit_names.discard(name)
+        else:
+            implicit_names.add(name)
+
+    if not new:
+        return
+
+    created = Habit.objects.bulk_create(new.values())
+    # bulk_create не надсилає сигнали, тому рядки статистики створюємо тут
+    HabitStats.objects.bulk_create(HabitStats(habit=habit) for habit in created)
+    for habit in created:
+        habit_ids[habit.name] = habit.id
+        if habit.name in implicit_names:
+            implicit.add(habit.id)
+
+
+def import_habit_history(user, rows, batch_size=None, on_progress=None):
+    """
+    Imports parsed rows into the user's habits. `on_progress` is called with the running
+    summary after every batch. Returns {"processed", "imported", "failed", "errors"}, where
+    errors lists the first MAX_REPORTED_ERRORS invalid rows by their 1-based line number.
+    """
+    batch_size = batch_size or settings.HABIT_IMPORT_BATCH_SIZE
+    row_serializer = HabitImportRowSerializer()
+    tzinfo = get_user_timezone(user)
+    now = timezone.now()
+    habit_ids = dict(Habit.objects.filter(user_id=user.id).order_by("-id").values_list("name", "id"))
+    exported_names = {}
+    implicit = set()
+    touched = set()
+    rescheduled = set()
+    summary = {"processed": 0, "imported": 0, "failed": 0, "errors": []}
+
+    for batch in chunked(enumerate(rows, start=1), batch_size):
+        valid = []
+        for line, row in batch:
+            try:
+                if not isinstance(row, dict):
+                    raise serializers.ValidationError("Невірний формат рядка.")
+                valid.append(row_serializer.run_validation(normalize_row(row, exported_names)))
+            except serializers.ValidationError as exc:
+                summary["failed"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append({"line": line, "errors": exc.detail})
+
+        schedules = {}
+        records = {}
+        with transaction.atomic():
+            create_missing_habits(user, valid, habit_ids, implicit)
+            for data in valid:
+                habit_id = habit_ids[data["habit"]]
+                if data["type"] == "schedule":
+                    schedule = HabitSchedule(
+                        habit_id=habit_id,
+                        day_of_week=data["day_of_week"],
+                        remind_hour=data["remind_hour"],
+                        remind_minute=data["remind_minute"],
+                    )
+                    schedule.next_fire_at = schedule_next_fire_at(schedule, tzinfo, now)
+                    schedules[(habit_id, data["day_of_week"])] = schedule
+                elif data["type"] == "record":
+                    records[(habit_id, data["date"])] = HabitRecord(
+                        habit_id=habit_id,
+                        date=data["date"],
+                        completed=data["completed"],
+                        completed_at=data.get("completed_at"),
+                    )
+
+            HabitSchedule.objects.bulk_create(
+                schedules.values(),
+                update_conflicts=True,
+                unique_fields=["habit", "day_of_week"],
+                update_fields=["remind_hour", "remind_minute", "next_fire_at"],
+            )
+            HabitRecord.objects.bulk_create(
+                records.values(),
+                update_conflicts=True,
+                unique_fields=["habit", "date"],
+                update_fields=["completed", "completed_at", "updated_at"],
+            )
+
+        rescheduled.update(habit_id for habit_id, _ in schedules)
+        touched.update(habit_id for habit_id, _ in records)
+        summary["processed"] += len(batch)
+        summary["imported"] += len(valid)
+        if on_progress:
+            on_progress(summary)
+
+    if implicit:
+        first_record = HabitRecord.objects.filter(habit=OuterRef("pk")).values("habit").annotate(first=Min("date"))
+        Habit.objects.filter(id__in=implicit).update(
+            start_date=Coalesce(Subquery(first_record.values("first")), "start_date")
+        )
+    if rescheduled:
+        # Нові рядки розкладу створено без сигналів, тож нагадування неактивних звичок вимикаємо тут
+        HabitSchedule.objects.filter(habit_id__in=rescheduled, habit__is_active=False).update(reminder_enabled=False)
+    for habit_id in rescheduled:
+        refresh_rollup_schedule(habit_id)
+    for habit_id in touched | rescheduled:
+        rebuild_habit_stats(habit_id)
+    if summary["imported"]:
+        bump_user_version(user.id)
+        # Імпорт може бути завеликим для дельт, тож клієнти просто перечитують дані
+        publish_event(user.id, "sync", {})
+
+    return summary
@@ -0,0 +1,135 @@
+"""
+HTTP load test of a running server, run by the load_test command.
+
+Unlike benchmark_api, which calls the views in-process, this goes through the whole serving
+stack: `concurrency` clients with keep-alive connections request LOAD_TEST_ROUTES in turns
+for `duration` seconds, and the throughput and latency are reported. local_server starts
+runserver or gunicorn on a free port against the configured database, so the serving modes
+of serve.sh can be compared on the same data.
+"""
+
+import http.client
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.urls import reverse
+
+LOAD_TEST_ROUTES = ("habit-list", "today", "analytics", "calendar")
+
+SERVERS = {
+    "runserver": ["manage.py", "runserver", "--noreload", "127.0.0.1:{port}"],
+    "gunicorn": ["-m", "gunicorn", "habit_tracker.wsgi:application", "--bind", "127.0.0.1:{port}"],
+    "gunicorn-uvicorn": [
+        "-m",
+        "gunicorn",
+        "habit_tracker.asgi:application",
+        "--bind",
+        "127.0.0.1:{port}",
+        "--worker-class",
+        "uvicorn_worker.UvicornWorker",
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(base_url, process, timeout=30):
+    """Waits until the server at `base_url` answers any HTTP request."""
+    parts = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode}.")
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=1)
+        try:
+            conn.request("GET", reverse("api-root"))
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+        finally:
+            conn.close()
+    raise RuntimeError(f"The server did not start within {timeout} seconds.")
+
+
+@contextmanager
+def local_server(name):
+    """Runs one of SERVERS on a free port for the duration of the block; yields its base URL."""
+    port = free_port()
+    command = [sys.executable] + [arg.format(port=port) for arg in SERVERS[name]]
+    # gunicorn бере gunicorn.conf.py з робочого каталогу
+    process = subprocess.Popen(command, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_up(base_url, process)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def run_load(base_url, token, concurrency=16, duration=10):
+    """
+    Requests LOAD_TEST_ROUTES from `concurrency` threads for `duration` seconds as the owner
+    of `token`. Returns {"requests", "errors", "rps", "p50_ms", "p95_ms"}; "rps" counts the
+    successful responses only.
+    """
+    parts = urlsplit(base_url)
+    prefix = parts.path.rstrip("/")
+    paths = [prefix + reverse(route) for route in LOAD_TEST_ROUTES]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    lock = threading.Lock()
+    timings = []
+    errors = []
+
+    def client(offset, deadline):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        n = offset
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    conn.request("GET", paths[n % len(paths)], headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                except (OSError, http.client.HTTPException):
+                    # Наступний request відкриє з'єднання заново
+                    conn.close()
+                    ok = False
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    (timings if ok else errors).append(elapsed)
+                n += 1
+        finally:
+            conn.close()
+
+    started = time.monotonic()
+    deadline = started + duration
+    clients = [threading.Thread(target=client, args=(n, deadline)) for n in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    timings.sort()
+    return {
+        "requests": len(timings) + len(errors),
+        "errors": len(errors),
+        "rps": round(len(timings) / elapsed, 1),
+        "p50_ms": round(statistics.median(timings), 2) if timings else None,
+        "p95_ms": round(timings[round(0.95 * (len(timings) - 1))], 2) if timings else None,
+    }
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from habits.archive import archive_records, restore_records
+
+
+class Command(BaseCommand):
+    help = "Moves old habit records into the yearly archive, or restores the archive with --restore."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--before", help="Archive the records dated before this day (YYYY-MM-DD).")
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--restore", action="store_true", help="Move all archived days back into the records.")
+
+    def handle(self, *args, **options):
+        if options["restore"]:
+            total = restore_records(batch_size=options["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Restored {total} archive rows."))
+            return
+
+        before = None
+        if options["before"]:
+            before = parse_date(options["before"])
+            if before is None:
+                raise CommandError("--before must be a date in YYYY-MM-DD format.")
+
+        total = archive_records(before=before, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} records."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from habits.rollups import update_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily analytics rollup from all habit records."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = update_rollups(batch_size=options["batch_size"], rebuild=True)
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {total} records."))
@@ -0,0 +1,109 @@
+import json
+import tempfile
+from pathlib import Path
+
+from celery import current_app
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from habits.benchmarks import (
+    DEFAULT_DATASET,
+    PROBE_USERNAME,
+    build_context,
+    compare_async,
+    compare_with_baseline,
+    run_benchmarks,
+    seed_dataset,
+    uncovered_routes,
+)
+from habits.query_plans import check_query_plans
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic dataset into a throwaway test database, benchmarks every API route "
+        "and fails when query counts, latency or memory regressed against the stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, help="Defaults to the dataset the baseline was recorded with.")
+        parser.add_argument("--habits-per-user", type=int)
+        parser.add_argument("--records-per-habit", type=int)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed p95 latency and memory growth.")
+        parser.add_argument("--baseline", default=settings.BASE_DIR / "benchmarks" / "baseline.json")
+        parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline.")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the seeded test database for the next run.")
+
+    def handle(self, *args, **options):
+        missing = uncovered_routes()
+        if missing:
+            raise CommandError(f"No benchmark scenario for routes: {', '.join(missing)}.")
+
+        baseline_path = Path(options["baseline"])
+        baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        dataset = {
+            name: options[name] or baseline.get("environment", {}).get(name, default)
+            for name, default in DEFAULT_DATASET.items()
+        }
+
+        # Жодних зовнішніх сервісів: кеш, пошта й події в пам'яті, файли тимчасові, задачі Celery виконуються одразу
+        current_app.conf.task_always_eager = True
+        with (
+            tempfile.TemporaryDirectory() as media_root,
+            override_settings(
+                MEDIA_ROOT=media_root,
+                CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+                EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+                HABIT_EVENTS={"BACKEND": "habits.events.InMemoryEventBroker"},
+            ),
+        ):
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+            try:
+                if not User.objects.filter(username=PROBE_USERNAME).exists():
+                    self.stdout.write(f"Seeding {dataset}...")
+                    seed_dataset(**dataset)
+                results = run_benchmarks(iterations=options["iterations"])
+                if connection.vendor == "postgresql":
+                    # Свіжозасіяні таблиці ще без статистики, без неї планувальник оцінює навмання
+                    with connection.cursor() as cursor:
+                        cursor.execute("ANALYZE")
+                plans = check_query_plans({**build_context(), "today": timezone.localdate()})
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+        environment = {"vendor": connection.vendor, **dataset}
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<40} {result['queries']:>4} queries  p50 {result['p50_ms']:>8} ms  "
+                f"p95 {result['p95_ms']:>8} ms  peak {result['peak_kib']:>8} KiB"
+            )
+
+        for line in compare_async(results):
+            self.stdout.write(line)
+
+        # Лише звіт: на малих таблицях послідовне сканування буває дешевшим за індекс
+        for name, index, ok, plan in plans:
+            if ok:
+                self.stdout.write(f"{name}: uses {index}")
+            else:
+                self.stdout.write(self.style.WARNING(f"{name}: does not use {index}\n{plan}"))
+
+        if options["update_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({"environment": environment, "endpoints": results}, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}."))
+            return
+
+        regressions, notes = compare_with_baseline(results, baseline, environment, options["tolerance"])
+        for note in notes:
+            self.stdout.write(self.style.WARNING(note))
+        if regressions:
+            raise CommandError("Performance regressions:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
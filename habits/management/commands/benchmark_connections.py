@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from habits.benchmarks import PROBE_USERNAME, measure_connection_churn, seed_dataset
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Calls a few endpoints and the reminder task from concurrent threads against a throwaway test database, "
+        "once closing the database connection after every call and once keeping it for CONN_MAX_AGE, "
+        "and reports how many connections each run opened."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--calls", type=int, default=50, help="Calls per thread.")
+        parser.add_argument(
+            "--conn-max-age",
+            type=int,
+            default=settings.DATABASES["default"].get("CONN_MAX_AGE") or 60,
+            help="Compared with 0; defaults to the configured CONN_MAX_AGE.",
+        )
+        parser.add_argument("--keepdb", action="store_true", help="Keep the seeded test database for the next run.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            # З'єднання з базою в пам'яті Django не закриває, тож різниці не буде видно
+            self.stdout.write(self.style.WARNING("SQLite test databases keep their connections, run it on Postgres."))
+
+        results = {}
+        # Без кешу кожен виклик іде в базу
+        with override_settings(
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+        ):
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+            try:
+                if not User.objects.filter(username=PROBE_USERNAME).exists():
+                    seed_dataset(users=100, habits_per_user=5, records_per_habit=30)
+                for conn_max_age in (0, options["conn_max_age"]):
+                    results[conn_max_age] = measure_connection_churn(conn_max_age, options["threads"], options["calls"])
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+        for conn_max_age, result in results.items():
+            self.stdout.write(
+                f"CONN_MAX_AGE={conn_max_age:<6} {result['calls']:>6} calls  {result['connections']:>6} connections  "
+                f"p50 {result['p50_ms']:>8} ms  p95 {result['p95_ms']:>8} ms"
+            )
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from habits.imports import import_habit_history, read_rows
+from habits.utils import guess_file_format
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Imports a habit history file (NDJSON or CSV, optionally gzip-compressed) into a user's habits."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("path")
+        parser.add_argument("--file-format", choices=("ndjson", "csv"), help="Guessed from the file name by default.")
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist.")
+
+        def report(summary):
+            self.stdout.write(f"Processed {summary['processed']} rows, {summary['failed']} failed.")
+
+        file_format = options["file_format"] or guess_file_format(options["path"])
+        with open(options["path"], "rb") as stream:
+            summary = import_habit_history(
+                user, read_rows(stream, file_format), batch_size=options["batch_size"], on_progress=report
+            )
+
+        for error in summary["errors"]:
+            self.stderr.write(f"Line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {summary['imported']} rows, {summary['failed']} failed."))
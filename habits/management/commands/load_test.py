@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from habits.benchmarks import PROBE_PASSWORD, PROBE_USERNAME, seed_probe_user
+from habits.load_test import SERVERS, local_server, run_load
+from users.authentication import UserRefreshToken
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads the read endpoints over HTTP on behalf of one user and reports throughput and latency, either of "
+        "a running server (--url) or of runserver and gunicorn started locally one after another."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Base URL of a running server, e.g. http://localhost (nginx).")
+        parser.add_argument(
+            "--servers",
+            default="runserver,gunicorn",
+            help=f"Comma-separated servers to start locally without --url: {', '.join(SERVERS)}.",
+        )
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--duration", type=float, default=10, help="Seconds per server.")
+        parser.add_argument("--username", default=PROBE_USERNAME, help="The user whose habits are requested.")
+        parser.add_argument(
+            "--seed",
+            action="store_true",
+            help=(
+                f"Create {PROBE_USERNAME} with a year of records in the configured database if it does not exist; "
+                "other users' data is not touched."
+            ),
+        )
+        parser.add_argument(
+            "--password",
+            help=f"Password of the seeded user, required unless DEBUG is on (then {PROBE_PASSWORD!r}).",
+        )
+
+    def handle(self, *args, **options):
+        servers = options["servers"].split(",")
+        unknown = set(servers) - set(SERVERS)
+        if unknown:
+            raise CommandError(f"Unknown servers: {', '.join(sorted(unknown))}.")
+
+        if options["seed"] and not User.objects.filter(username=PROBE_USERNAME).exists():
+            # Сервер може бути публічним, тож відомий пароль бенчмарків підходить лише для DEBUG
+            if not options["password"] and not settings.DEBUG:
+                raise CommandError("Pass --password for the seeded user, DEBUG is off.")
+            self.stdout.write("Seeding...")
+            seed_probe_user(options["password"] or PROBE_PASSWORD, habits_per_user=10, records_per_habit=365)
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist, pass --seed to create {PROBE_USERNAME}.")
+        token = str(UserRefreshToken.for_user(user).access_token)
+
+        load = {"concurrency": options["concurrency"], "duration": options["duration"]}
+        if options["url"]:
+            results = {options["url"]: run_load(options["url"], token, **load)}
+        else:
+            results = {}
+            for name in servers:
+                self.stdout.write(f"Loading {name} for {options['duration']} s...")
+                with local_server(name) as base_url:
+                    results[name] = run_load(base_url, token, **load)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<20} {result['rps']:>8} req/s  {result['requests']:>7} requests  {result['errors']:>5} errors  "
+                f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms"
+            )
+
+        baseline = results.get("runserver")
+        if baseline and baseline["rps"]:
+            for name, result in results.items():
+                if name != "runserver":
+                    self.stdout.write(f"{name}: {result['rps'] / baseline['rps']:.1f}× the throughput of runserver")
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from habits.partitions import (
+    detach_record_partitions,
+    ensure_record_partitions,
+    records_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = "Creates the habit record partitions of the coming months and optionally detaches old ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=None, help="Months to create after the current one.")
+        parser.add_argument(
+            "--detach-before", help="Detach the partitions of the months before this date (YYYY-MM-DD)."
+        )
+
+    def handle(self, *args, **options):
+        if not records_partitioned():
+            raise CommandError("The habit record table is not partitioned on this database.")
+
+        detach_before = None
+        if options["detach_before"]:
+            detach_before = parse_date(options["detach_before"])
+            if detach_before is None:
+                raise CommandError("--detach-before must be a date in YYYY-MM-DD format.")
+
+        for name in ensure_record_partitions(ahead=options["ahead"]):
+            self.stdout.write(f"Created {name}")
+        if detach_before:
+            for name in detach_record_partitions(detach_before):
+                self.stdout.write(f"Detached {name}")
+        self.stdout.write(self.style.SUCCESS("Habit record partitions are up to date."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from habits.stats import rebuild_all_habit_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuilds streak and completion stats of every habit from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = rebuild_all_habit_stats(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {total} habits."))
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.21 on 2026-10-18 19:17
+
+import datetime
+
+from django.db import migrations, models
+
+
+def remove_schedule_periodic_tasks(apps, schema_editor):
+    PeriodicTask = apps.get_model("django_celery_beat", "PeriodicTask")
+    PeriodicTask.objects.filter(name__startswith="remind_habit_").delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0004_habitschedule_remind_hour_and_more"),
+        ("django_celery_beat", "0019_alter_periodictasks_options"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskWatermark",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("value", models.DateTimeField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="habit",
+            name="start_date",
+            field=models.DateField(default=datetime.date.today),
+        ),
+        migrations.AddIndex(
+            model_name="habitschedule",
+            index=models.Index(fields=["day_of_week", "remind_hour", "remind_minute"], name="schedule_remind_at_idx"),
+        ),
+        migrations.RunPython(remove_schedule_periodic_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.21 on 2026-10-18 19:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0006_habitstats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(fields=["user", "created_at", "id"], name="habit_user_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="habitrecord",
+            index=models.Index(fields=["habit", "date", "id"], name="record_habit_date_idx"),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.21 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+def disable_reminders_of_inactive_habits(apps, schema_editor):
+    HabitSchedule = apps.get_model("habits", "HabitSchedule")
+    HabitSchedule.objects.filter(habit__is_active=False).update(reminder_enabled=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0010_importjob"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="habitschedule",
+            name="schedule_remind_at_idx",
+        ),
+        migrations.AddField(
+            model_name="habitschedule",
+            name="reminder_enabled",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(disable_reminders_of_inactive_habits, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="habitschedule",
+            index=models.Index(
+                condition=models.Q(("reminder_enabled", True)),
+                fields=["day_of_week", "remind_hour", "remind_minute"],
+                name="schedule_remind_at_idx",
+            ),
+        ),
+    ]
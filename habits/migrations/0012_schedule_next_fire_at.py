@@ -0,0 +1,63 @@
+# Generated by Django 4.2.21 on 2026-10-18 19:56
+
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def next_reminder_at(day_of_week, hour, minute, tzinfo, after):
+    """Frozen copy of habits.schedules.next_reminder_at: the first firing strictly after `after`, in UTC."""
+    local_after = after.astimezone(tzinfo)
+    day = local_after.date() + timedelta(days=(day_of_week - local_after.weekday()) % 7)
+    while True:
+        fire_at = datetime.combine(day, time(hour, minute), tzinfo=tzinfo).astimezone(dt_timezone.utc)
+        if fire_at > after:
+            return fire_at
+        day += timedelta(weeks=1)
+
+
+def fill_next_fire_at(apps, schema_editor):
+    # Усі профілі щойно створено з часовим поясом проєкту, тож рахуємо в ньому
+    HabitSchedule = apps.get_model("habits", "HabitSchedule")
+    TaskWatermark = apps.get_model("habits", "TaskWatermark")
+    tzinfo = ZoneInfo(settings.TIME_ZONE)
+    now = timezone.now()
+
+    batch = []
+    schedules = HabitSchedule.objects.only("day_of_week", "remind_hour", "remind_minute").order_by("id")
+    for schedule in schedules.iterator(chunk_size=1000):
+        schedule.next_fire_at = next_reminder_at(
+            schedule.day_of_week, schedule.remind_hour, schedule.remind_minute, tzinfo, now
+        )
+        batch.append(schedule)
+        if len(batch) == 1000:
+            HabitSchedule.objects.bulk_update(batch, ["next_fire_at"])
+            batch = []
+    HabitSchedule.objects.bulk_update(batch, ["next_fire_at"])
+
+    # Диспетчер більше не веде водяний знак хвилин
+    TaskWatermark.objects.filter(name="habit_reminders").delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0011_schedule_reminder_enabled"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="habitschedule",
+            name="schedule_remind_at_idx",
+        ),
+        migrations.AddField(
+            model_name="habitschedule",
+            name="next_fire_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_next_fire_at, migrations.RunPython.noop),
+    ]
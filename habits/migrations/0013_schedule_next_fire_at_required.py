@@ -0,0 +1,23 @@
+# Generated by Django 4.2.21 on 2026-10-18 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0012_schedule_next_fire_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="habitschedule",
+            name="next_fire_at",
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="habitschedule",
+            index=models.Index(
+                condition=models.Q(("reminder_enabled", True)), fields=["next_fire_at"], name="schedule_next_fire_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.21 on 2026-10-18 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0013_schedule_next_fire_at_required"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="habit",
+            index=models.Index(
+                condition=models.Q(("is_active", True)), fields=["user", "start_date"], name="habit_user_active_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="habitrecord",
+            index=models.Index(
+                condition=models.Q(("completed", True)), fields=["habit", "date"], name="record_completed_idx"
+            ),
+        ),
+    ]
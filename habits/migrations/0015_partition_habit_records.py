@@ -0,0 +1,103 @@
+"""
+Turns habits_habitrecord into a table partitioned by month of `date` on Postgres.
+
+The rows are copied into a new partitioned table with one partition per month they span
+(plus the months up to three ahead) and a DEFAULT partition for anything outside them; the
+unique constraint, foreign key and indexes are then recreated under their old names, so later
+migrations and habits.query_plans keep referring to them. The primary key becomes (id, date)
+because a partitioned table's unique keys must contain the partition key; Django still treats
+`id` as the primary key. On other databases the migration does nothing.
+
+Copying takes the table's lock for its whole duration, so on a large table run it in a
+maintenance window.
+"""
+
+from datetime import date, timedelta
+
+from django.db import migrations
+
+TABLE = "habits_habitrecord"
+OLD_TABLE = "habits_habitrecord_unpartitioned"
+MONTHS_AHEAD = 3
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def table_definitions(cursor):
+    """Unique and foreign key constraints and plain indexes of the record table, as SQL."""
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('u', 'f') ORDER BY conname",
+        [TABLE],
+    )
+    constraints = [f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}' for name, definition in cursor]
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s "
+        "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass) ORDER BY indexname",
+        [TABLE, TABLE],
+    )
+    return constraints + [definition for (definition,) in cursor]
+
+
+def rebuild_table(cursor, partitioned):
+    definitions = table_definitions(cursor)
+
+    cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{OLD_TABLE}"')
+    partition_by = "PARTITION BY RANGE (date)" if partitioned else ""
+    cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{OLD_TABLE}" INCLUDING DEFAULTS INCLUDING IDENTITY) {partition_by}')
+
+    if partitioned:
+        cursor.execute(f'SELECT min(date), max(date) FROM "{OLD_TABLE}"')
+        first, last = cursor.fetchone()
+        today = date.today()
+        month = month_start(min(first or today, today))
+        end = month_start(max(last or today, today))
+        for _ in range(MONTHS_AHEAD):
+            end = next_month(end)
+        while month <= end:
+            cursor.execute(
+                f'CREATE TABLE "{TABLE}_p{month:%Y_%m}" PARTITION OF "{TABLE}" FOR VALUES FROM (%s) TO (%s)',
+                [month, next_month(month)],
+            )
+            month = next_month(month)
+        cursor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+    cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{OLD_TABLE}"')
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce(max(id), 0) + 1, false) FROM \"{TABLE}\"",
+        [TABLE],
+    )
+    cursor.execute(f'DROP TABLE "{OLD_TABLE}" CASCADE')
+
+    primary_key = "(id, date)" if partitioned else "(id)"
+    cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY {primary_key}')
+    for definition in definitions:
+        cursor.execute(definition)
+
+
+def partition_records(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        with schema_editor.connection.cursor() as cursor:
+            rebuild_table(cursor, partitioned=True)
+
+
+def unpartition_records(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        with schema_editor.connection.cursor() as cursor:
+            rebuild_table(cursor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0014_query_pattern_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_records, unpartition_records),
+    ]
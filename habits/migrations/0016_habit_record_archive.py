@@ -0,0 +1,32 @@
+# Generated by Django 4.2.21 on 2026-10-18 20:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0015_partition_habit_records"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HabitRecordArchive",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("year", models.PositiveSmallIntegerField()),
+                ("recorded", models.BinaryField()),
+                ("completed", models.BinaryField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "habit",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="record_archives", to="habits.habit"
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("habit", "year")},
+            },
+        ),
+    ]
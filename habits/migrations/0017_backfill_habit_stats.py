@@ -0,0 +1,93 @@
+"""
+Creates the HabitStats rows of the habits that predate 0006_habitstats, which the signals only
+create on their next record or schedule change. Until then these habits read as having no
+streaks and, with an empty weekday mask, are planned every day on the today dashboard.
+
+The streak logic is a frozen copy of habits.stats.compute_streaks and habits.schedules, so
+later changes to the app do not alter this migration. Archived days count like in
+habits.stats.rebuild_habit_stats: a record replaces the archived day with the same date.
+"""
+
+from datetime import date, timedelta
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def is_scheduled(day, mask):
+    return not mask or bool(mask >> day.weekday() & 1)
+
+
+def next_scheduled_day(day, mask):
+    for offset in range(1, 8):
+        candidate = day + timedelta(days=offset)
+        if is_scheduled(candidate, mask):
+            return candidate
+
+
+def compute_streaks(dates, mask):
+    counters = {"completed_count": 0, "current_streak": 0, "longest_streak": 0, "last_completed_date": None}
+    for day in dates:
+        if not is_scheduled(day, mask):
+            continue
+        last = counters["last_completed_date"]
+        if last is not None and next_scheduled_day(last, mask) == day:
+            counters["current_streak"] += 1
+        else:
+            counters["current_streak"] = 1
+        counters["completed_count"] += 1
+        counters["longest_streak"] = max(counters["longest_streak"], counters["current_streak"])
+        counters["last_completed_date"] = day
+    return counters
+
+
+def recorded_days(HabitRecord, HabitRecordArchive, habit_ids):
+    """{habit_id: {date: completed}} of the archived days and the records of the habits."""
+    days = {habit_id: {} for habit_id in habit_ids}
+    for archive in HabitRecordArchive.objects.filter(habit_id__in=habit_ids):
+        recorded = int.from_bytes(bytes(archive.recorded), "little")
+        completed = int.from_bytes(bytes(archive.completed), "little")
+        first_day = date(archive.year, 1, 1)
+        for offset in range(recorded.bit_length()):
+            if recorded >> offset & 1:
+                days[archive.habit_id][first_day + timedelta(days=offset)] = bool(completed >> offset & 1)
+
+    records = HabitRecord.objects.filter(habit_id__in=habit_ids).values_list("habit_id", "date", "completed")
+    for habit_id, day, completed in records.iterator():
+        days[habit_id][day] = completed
+    return days
+
+
+def backfill_habit_stats(apps, schema_editor):
+    Habit = apps.get_model("habits", "Habit")
+    HabitRecord = apps.get_model("habits", "HabitRecord")
+    HabitRecordArchive = apps.get_model("habits", "HabitRecordArchive")
+    HabitSchedule = apps.get_model("habits", "HabitSchedule")
+    HabitStats = apps.get_model("habits", "HabitStats")
+
+    habit_ids = list(Habit.objects.filter(stats__isnull=True).order_by("id").values_list("id", flat=True))
+    for start in range(0, len(habit_ids), BATCH_SIZE):
+        batch = habit_ids[start : start + BATCH_SIZE]
+        masks = {}
+        for habit_id, day in HabitSchedule.objects.filter(habit_id__in=batch).values_list("habit_id", "day_of_week"):
+            masks[habit_id] = masks.get(habit_id, 0) | 1 << day
+        days = recorded_days(HabitRecord, HabitRecordArchive, batch)
+        HabitStats.objects.bulk_create(
+            HabitStats(
+                habit_id=habit_id,
+                weekday_mask=masks.get(habit_id, 0),
+                **compute_streaks(sorted(day for day, done in days[habit_id].items() if done), masks.get(habit_id, 0)),
+            )
+            for habit_id in batch
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("habits", "0016_habit_record_archive"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_habit_stats, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,8 @@ from datetime import date
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .schedules import next_scheduled_day, scheduled_days_between
+
 User = get_user_model()
 
 
@@ -20,6 +22,15 @@ class Habit(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"], name="habit_user_created_idx"),
+            # Дашборд «сьогодні» читає лише активні звички, що вже почались
+            models.Index(
+                fields=["user", "start_date"], name="habit_user_active_idx", condition=models.Q(is_active=True)
+            ),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.user.username})"
 
@@ -44,9 +55,20 @@ class HabitSchedule(models.Model):
     day_of_week = models.IntegerField(choices=DAYS_OF_WEEK)
     remind_hour = models.PositiveSmallIntegerField(default=9)
     remind_minute = models.PositiveSmallIntegerField(default=0)
+    # Копія habit.is_active, щоб диспетчер нагадувань не фільтрував через join зі звичками
+    reminder_enabled = models.BooleanField(default=True)
+    # Наступне нагадування в UTC з урахуванням часового поясу власника (habits.reminders)
+    next_fire_at = models.DateTimeField(editable=False)
 
     class Meta:
         unique_together = ("habit", "day_of_week")
+        indexes = [
+            models.Index(
+                fields=["next_fire_at"],
+                name="schedule_next_fire_idx",
+                condition=models.Q(reminder_enabled=True),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.habit.name} — {self.get_day_of_week_display()} ({self.remind_hour:02}:{self.remind_minute:02})"
@@ -62,9 +84,168 @@ class HabitRecord(models.Model):
     date = models.DateField()
     completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ("habit", "date")
+        indexes = [
+            models.Index(fields=["habit", "date", "id"], name="record_habit_date_idx"),
+            # Серії, аналітика й календар читають лише виконані дні
+            models.Index(fields=["habit", "date"], name="record_completed_idx", condition=models.Q(completed=True)),
+        ]
 
     def __str__(self):
         return f'{self.habit.name} — {self.date} — {"Готово" if self.completed else "Не завершено"}'
+
+
+class HabitRecordArchive(models.Model):
+    """
+    The records of a habit for one year, moved out of HabitRecord once they are older than
+    HABIT_RECORD_ARCHIVE_AFTER_DAYS (see habits.archive). Bit N of `recorded` and `completed`
+    stands for the N-th day of the year, as in habits.bitmaps. Archived records keep only
+    their date and whether they were completed.
+    """
+
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name="record_archives")
+    year = models.PositiveSmallIntegerField()
+    recorded = models.BinaryField()
+    completed = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("habit", "year")
+
+    def __str__(self):
+        return f"{self.habit.name} — {self.year}"
+
+
+class HabitStats(models.Model):
+    """
+    Precomputed streak and completion counters of a habit.
+    Kept up to date on every HabitRecord change, so reading them never scans the habit's history.
+    Streaks follow the days of the habit's schedule: days the habit is not planned for
+    neither extend nor break a streak.
+    """
+
+    habit = models.OneToOneField(Habit, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    weekday_mask = models.PositiveSmallIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_completed_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "habit stats"
+
+    def __str__(self):
+        return f"{self.habit.name} — {self.current_streak}/{self.longest_streak}"
+
+    def current_streak_on(self, day):
+        # Серія триває, доки не минув наступний запланований день після останнього виконання
+        if self.last_completed_date is None or day > next_scheduled_day(self.last_completed_date, self.weekday_mask):
+            return 0
+        return self.current_streak
+
+    def completion_rate_on(self, day):
+        scheduled = scheduled_days_between(self.habit.start_date, day, self.weekday_mask)
+        if not scheduled:
+            return None
+        return round(min(self.completed_count / scheduled, 1), 4)
+
+
+class HabitDailyRollup(models.Model):
+    """
+    Per habit and day counters used by analytics instead of the raw records.
+    Maintained by the update_habit_rollups task from the records changed since its last run.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, related_name="daily_rollups")
+    date = models.DateField()
+    record_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    scheduled_completed_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("habit", "date")
+        indexes = [
+            models.Index(fields=["user", "date"], name="rollup_user_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.habit.name} — {self.date} — {self.completed_count}/{self.record_count}"
+
+
+class ExportJob(models.Model):
+    """
+    A gzip-compressed export of the user's full habit history, built in the background by the
+    generate_habit_export task for histories too large to download in one streamed request.
+    """
+
+    FORMATS = [
+        ("ndjson", "NDJSON"),
+        ("csv", "CSV"),
+    ]
+    STATUSES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="export_jobs")
+    file_format = models.CharField(max_length=10, choices=FORMATS, default="ndjson")
+    status = models.CharField(max_length=10, choices=STATUSES, default="pending")
+    file = models.FileField(upload_to="exports/", blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"], name="export_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} — {self.file_format} — {self.status}"
+
+
+class ImportJob(models.Model):
+    """
+    An uploaded habit history file (NDJSON or CSV, optionally gzip-compressed) and the progress
+    of importing it. Large files are imported by the import_habit_file task.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="import_jobs")
+    file_format = models.CharField(max_length=10, choices=ExportJob.FORMATS, default="ndjson")
+    status = models.CharField(max_length=10, choices=ExportJob.STATUSES, default="pending")
+    file = models.FileField(upload_to="imports/", blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    imported_rows = models.PositiveIntegerField(default=0)
+    failed_rows = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"], name="import_user_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} — {self.file_format} — {self.status}"
+
+
+class TaskWatermark(models.Model):
+    """
+    Remembers up to which moment a periodic background job has already done its work,
+    so that after a restart it resumes from that point instead of skipping or repeating it.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,123 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique composite ordering, e.g. ("-date", "-id").
+
+    The cursor carries the ordering values of the last row of the page and the next page
+    is selected with a range condition on them, so each page is a single index range scan
+    regardless of how deep the client pages. Views choose the ordering with `cursor_ordering`;
+    its last field has to be unique.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    ordering = ("-id",)
+    invalid_cursor_message = "Невірний курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views: the page is fetched with async iteration."""
+        return self.set_page([row async for row in self.get_page_queryset(queryset, request, view)])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """The rows of the requested page plus one, which tells whether there is a next page."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = getattr(view, "cursor_ordering", self.ordering)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.get_position_filter(position))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_position_filter(self, position):
+        """
+        Builds `(a, b, c) > (x, y, z)` for the ordering fields as
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z), flipping the comparison
+        for descending fields. The first field also gets a plain bound to keep the scan narrow.
+        """
+        fields = [(field.lstrip("-"), field.startswith("-")) for field in self.ordering]
+        first_name, first_desc = fields[0]
+        condition = Q()
+        equal = Q()
+
+        for (name, desc), value in zip(fields, position):
+            condition |= equal & Q(**{f"{name}__{'lt' if desc else 'gt'}": value})
+            equal &= Q(**{name: value})
+
+        return Q(**{f"{first_name}__{'lte' if first_desc else 'gte'}": position[0]}) & condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+        except (BinasciiError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, row):
+        position = [getattr(row, field.lstrip("-")) for field in self.ordering]
+        # isoformat() keeps microseconds, which DjangoJSONEncoder would cut off
+        dumped = json.dumps(position, default=lambda value: value.isoformat())
+        return urlsafe_b64encode(dumped.encode("ascii")).decode("ascii")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_data(self, data):
+        return {"next": self.get_next_link(), "results": data}
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
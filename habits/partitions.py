@@ -0,0 +1,124 @@
+"""
+Monthly partitions of the habit record table on Postgres (see migration 0015).
+
+Each month of `date` lives in its own partition, named habits_habitrecord_pYYYY_MM, and
+queries bounded by date only read the partitions of their range. Records outside every month
+partition go to habits_habitrecord_default; creating a partition moves its month out of there.
+maintain_record_partitions keeps HABIT_RECORD_PARTITIONS_AHEAD months ahead created and
+detaches partitions older than HABIT_RECORD_RETENTION_MONTHS, leaving them as standalone
+tables to dump or drop. Only empty partitions are detached, and months that are not entirely
+past the archive horizon never are, whatever the retention: their records have to be moved
+into the archive first (see habits.archive). On other databases the table is not partitioned and nothing is done.
+"""
+
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .archive import archive_horizon
+from .models import HabitRecord
+
+TABLE = HabitRecord._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    month = day.year * 12 + day.month - 1 + months
+    return day.replace(year=month // 12, month=month % 12 + 1, day=1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def records_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)", [TABLE])
+        return cursor.fetchone()[0]
+
+
+def record_partitions():
+    """{first day of month: partition name} of the attached month partitions."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLE],
+        )
+        names = [name for (name,) in cursor]
+    matches = [(PARTITION_NAME.match(name), name) for name in names]
+    return {date(int(m[1]), int(m[2]), 1): name for m, name in matches if m}
+
+
+def create_record_partition(month):
+    """Creates the partition of `month`, moving its records out of the default partition."""
+    name = connection.ops.quote_name(partition_name(month))
+    table = connection.ops.quote_name(TABLE)
+    bounds = [month, add_months(month, 1)]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)")
+        # Поки розділу не було, записи цього місяця потрапляли в розділ за замовчуванням
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {connection.ops.quote_name(DEFAULT_PARTITION)} "
+            f"WHERE date >= %s AND date < %s RETURNING *) INSERT INTO {name} SELECT * FROM moved",
+            bounds,
+        )
+        cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+    return partition_name(month)
+
+
+def ensure_record_partitions(ahead=None, today=None):
+    """Creates the missing partitions from the current month to `ahead` months later; returns their names."""
+    if not records_partitioned():
+        return []
+    ahead = settings.HABIT_RECORD_PARTITIONS_AHEAD if ahead is None else ahead
+    current = month_start(today or timezone.localdate())
+    existing = record_partitions()
+    months = [add_months(current, offset) for offset in range(ahead + 1)]
+    return [create_record_partition(month) for month in months if month not in existing]
+
+
+def detach_record_partitions(before):
+    """
+    Detaches the empty partitions of the months before `before`, but not later than the month
+    of the archive horizon; their tables are kept. A partition that still holds records, e.g.
+    ones archive_records has not moved yet, stays attached. Returns the detached names.
+    """
+    if not records_partitioned():
+        return []
+    # Записи новіших місяців ще не в архіві, і без розділу вони зникли б з API
+    before = min(month_start(before), month_start(archive_horizon()))
+    table = connection.ops.quote_name(TABLE)
+    detached = []
+    for month, name in sorted(record_partitions().items()):
+        if month >= before:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Порожнечу перевіряємо вже після від'єднання: блокування тримає нові записи до коміту
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {connection.ops.quote_name(name)}")
+            cursor.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {connection.ops.quote_name(name)})")
+            if cursor.fetchone()[0]:
+                detached.append(name)
+            else:
+                transaction.set_rollback(True)
+    return detached
+
+
+def maintain_record_partitions(today=None):
+    """Creates the partitions ahead and detaches the ones past HABIT_RECORD_RETENTION_MONTHS (if set)."""
+    today = today or timezone.localdate()
+    created = ensure_record_partitions(today=today)
+    detached = []
+    if settings.HABIT_RECORD_RETENTION_MONTHS:
+        detached = detach_record_partitions(add_months(today, -settings.HABIT_RECORD_RETENTION_MONTHS))
+    return {"created": created, "detached": detached}
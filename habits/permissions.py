@@ -2,21 +2,17 @@ from rest_framework import permissions
 
 
 class IsOwner(permissions.BasePermission):
+    """
+    Grants access to objects nested under a habit of the current user.
+    The habit is resolved once per request by the view's get_habit(), so neither check
+    issues extra queries.
+    """
+
     def has_object_permission(self, request, view, obj):
-        return request.user == obj.habit.user
+        return obj.habit_id == view.get_habit().id
 
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
 
-        if view.action == "create":
-            habit_id = request.parser_context["kwargs"].get("habit_pk")
-            from habits.models import Habit
-
-            try:
-                habit = Habit.objects.get(id=habit_id)
-            except Habit.DoesNotExist:
-                return False
-            return habit.user == request.user
-
-        return True
+        return view.get_habit().user_id == request.user.id
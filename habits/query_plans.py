@@ -0,0 +1,112 @@
+"""
+The hot queries of the API and the index each of them is meant to use, checked with EXPLAIN.
+
+HOT_QUERIES mirrors what the views, tasks and stats code run on every request or batch. The
+tests explain them on a tiny dataset with sequential scans disabled, which proves that an
+index able to serve the query exists and is picked over the others; benchmark_api explains
+them on its seeded dataset, where the planner decides with realistic statistics.
+"""
+
+import re
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .dashboard import due_habits
+from .models import ExportJob, Habit, HabitDailyRollup, HabitRecord, ImportJob
+from .reminders import due_reminders
+
+# Списки читаються сторінками KeysetPagination, а LIMIT впливає на вибір плану
+PAGE = 51
+
+HOT_QUERIES = [
+    {
+        "name": "habit list",
+        "index": "habit_user_created_idx",
+        "query": lambda c: Habit.objects.filter(user_id=c["user"].id).order_by("-created_at", "-id")[:PAGE],
+    },
+    {
+        "name": "today dashboard",
+        "index": "habit_user_active_idx",
+        "query": lambda c: due_habits(c["user"], c["today"]),
+    },
+    {
+        "name": "habit records",
+        "index": "record_habit_date_idx",
+        "query": lambda c: HabitRecord.objects.filter(habit_id=c["habit"].id).order_by("-date")[:PAGE],
+    },
+    {
+        "name": "completed records in range",
+        "index": "record_completed_idx",
+        "query": lambda c: HabitRecord.objects.filter(
+            habit_id=c["habit"].id, completed=True, date__range=(c["today"] - timedelta(days=30), c["today"])
+        ),
+    },
+    {
+        "name": "streak rebuild",
+        "index": "record_completed_idx",
+        "query": lambda c: HabitRecord.objects.filter(habit_id=c["habit"].id, completed=True)
+        .order_by("date")
+        .values_list("date", flat=True),
+    },
+    {
+        "name": "analytics rollups",
+        "index": "rollup_user_date_idx",
+        "query": lambda c: HabitDailyRollup.objects.filter(
+            user_id=c["user"].id, date__range=(c["today"] - timedelta(days=30), c["today"])
+        ),
+    },
+    {
+        "name": "due reminders",
+        "index": "schedule_next_fire_idx",
+        "query": lambda c: due_reminders(timezone.now()),
+    },
+    {
+        "name": "export jobs",
+        "index": "export_user_created_idx",
+        "query": lambda c: ExportJob.objects.filter(user_id=c["user"].id).order_by("-created_at", "-id")[:PAGE],
+    },
+    {
+        "name": "import jobs",
+        "index": "import_user_created_idx",
+        "query": lambda c: ImportJob.objects.filter(user_id=c["user"].id).order_by("-created_at", "-id")[:PAGE],
+    },
+]
+
+
+def query_plan(queryset, avoid_seq_scan=False):
+    """EXPLAIN output of a queryset; `avoid_seq_scan` makes Postgres use an index wherever one fits."""
+    with transaction.atomic():
+        if avoid_seq_scan and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+
+def uses_index(plan, index):
+    # Postgres пише "Index Scan using <name>", SQLite — "USING INDEX <name>"
+    return re.search(rf"\b{re.escape(index)}\b", plan) is not None
+
+
+def index_names(index):
+    """The index and, on Postgres, the indexes of its partitions, which plans of a partitioned table name instead."""
+    if connection.vendor != "postgresql":
+        return [index]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [index],
+        )
+        return [index] + [name for (name,) in cursor]
+
+
+def check_query_plans(context, avoid_seq_scan=False):
+    """Explains every hot query for `context` ({"user", "habit", "today"}); returns [(name, index, ok, plan)]."""
+    results = []
+    for hot_query in HOT_QUERIES:
+        plan = query_plan(hot_query["query"](context), avoid_seq_scan)
+        ok = any(uses_index(plan, index) for index in index_names(hot_query["index"]))
+        results.append((hot_query["name"], hot_query["index"], ok, plan))
+    return results
@@ -0,0 +1,98 @@
+from django.db import transaction
+from rest_framework import serializers
+
+from .cache import bump_user_version
+from .events import publish_event
+from .models import Habit, HabitDailyRollup, HabitRecord
+from .stats import rebuild_habit_stats, record_deleted
+from .utils import habit_owner_id
+
+
+def upsert_habit_records(user, items, item_serializer):
+    """
+    Validates and saves a batch of records spanning any number of the user's habits.
+
+    Ownership of all mentioned habits is checked with a single query and the valid items are
+    written with one INSERT ... ON CONFLICT (habit, date) DO UPDATE per batch. Returns
+    a result per item in the order they were given; a later item for the same habit and
+    date overrides an earlier one.
+    """
+    results = []
+    valid = {}
+
+    for index, item in enumerate(items):
+        try:
+            data = item_serializer.run_validation(item)
+        except serializers.ValidationError as exc:
+            results.append({"index": index, "status": "error", "errors": exc.detail})
+            continue
+        results.append({"index": index, "status": "ok"})
+        valid[index] = data
+
+    habit_ids = {data["habit"] for data in valid.values()}
+    owned = set(Habit.objects.filter(user_id=user.id, id__in=habit_ids).values_list("id", flat=True))
+
+    records = {}
+    for index, data in valid.items():
+        if data["habit"] not in owned:
+            results[index] = {"index": index, "status": "error", "errors": {"habit": ["Звичку не знайдено."]}}
+            continue
+        records[(data["habit"], data["date"])] = HabitRecord(
+            habit_id=data["habit"],
+            date=data["date"],
+            completed=data["completed"],
+            completed_at=data.get("completed_at"),
+        )
+
+    with transaction.atomic():
+        HabitRecord.objects.bulk_create(
+            records.values(),
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["habit", "date"],
+            update_fields=["completed", "completed_at", "updated_at"],
+        )
+        # bulk_create не надсилає сигнали, тому статистику оновлюємо один раз на звичку
+        for habit_id in {habit_id for habit_id, _ in records}:
+            rebuild_habit_stats(habit_id)
+
+    if records:
+        bump_user_version(user.id)
+        publish_event(
+            user.id,
+            "records.saved",
+            {
+                "records": [
+                    {
+                        "habit": record.habit_id,
+                        "date": record.date,
+                        "completed": record.completed,
+                        "completed_at": record.completed_at,
+                    }
+                    for record in records.values()
+                ]
+            },
+        )
+
+    return results
+
+
+def record_moved(record, previous_date):
+    """
+    Drops the rollup row of the day a record was moved away from, as deleting the record would;
+    the rollup of its new day is written by the next update_rollups run.
+    """
+    if record.date != previous_date:
+        HabitDailyRollup.objects.filter(habit_id=record.habit_id, date=previous_date).delete()
+
+
+def delete_habit_record(record):
+    """Deletes one record and updates the stats, rollup and cached responses derived from it."""
+    record_id = record.id
+    with transaction.atomic():
+        record.delete()
+        record_deleted(record)
+        HabitDailyRollup.objects.filter(habit_id=record.habit_id, date=record.date).delete()
+    user_id = habit_owner_id(record)
+    bump_user_version(user_id)
+    publish_event(user_id, "record.deleted", {"id": record_id, "habit": record.habit_id, "date": record.date})
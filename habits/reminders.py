@@ -0,0 +1,56 @@
+"""
+Reminder timing: every HabitSchedule row keeps the UTC instant its next reminder fires at in
+next_fire_at, computed from the weekday and time in the owner's time zone. The dispatcher only
+has to range-scan the partial next_fire_at index and move the rows it sends to their next
+occurrence; nothing is evaluated per row or per minute.
+"""
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from users.utils import get_timezone, get_user_timezone
+
+from .models import HabitSchedule
+from .schedules import next_reminder_at
+
+
+def schedule_next_fire_at(schedule, tzinfo, after=None):
+    return next_reminder_at(
+        schedule.day_of_week, schedule.remind_hour, schedule.remind_minute, tzinfo, after or timezone.now()
+    )
+
+
+def due_reminders(now):
+    """
+    Schedules with an enabled reminder due by `now`, oldest first, each annotated with
+    owner_id, owner_is_active and owner_timezone. Rows are locked FOR UPDATE SKIP LOCKED, so the queryset
+    must be evaluated inside a transaction and concurrent dispatchers never get the same row.
+    """
+    return (
+        HabitSchedule.objects.select_for_update(skip_locked=True, of=("self",))
+        .filter(reminder_enabled=True, next_fire_at__lte=now)
+        .annotate(
+            owner_id=F("habit__user_id"),
+            owner_is_active=F("habit__user__is_active"),
+            owner_timezone=F("habit__user__profile__timezone"),
+        )
+        .order_by("next_fire_at")
+    )
+
+
+def advance_reminders(schedules, now):
+    """Moves schedules from due_reminders to their first occurrence after `now` with one UPDATE."""
+    for schedule in schedules:
+        schedule.next_fire_at = schedule_next_fire_at(schedule, get_timezone(schedule.owner_timezone), now)
+    HabitSchedule.objects.bulk_update(schedules, ["next_fire_at"])
+
+
+def reschedule_user_reminders(user):
+    """Recomputes next_fire_at of all the user's schedules, e.g. after their time zone changed."""
+    tzinfo = get_user_timezone(user)
+    now = timezone.now()
+    schedules = list(HabitSchedule.objects.filter(habit__user=user))
+    for schedule in schedules:
+        schedule.next_fire_at = schedule_next_fire_at(schedule, tzinfo, now)
+    HabitSchedule.objects.bulk_update(schedules, ["next_fire_at"], batch_size=settings.REMINDER_BATCH_SIZE)
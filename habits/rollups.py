@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Value, When
+from django.utils import timezone
+
+from .analytics import planned_on_record_day
+from .bitmaps import bitmap_days, bytes_bitmap
+from .models import (
+    Habit,
+    HabitDailyRollup,
+    HabitRecord,
+    HabitRecordArchive,
+    HabitSchedule,
+    TaskWatermark,
+)
+from .utils import chunked
+
+ROLLUP_WATERMARK = "habit_daily_rollup"
+
+
+def get_rollup_watermark():
+    return TaskWatermark.objects.filter(name=ROLLUP_WATERMARK).values_list("value", flat=True).first()
+
+
+async def aget_rollup_watermark():
+    return await TaskWatermark.objects.filter(name=ROLLUP_WATERMARK).values_list("value", flat=True).afirst()
+
+
+def roll_up_records(records, batch_size):
+    """Writes rollup rows for the given records, replacing the rows of the same habit and day."""
+    rows = (
+        records.annotate(
+            planned=Case(When(planned_on_record_day(), then=Value(1)), default=Value(0), output_field=IntegerField())
+        )
+        .order_by()
+        .values_list("habit_id", "habit__user_id", "date", "completed", "planned")
+        .iterator(chunk_size=batch_size)
+    )
+    return write_rollups(rows, batch_size)
+
+
+def roll_up_archives(batch_size):
+    """Writes rollup rows for the archived days (see habits.archive), which are no longer among the records."""
+    masks = {}
+    for habit_id, day in HabitSchedule.objects.values_list("habit_id", "day_of_week").iterator(chunk_size=batch_size):
+        masks[habit_id] = masks.get(habit_id, 0) | 1 << day
+
+    archives = HabitRecordArchive.objects.values_list(
+        "habit_id", "habit__user_id", "year", "recorded", "completed"
+    ).iterator(chunk_size=batch_size)
+    return write_rollups(archived_rollup_rows(archives, masks), batch_size)
+
+
+def archived_rollup_rows(archives, masks):
+    for habit_id, user_id, year, recorded, completed in archives:
+        mask = masks.get(habit_id, 0)
+        completed_days = set(bitmap_days(year, bytes_bitmap(completed)))
+        for day in bitmap_days(year, bytes_bitmap(recorded)):
+            yield habit_id, user_id, day, day in completed_days, int(not mask or mask >> day.weekday() & 1)
+
+
+def write_rollups(rows, batch_size):
+    """Saves (habit_id, user_id, date, completed, planned) rows as HabitDailyRollup, replacing existing ones."""
+    total = 0
+    for batch in chunked(rows, batch_size):
+        HabitDailyRollup.objects.bulk_create(
+            [
+                HabitDailyRollup(
+                    habit_id=habit_id,
+                    user_id=user_id,
+                    date=day,
+                    record_count=1,
+                    completed_count=int(completed),
+                    scheduled_completed_count=int(completed) * planned,
+                )
+                for habit_id, user_id, day, completed, planned in batch
+            ],
+            update_conflicts=True,
+            unique_fields=["habit", "date"],
+            update_fields=["record_count", "completed_count", "scheduled_completed_count"],
+        )
+        total += len(batch)
+    return total
+
+
+def update_rollups(batch_size=1000, rebuild=False):
+    """
+    Rolls up the records changed since the previous run and moves the watermark forward.
+
+    Records saved in the last ROLLUP_SAFETY_LAG_SECONDS are left for the next run, so that
+    a transaction committing late with an older updated_at is not skipped. With `rebuild`
+    the table is emptied and filled from all records; the first run and rebuilds also roll
+    up the archived days.
+    """
+    until = timezone.now() - timedelta(seconds=settings.ROLLUP_SAFETY_LAG_SECONDS)
+
+    with transaction.atomic():
+        watermark = TaskWatermark.objects.select_for_update().filter(name=ROLLUP_WATERMARK).first()
+        records = HabitRecord.objects.filter(updated_at__lte=until)
+
+        total = 0
+        if rebuild:
+            HabitDailyRollup.objects.all().delete()
+        elif watermark is not None:
+            records = records.filter(updated_at__gt=watermark.value)
+        if rebuild or watermark is None:
+            # Архівних днів немає серед записів; записи тих самих днів потім перезапишуть їхні рядки
+            total += roll_up_archives(batch_size)
+
+        total += roll_up_records(records, batch_size)
+        TaskWatermark.objects.update_or_create(name=ROLLUP_WATERMARK, defaults={"value": until})
+
+    return total
+
+
+def refresh_rollup_schedule(habit_id):
+    """Recounts completions on planned days of a habit after its schedule changed."""
+    days = list(HabitSchedule.objects.filter(habit_id=habit_id).values_list("day_of_week", flat=True))
+    rollups = HabitDailyRollup.objects.filter(habit_id=habit_id)
+    if days:
+        rollups.exclude(date__iso_week_day__in=[day + 1 for day in days]).update(scheduled_completed_count=0)
+        rollups = rollups.filter(date__iso_week_day__in=[day + 1 for day in days])
+    rollups.update(scheduled_completed_count=F("completed_count"))
+
+
+def analytics_sources(user, records, params, watermark, habit_pk=None, use_rollups=True):
+    """
+    The querysets habit_analytics reads for the user or one of their habits: `records`
+    limited to them, their habits and, when the rollup table has a watermark, the rollup
+    rows within the requested dates plus only the records changed after the watermark.
+    Returns (records, habits, rollups); rollups is None when raw records have to be used.
+    """
+    records = records.filter(habit__user_id=user.id)
+    habits = Habit.objects.filter(user_id=user.id)
+    rollups = HabitDailyRollup.objects.filter(user_id=user.id)
+
+    if habit_pk:
+        records = records.filter(habit_id=habit_pk)
+        habits = habits.filter(pk=habit_pk)
+        rollups = rollups.filter(habit_id=habit_pk)
+
+    # Агрегати беремо з rollup-таблиці, а сирі записи — лише ті, що змінились після її оновлення
+    if watermark is None or not use_rollups:
+        return records, habits, None
+    if "start_date" in params:
+        rollups = rollups.filter(date__gte=params["start_date"])
+    if "end_date" in params:
+        rollups = rollups.filter(date__lte=params["end_date"])
+    rollups, records = split_by_watermark(records, rollups, watermark)
+    return records, habits, rollups
+
+
+def split_by_watermark(records, rollups, watermark):
+    """
+    Splits an analytics source into rollup rows and the raw records changed after the watermark.
+    Rollup rows of the habit days that changed since then are left out; the raw records replace them.
+    """
+    fresh = records.filter(updated_at__gt=watermark)
+    changed = HabitRecord.objects.filter(habit=OuterRef("habit"), date=OuterRef("date"), updated_at__gt=watermark)
+    return rollups.exclude(Exists(changed)), fresh
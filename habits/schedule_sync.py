@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.utils import timezone
+
+from users.utils import get_user_timezone
+
+from .cache import bump_user_version
+from .models import HabitSchedule
+from .reminders import schedule_next_fire_at
+from .rollups import refresh_rollup_schedule
+from .stats import rebuild_habit_stats
+from .utils import habit_owner_id
+
+
+def sync_schedule_days(habit_id):
+    """Brings the data derived from a habit's planned weekdays up to date after they changed."""
+    rebuild_habit_stats(habit_id)
+    refresh_rollup_schedule(habit_id)
+
+
+def delete_habit_schedule(schedule):
+    """Deletes one schedule entry and refreshes what is derived from the habit's planned days."""
+    with transaction.atomic():
+        schedule.delete()
+        sync_schedule_days(schedule.habit_id)
+    bump_user_version(habit_owner_id(schedule))
+
+
+def replace_habit_schedule(habit, items):
+    """
+    Makes the habit's weekly schedule exactly `items` (dicts with day_of_week, remind_hour and
+    remind_minute) in one transaction.
+
+    Only the rows that differ are deleted, updated or created, each kind with one query, and
+    stats, rollups and cached responses are refreshed once for the whole change rather than
+    once per row. Returns the new schedule ordered by day.
+    """
+    wanted = {item["day_of_week"]: item for item in items}
+    tzinfo = get_user_timezone(habit.user)
+    now = timezone.now()
+
+    with transaction.atomic():
+        existing = {
+            schedule.day_of_week: schedule
+            for schedule in HabitSchedule.objects.select_for_update().filter(habit=habit).order_by("day_of_week")
+        }
+        removed = [schedule.id for day, schedule in existing.items() if day not in wanted]
+        changed = []
+        created = []
+
+        for day, item in wanted.items():
+            schedule = existing.get(day)
+            if schedule is None:
+                schedule = HabitSchedule(habit=habit, reminder_enabled=habit.is_active, **item)
+                schedule.next_fire_at = schedule_next_fire_at(schedule, tzinfo, now)
+                created.append(schedule)
+            elif (schedule.remind_hour, schedule.remind_minute) != (item["remind_hour"], item["remind_minute"]):
+                schedule.remind_hour = item["remind_hour"]
+                schedule.remind_minute = item["remind_minute"]
+                schedule.next_fire_at = schedule_next_fire_at(schedule, tzinfo, now)
+                changed.append(schedule)
+
+        # Пакетні операції не надсилають сигнали, синхронізуємо нижче один раз
+        if removed:
+            HabitSchedule.objects.filter(id__in=removed).delete()
+        if changed:
+            HabitSchedule.objects.bulk_update(changed, ["remind_hour", "remind_minute", "next_fire_at"])
+        if created:
+            HabitSchedule.objects.bulk_create(created)
+
+        if removed or created:
+            sync_schedule_days(habit.id)
+
+    if removed or changed or created:
+        bump_user_version(habit.user_id)
+
+    kept = [schedule for day, schedule in existing.items() if day in wanted]
+    return sorted(kept + created, key=lambda schedule: schedule.day_of_week)
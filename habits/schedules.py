@@ -0,0 +1,65 @@
+"""
+Arithmetic over the weekly schedule of a habit.
+
+A schedule is represented as a weekday mask: bit N is set when the habit is planned for
+HabitSchedule.day_of_week == N (0 is Monday, like date.weekday()). An empty mask means the
+habit has no schedule and every day counts as planned.
+
+Reminder times are wall-clock times in the user's time zone and are turned into UTC instants
+with next_reminder_at, which is where daylight saving transitions are dealt with.
+"""
+
+from datetime import datetime, time, timedelta, timezone
+
+EVERY_DAY = 0b1111111
+
+
+def weekday_mask(days_of_week):
+    mask = 0
+    for day in days_of_week:
+        mask |= 1 << day
+    return mask
+
+
+def is_scheduled(day, mask):
+    return not mask or bool(mask >> day.weekday() & 1)
+
+
+def next_scheduled_day(day, mask):
+    """Returns the first planned day strictly after the given one."""
+    for offset in range(1, 8):
+        candidate = day + timedelta(days=offset)
+        if is_scheduled(candidate, mask):
+            return candidate
+
+
+def scheduled_days_between(start, end, mask):
+    """Counts planned days in the inclusive range [start, end] without iterating over it."""
+    if end < start:
+        return 0
+
+    mask = mask or EVERY_DAY
+    weeks, remainder = divmod((end - start).days + 1, 7)
+    tail = sum(1 for offset in range(remainder) if mask >> (start.weekday() + offset) % 7 & 1)
+    return weeks * mask.bit_count() + tail
+
+
+def next_reminder_at(day_of_week, hour, minute, tzinfo, after):
+    """
+    Returns the first instant strictly after `after` (aware) at which a weekly reminder set for
+    day_of_week at hour:minute local time in `tzinfo` fires, in UTC.
+
+    A local time skipped by a spring-forward transition fires as many minutes after the
+    transition as it was meant to be after the start of the gap (02:30 becomes 03:30 when
+    clocks jump from 02:00 to 03:00). A local time that occurs twice on a fall-back transition
+    fires once, at its first occurrence.
+    """
+    local_after = after.astimezone(tzinfo)
+    day = local_after.date() + timedelta(days=(day_of_week - local_after.weekday()) % 7)
+
+    while True:
+        # fold=0 дає першу появу неоднозначного часу, а для пропущеного бере зсув до переходу
+        fire_at = datetime.combine(day, time(hour, minute), tzinfo=tzinfo).astimezone(timezone.utc)
+        if fire_at > after:
+            return fire_at
+        day += timedelta(weeks=1)
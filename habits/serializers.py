@@ -1,10 +1,33 @@
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Habit, HabitRecord, HabitSchedule
+from users.utils import user_localdate
+
+from .analytics import DEFAULT_METRICS, GRANULARITIES, METRICS
+from .models import ExportJob, Habit, HabitRecord, HabitSchedule, HabitStats, ImportJob
+from .utils import guess_file_format
+
+
+class HabitStatsSerializer(serializers.ModelSerializer):
+    current_streak = serializers.SerializerMethodField()
+    completion_rate = serializers.SerializerMethodField()
+
+    class Meta:
+        model = HabitStats
+        fields = ("current_streak", "longest_streak", "completed_count", "completion_rate", "last_completed_date")
+
+    # Сьогодні — за часовим поясом власника звички, як і на дашборді
+    def get_current_streak(self, obj):
+        return obj.current_streak_on(user_localdate(obj.habit.user))
+
+    def get_completion_rate(self, obj):
+        return obj.completion_rate_on(user_localdate(obj.habit.user))
 
 
 class HabitSerializer(serializers.ModelSerializer):
     created_at = serializers.DateTimeField(read_only=True, format="%d-%m-%Y %H:%M:%S")
+    stats = HabitStatsSerializer(read_only=True, allow_null=True)
 
     class Meta:
         model = Habit
@@ -12,11 +35,28 @@ class HabitSerializer(serializers.ModelSerializer):
         read_only_fields = ("user", "created_at")
 
 
+class HabitEventSerializer(serializers.ModelSerializer):
+    """A habit in real-time events; stats are left out, clients follow them from record events."""
+
+    created_at = serializers.DateTimeField(read_only=True, format="%d-%m-%Y %H:%M:%S")
+
+    class Meta:
+        model = Habit
+        fields = ("id", "user", "name", "description", "start_date", "is_active", "created_at")
+
+
 class HabitScheduleSerializer(serializers.ModelSerializer):
     class Meta:
         model = HabitSchedule
-        fields = "__all__"
-        read_only_fields = ("habit",)
+        # next_fire_at лишається внутрішнім: диспетчер оновлює його щотижня, не скидаючи кеш відповідей
+        fields = ("id", "habit", "day_of_week", "remind_hour", "remind_minute", "reminder_enabled")
+        read_only_fields = ("habit", "reminder_enabled")
+
+
+class HabitScheduleBulkItemSerializer(serializers.Serializer):
+    day_of_week = serializers.ChoiceField(choices=HabitSchedule.DAYS_OF_WEEK)
+    remind_hour = serializers.IntegerField(min_value=0, max_value=23, default=9)
+    remind_minute = serializers.IntegerField(min_value=0, max_value=59, default=0)
 
 
 class HabitRecordSerializer(serializers.ModelSerializer):
@@ -24,3 +64,135 @@ class HabitRecordSerializer(serializers.ModelSerializer):
         model = HabitRecord
         fields = "__all__"
         read_only_fields = ("habit",)
+
+
+class HabitRecordBulkItemSerializer(serializers.Serializer):
+    habit = serializers.IntegerField()
+    date = serializers.DateField()
+    completed = serializers.BooleanField(default=False)
+    completed_at = serializers.DateTimeField(required=False, allow_null=True)
+
+
+class TodayParamsSerializer(serializers.Serializer):
+    date = serializers.DateField(required=False)
+
+
+class TodayHabitSerializer(serializers.ModelSerializer):
+    """A habit of the today dashboard; expects querysets from habits.dashboard.due_habits."""
+
+    record = serializers.SerializerMethodField()
+    current_streak = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Habit
+        fields = ("id", "name", "description", "record", "current_streak")
+
+    def get_record(self, obj):
+        if obj.record_id is None:
+            return None
+        return {
+            "id": obj.record_id,
+            "completed": obj.record_completed,
+            "completed_at": serializers.DateTimeField().to_representation(obj.record_completed_at),
+        }
+
+    def get_current_streak(self, obj):
+        stats = getattr(obj, "stats", None)
+        return stats.current_streak_on(self.context["date"]) if stats else 0
+
+
+class HabitExportParamsSerializer(serializers.Serializer):
+    file_format = serializers.ChoiceField(choices=ExportJob.FORMATS, default="ndjson")
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = ("id", "file_format", "status", "error", "created_at", "finished_at", "download_url")
+        read_only_fields = ("status", "error", "created_at", "finished_at")
+
+    def get_download_url(self, obj):
+        if obj.status != "done":
+            return None
+        return self.context["request"].build_absolute_uri(reverse("export-job-download", args=[obj.id]))
+
+
+class HabitImportRowSerializer(serializers.Serializer):
+    """
+    One row of an imported history. `type` tells whether it describes a habit, a schedule
+    entry or a record; habits are referred to by name.
+    """
+
+    REQUIRED_FIELDS = {"habit": (), "schedule": ("day_of_week",), "record": ("date",)}
+
+    type = serializers.ChoiceField(choices=tuple(REQUIRED_FIELDS), default="record")
+    habit = serializers.CharField(max_length=100)
+    description = serializers.CharField(required=False, allow_blank=True)
+    start_date = serializers.DateField(required=False)
+    is_active = serializers.BooleanField(default=True)
+    day_of_week = serializers.ChoiceField(choices=HabitSchedule.DAYS_OF_WEEK, required=False)
+    remind_hour = serializers.IntegerField(min_value=0, max_value=23, default=9)
+    remind_minute = serializers.IntegerField(min_value=0, max_value=59, default=0)
+    date = serializers.DateField(required=False)
+    completed = serializers.BooleanField(default=False)
+    completed_at = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        missing = [name for name in self.REQUIRED_FIELDS[attrs["type"]] if name not in attrs]
+        if missing:
+            raise serializers.ValidationError({name: ["Обов'язкове поле."] for name in missing})
+        return attrs
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    file = serializers.FileField(write_only=True)
+    file_format = serializers.ChoiceField(choices=ExportJob.FORMATS, required=False)
+
+    class Meta:
+        model = ImportJob
+        fields = (
+            "id",
+            "file",
+            "file_format",
+            "status",
+            "processed_rows",
+            "imported_rows",
+            "failed_rows",
+            "errors",
+            "created_at",
+            "finished_at",
+        )
+        read_only_fields = (
+            "status",
+            "processed_rows",
+            "imported_rows",
+            "failed_rows",
+            "errors",
+            "created_at",
+            "finished_at",
+        )
+
+    def validate(self, attrs):
+        if "file_format" not in attrs:
+            attrs["file_format"] = guess_file_format(attrs["file"].name)
+        return attrs
+
+
+class HabitCalendarParamsSerializer(serializers.Serializer):
+    year = serializers.IntegerField(min_value=1, max_value=9999, default=lambda: timezone.localdate().year)
+
+
+class HabitAnalyticsParamsSerializer(serializers.Serializer):
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, default="day")
+    metrics = serializers.CharField(default=",".join(DEFAULT_METRICS))
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+
+    def validate_metrics(self, value):
+        metrics = [metric.strip() for metric in value.split(",") if metric.strip()]
+        unknown = set(metrics) - set(METRICS)
+        if unknown or not metrics:
+            raise serializers.ValidationError(f"Доступні метрики: {', '.join(METRICS)}.")
+        return tuple(dict.fromkeys(metrics))
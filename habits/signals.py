@@ -1,17 +1,70 @@
-from django.db.models.signals import post_delete, post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from django_celery_beat.models import PeriodicTask
 
-from .models import HabitSchedule
-from .utils import create_or_update_task_for_schedule
+from users.models import Profile
+from users.utils import get_user_timezone
 
+from .cache import bump_user_version
+from .events import publish_event
+from .models import Habit, HabitRecord, HabitSchedule, HabitStats
+from .reminders import reschedule_user_reminders, schedule_next_fire_at
+from .schedule_sync import sync_schedule_days
+from .serializers import HabitEventSerializer, HabitRecordSerializer
+from .stats import record_saved
+from .utils import habit_owner_id
 
-@receiver(post_save, sender=HabitSchedule)
-def habit_schedule_save(sender, instance, **kwargs):
-    create_or_update_task_for_schedule(instance)
+# HabitRecord і HabitSchedule навмисно не мають обробників post_delete: тоді Django видаляє їх
+# разом зі звичкою одним DELETE, не завантажуючи рядки. Поодинокі видалення синхронізують
+# delete_habit_record і delete_habit_schedule.
+
+
+@receiver(post_save, sender=get_user_model())
+def user_save(sender, instance, **kwargs):
+    bump_user_version(instance.id)
+
+
+@receiver(post_save, sender=Profile)
+def profile_save(sender, instance, created, **kwargs):
+    if not created:
+        reschedule_user_reminders(instance.user)
+
+
+@receiver(post_save, sender=Habit)
+def habit_save(sender, instance, created, **kwargs):
+    if created:
+        HabitStats.objects.create(habit=instance)
+    else:
+        # Вмикає або вимикає всі нагадування звички одним UPDATE
+        HabitSchedule.objects.filter(habit=instance).exclude(reminder_enabled=instance.is_active).update(
+            reminder_enabled=instance.is_active
+        )
+    bump_user_version(instance.user_id)
+    publish_event(instance.user_id, "habit.saved", HabitEventSerializer(instance).data)
 
 
-@receiver(post_delete, sender=HabitSchedule)
-def habit_schedule_delete(sender, instance, **kwargs):
-    task_name = f"remind_habit_{instance.id}"
-    PeriodicTask.objects.filter(name=task_name).delete()
+@receiver(post_delete, sender=Habit)
+def habit_delete(sender, instance, **kwargs):
+    bump_user_version(instance.user_id)
+    publish_event(instance.user_id, "habit.deleted", {"id": instance.id})
+
+
+@receiver(post_save, sender=HabitRecord)
+def habit_record_save(sender, instance, created, **kwargs):
+    record_saved(instance, created)
+    user_id = habit_owner_id(instance)
+    bump_user_version(user_id)
+    publish_event(user_id, "record.saved", HabitRecordSerializer(instance).data)
+
+
+@receiver(pre_save, sender=HabitSchedule)
+def habit_schedule_pre_save(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance.reminder_enabled = instance.habit.is_active
+    instance.next_fire_at = schedule_next_fire_at(instance, get_user_timezone(instance.habit.user))
+
+
+@receiver(post_save, sender=HabitSchedule)
+def habit_schedule_save(sender, instance, **kwargs):
+    sync_schedule_days(instance.habit_id)
+    bump_user_version(habit_owner_id(instance))
@@ -0,0 +1,149 @@
+from itertools import groupby
+
+from django.db import transaction
+
+from .archive import archive_days, archive_horizon, merge_archived
+from .models import Habit, HabitRecord, HabitRecordArchive, HabitSchedule, HabitStats
+from .schedules import is_scheduled, next_scheduled_day, weekday_mask
+from .utils import chunked
+
+
+def compute_streaks(dates, mask):
+    """
+    Computes HabitStats counters from the ascending dates of completed records.
+    Completions on days outside of the schedule are ignored.
+    """
+    counters = {"completed_count": 0, "current_streak": 0, "longest_streak": 0, "last_completed_date": None}
+
+    for day in dates:
+        if not is_scheduled(day, mask):
+            continue
+
+        last = counters["last_completed_date"]
+        if last is not None and next_scheduled_day(last, mask) == day:
+            counters["current_streak"] += 1
+        else:
+            counters["current_streak"] = 1
+
+        counters["completed_count"] += 1
+        counters["longest_streak"] = max(counters["longest_streak"], counters["current_streak"])
+        counters["last_completed_date"] = day
+
+    return counters
+
+
+def get_weekday_mask(habit_id):
+    return weekday_mask(HabitSchedule.objects.filter(habit_id=habit_id).values_list("day_of_week", flat=True))
+
+
+def rebuild_habit_stats(habit_id):
+    """Recomputes the stats of one habit from its full history, archived days included."""
+    mask = get_weekday_mask(habit_id)
+    archives = list(HabitRecordArchive.objects.filter(habit_id=habit_id).order_by("year"))
+    if archives:
+        records = HabitRecord.objects.filter(habit_id=habit_id).order_by("date")
+        rows = merge_archived(
+            records.values_list("habit_id", "date", "completed").iterator(),
+            (day for archive in archives for day in archive_days(archive)),
+        )
+        dates = (day for _, day, completed in rows if completed)
+    else:
+        dates = (
+            HabitRecord.objects.filter(habit_id=habit_id, completed=True)
+            .order_by("date")
+            .values_list("date", flat=True)
+            .iterator()
+        )
+    stats, _ = HabitStats.objects.update_or_create(
+        habit_id=habit_id, defaults={"weekday_mask": mask, **compute_streaks(dates, mask)}
+    )
+    return stats
+
+
+def record_saved(record, created):
+    """
+    Updates the stats after a HabitRecord was saved.
+
+    Checking off a planned day after the latest completion, which is what happens almost
+    every time, only extends the streak. Any other change (an edit, a completion in the past)
+    may split or merge streaks, so the stats are rebuilt from the history.
+    """
+    if created and not record.completed:
+        # Невиконаний запис може змінити лише архівний день, який він заміняє
+        if record.date < archive_horizon():
+            rebuild_habit_stats(record.habit_id)
+        return
+
+    with transaction.atomic():
+        stats = HabitStats.objects.select_for_update().filter(habit_id=record.habit_id).first()
+        if stats is None:
+            rebuild_habit_stats(record.habit_id)
+            return
+
+        last = stats.last_completed_date
+        is_next_completion = (
+            created and is_scheduled(record.date, stats.weekday_mask) and (last is None or record.date > last)
+        )
+        if not is_next_completion:
+            rebuild_habit_stats(record.habit_id)
+            return
+
+        if last is not None and next_scheduled_day(last, stats.weekday_mask) == record.date:
+            stats.current_streak += 1
+        else:
+            stats.current_streak = 1
+
+        stats.completed_count += 1
+        stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+        stats.last_completed_date = record.date
+        stats.save()
+
+
+def record_deleted(record):
+    if record.completed:
+        rebuild_habit_stats(record.habit_id)
+
+
+def rebuild_all_habit_stats(batch_size=1000):
+    """
+    Rebuilds the whole HabitStats table in a single pass over the records and the archived
+    days, streamed in (habit, date) order. Returns the number of habits processed.
+    """
+    masks = {}
+    for habit_id, day in HabitSchedule.objects.values_list("habit_id", "day_of_week").iterator(chunk_size=batch_size):
+        masks[habit_id] = masks.get(habit_id, 0) | 1 << day
+
+    records = (
+        HabitRecord.objects.order_by("habit_id", "date")
+        .values_list("habit_id", "date", "completed")
+        .iterator(chunk_size=batch_size)
+    )
+    archives = HabitRecordArchive.objects.order_by("habit_id", "year").iterator(chunk_size=batch_size)
+    completed = (
+        (habit_id, day)
+        for habit_id, day, done in merge_archived(
+            records, (day for archive in archives for day in archive_days(archive))
+        )
+        if done
+    )
+    counters = {
+        habit_id: compute_streaks((day for _, day in rows), masks.get(habit_id, 0))
+        for habit_id, rows in groupby(completed, key=lambda row: row[0])
+    }
+
+    total = 0
+    with transaction.atomic():
+        HabitStats.objects.all().delete()
+        habit_ids = Habit.objects.order_by("id").values_list("id", flat=True).iterator(chunk_size=batch_size)
+        for batch in chunked(habit_ids, batch_size):
+            HabitStats.objects.bulk_create(
+                HabitStats(
+                    habit_id=habit_id,
+                    weekday_mask=masks.get(habit_id, 0),
+                    **counters.get(habit_id, compute_streaks([], 0)),
+                )
+                for habit_id in batch
+            )
+            total += len(batch)
+
+    return total
@@ -1,22 +1,49 @@
+import logging
+from datetime import timedelta
+from functools import partial
+
 from celery import shared_task
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from .archive import archive_records
+from .exports import build_export_file
+from .imports import import_habit_history, read_rows
+from .models import ExportJob, Habit, ImportJob
+from .partitions import maintain_record_partitions
+from .reminders import advance_reminders, due_reminders
+from .rollups import update_rollups
+from .utils import chunked
+
+logger = logging.getLogger(__name__)
 
-from .models import Habit
+REMINDER_SUBJECT = "Habit Tracker: Нагадування про звичку"
+
+
+def build_reminder_message(user, habit, connection=None):
+    return EmailMessage(
+        subject=REMINDER_SUBJECT,
+        body=f"Привіт {user.username}, не забудь виконати звичку: {habit.name}",
+        from_email=settings.EMAIL_HOST_USER,
+        to=[user.email],
+        connection=connection,
+    )
 
 
 @shared_task
 def send_habit_email(user_id, habit_id):
     User = get_user_model()
     try:
-        user = User.objects.get(pk=user_id)
+        user = User.objects.get(pk=user_id, is_active=True)
         habit = Habit.objects.get(pk=habit_id, user=user)
     except (User.DoesNotExist, Habit.DoesNotExist):
         return False
 
     send_mail(
-        subject="Habit Tracker: Нагадування про звичку",
+        subject=REMINDER_SUBJECT,
         message=f"Привіт {user.username}, не забудь виконати звичку: {habit.name}",
         from_email=settings.EMAIL_HOST_USER,
         recipient_list=[user.email],
@@ -24,3 +51,155 @@ def send_habit_email(user_id, habit_id):
     )
 
     return True
+
+
+@shared_task
+def dispatch_habit_reminders():
+    """
+    Runs once a minute and sends every reminder whose next_fire_at has passed.
+
+    Due schedules are taken in batches of REMINDER_BATCH_SIZE with one range scan each and,
+    in the same transaction, moved on to their next occurrence, so overlapping runs and
+    restarts neither skip nor repeat a reminder. Reminders more than REMINDER_MAX_LAG_MINUTES
+    late are moved on without being sent, as are those of deactivated users.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(minutes=settings.REMINDER_MAX_LAG_MINUTES)
+    dispatched = 0
+
+    while True:
+        with transaction.atomic():
+            schedules = list(due_reminders(now)[: settings.REMINDER_BATCH_SIZE])
+            pairs = [
+                (schedule.owner_id, schedule.habit_id)
+                for schedule in schedules
+                if schedule.next_fire_at >= stale_before and schedule.owner_is_active
+            ]
+            advance_reminders(schedules, now)
+            if pairs:
+                transaction.on_commit(partial(send_habit_reminders.delay, pairs))
+
+        dispatched += len(pairs)
+        if len(schedules) < settings.REMINDER_BATCH_SIZE:
+            return dispatched
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_habit_reminders(self, pairs):
+    """
+    Sends reminders for a batch of (user_id, habit_id) pairs.
+
+    Users and habits are loaded with a single query and all emails go through one SMTP
+    connection, which is reopened every REMINDER_EMAIL_CHUNK_SIZE messages. Messages are
+    handed to the connection one at a time so a failure can be pinned to its reminder;
+    only the failed pairs are retried.
+    """
+    requested = {(user_id, habit_id) for user_id, habit_id in pairs}
+    habits = Habit.objects.select_related("user").filter(pk__in={habit_id for _, habit_id in requested})
+    reminders = [
+        ((habit.user_id, habit.id), build_reminder_message(habit.user, habit))
+        for habit in habits
+        # Користувача могли деактивувати вже після диспетчеризації
+        if (habit.user_id, habit.id) in requested and habit.user.email and habit.user.is_active
+    ]
+
+    sent = 0
+    failed = []
+    connection = get_connection(fail_silently=False)
+
+    for chunk in chunked(reminders, settings.REMINDER_EMAIL_CHUNK_SIZE):
+        try:
+            connection.open()
+        except Exception:
+            logger.exception("Could not open email connection for %s reminders", len(chunk))
+            failed.extend(pair for pair, _ in chunk)
+            continue
+
+        try:
+            for pair, message in chunk:
+                try:
+                    sent += connection.send_messages([message])
+                except Exception:
+                    logger.exception("Failed to send reminder for user %s, habit %s", *pair)
+                    failed.append(pair)
+        finally:
+            connection.close()
+
+    if failed and self.request.retries < self.max_retries:
+        raise self.retry(args=[[list(pair) for pair in failed]])
+
+    return {"sent": sent, "failed": len(failed), "skipped": len(requested) - len(reminders)}
+
+
+@shared_task
+def update_habit_rollups():
+    """Folds the habit records changed since the previous run into HabitDailyRollup."""
+    return update_rollups(batch_size=settings.ROLLUP_BATCH_SIZE)
+
+
+@shared_task
+def maintain_habit_record_partitions():
+    """Creates the habit record partitions of the coming months and detaches the expired ones."""
+    return maintain_record_partitions()
+
+
+@shared_task
+def archive_habit_records():
+    """Moves the habit records older than HABIT_RECORD_ARCHIVE_AFTER_DAYS into the archive."""
+    return archive_records()
+
+
+@shared_task
+def generate_habit_export(job_id):
+    """Builds the gzip file of an ExportJob; the job records whether it succeeded."""
+    job = ExportJob.objects.select_related("user").get(pk=job_id)
+    job.status = "running"
+    job.save(update_fields=["status"])
+
+    try:
+        build_export_file(job)
+    except Exception as exc:
+        logger.exception("Export %s of user %s failed", job.id, job.user_id)
+        job.status = "failed"
+        job.error = str(exc)
+    else:
+        job.status = "done"
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "file", "error", "finished_at"])
+    return job.status
+
+
+@shared_task
+def import_habit_file(job_id):
+    """Imports the file of an ImportJob, saving the progress after every batch."""
+    job = ImportJob.objects.select_related("user").get(pk=job_id)
+    job.status = "running"
+    job.save(update_fields=["status"])
+
+    def save_progress(summary):
+        ImportJob.objects.filter(pk=job.id).update(
+            processed_rows=summary["processed"], imported_rows=summary["imported"], failed_rows=summary["failed"]
+        )
+
+    try:
+        with job.file.open("rb") as stream:
+            summary = import_habit_history(job.user, read_rows(stream, job.file_format), on_progress=save_progress)
+    except Exception as exc:
+        logger.exception("Import %s of user %s failed", job.id, job.user_id)
+        job.status = "failed"
+        job.errors = [{"line": None, "errors": str(exc)}]
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "errors", "finished_at"])
+        return job.status
+
+    # Дані вже імпортовано, завантажений файл більше не потрібен
+    job.file.delete(save=False)
+    job.status = "done"
+    job.processed_rows = summary["processed"]
+    job.imported_rows = summary["imported"]
+    job.failed_rows = summary["failed"]
+    job.errors = summary["errors"]
+    job.finished_at = timezone.now()
+    job.save()
+    return job.status
@@ -1,18 +1,96 @@
-from datetime import date, timedelta
-
+import asyncio
+import csv
+import gzip
+import json
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib import import_module
+from io import BytesIO, StringIO
+from smtplib import SMTPException
+from unittest import mock, skipUnless
+from zoneinfo import ZoneInfo
+
+from django.apps import apps as django_apps
 from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import get_connection
+from django.core.management import CommandError, call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django_celery_beat.models import PeriodicTask
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
-from habits.models import Habit, HabitRecord, HabitSchedule
-from habits.utils import create_or_update_task_for_schedule
+from habits.archive import archive_horizon, archive_records, restore_records
+from habits.benchmarks import (
+    SCENARIOS,
+    compare_with_baseline,
+    measure_connection_churn,
+    run_benchmarks,
+    seed_dataset,
+    seed_probe_user,
+    uncovered_routes,
+)
+from habits.bitmaps import bytes_bitmap, decode_bitmap
+from habits.cache import get_user_version
+from habits.events import InMemoryEventBroker, get_event_broker, send_event
+from habits.exports import export_lines
+from habits.imports import import_habit_history, read_rows
+from habits.load_test import LOAD_TEST_ROUTES, run_load
+from habits.models import (
+    Habit,
+    HabitDailyRollup,
+    HabitRecord,
+    HabitRecordArchive,
+    HabitSchedule,
+    HabitStats,
+)
+from habits.partitions import (
+    detach_record_partitions,
+    ensure_record_partitions,
+    month_start,
+    partition_name,
+    record_partitions,
+    records_partitioned,
+)
+from habits.query_plans import check_query_plans
+from habits.records import delete_habit_record
+from habits.reminders import due_reminders
+from habits.schedules import next_reminder_at, scheduled_days_between
+from habits.serializers import HabitRecordSerializer
+from habits.stats import rebuild_habit_stats
+from habits.tasks import (
+    dispatch_habit_reminders,
+    send_habit_reminders,
+    update_habit_rollups,
+)
+from users.authentication import UserRefreshToken
 
 User = get_user_model()
 
 
-class HabitAPITestCase(APITestCase):
+class CleanCacheTestCase(APITestCase):
+    """
+    Starts every test with an empty cache. Cache versions are bumped when a transaction
+    commits, which never happens inside a test, so responses cached by an earlier test for a
+    user with the same id would otherwise be served again.
+    """
+
+    def _pre_setup(self):
+        super()._pre_setup()
+        cache.clear()
+
+
+class HabitAPITestCase(CleanCacheTestCase):
     def setUp(self):
         self.client = APIClient()
         self.user1_password = "pass1234"
@@ -41,8 +119,60 @@ class HabitAPITestCase(APITestCase):
         url = reverse("habit-list")
         response = self.client.get(url, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.json()), 1)
-        self.assertEqual(response.json()[0]["name"], self.habit_user1.name)
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertEqual(response.json()["results"][0]["name"], self.habit_user1.name)
+
+    def test_list_habits_cursor_pagination(self):
+        for i in range(3):
+            Habit.objects.create(user=self.user1, name=f"Habit {i}")
+        self.authenticate_user(self.user1.username, self.user1_password)
+
+        names = []
+        url = reverse("habit-list") + "?page_size=1"
+        while url:
+            response = self.client.get(url, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            names.extend(item["name"] for item in response.json()["results"])
+            url = response.json()["next"]
+
+        self.assertEqual(names, ["Habit 2", "Habit 1", "Habit 0", self.habit_user1.name])
+
+    def test_list_habits_is_cached_until_habit_changes(self):
+        self.authenticate_user(self.user1.username, self.user1_password)
+        url = reverse("habit-list")
+        first = self.client.get(url)
+        etag = first["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(url)
+        self.assertEqual(cached.json(), first.json())
+        self.assertFalse(any("habits_habit" in query["sql"] for query in queries.captured_queries))
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, data=self.habit_data, format="json")
+        refreshed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(refreshed.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(refreshed["ETag"], etag)
+        self.assertEqual(len(refreshed.json()["results"]), 2)
+
+    def test_cache_version_is_bumped_on_commit(self):
+        version = get_user_version(self.user1.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Habit.objects.create(user=self.user1, name="Walk")
+            self.assertEqual(get_user_version(self.user1.id), version)
+        self.assertNotEqual(get_user_version(self.user1.id), version)
+
+    def test_cached_habits_are_per_user(self):
+        Habit.objects.create(user=self.user2, name="Sleep early")
+        url = reverse("habit-list")
+        self.authenticate_user(self.user1.username, self.user1_password)
+        self.client.get(url)
+        self.authenticate_user(self.user2.username, self.user2_password)
+        response = self.client.get(url)
+        self.assertEqual([item["name"] for item in response.json()["results"]], ["Sleep early"])
 
     def test_cannot_access_other_users_habit(self):
         self.authenticate_user(self.user2.username, self.user2_password)
@@ -57,6 +187,7 @@ class HabitAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.json()["name"], self.habit_data["name"])
         self.assertEqual(response.json()["user"], self.user1.id)
+        self.assertEqual(response.json()["stats"]["current_streak"], 0)
 
     def test_update_habit(self):
         self.authenticate_user(self.user1.username, self.user1_password)
@@ -74,7 +205,7 @@ class HabitAPITestCase(APITestCase):
         self.assertFalse(Habit.objects.filter(id=self.habit_user1.id).exists())
 
 
-class HabitScheduleAPITestCase(APITestCase):
+class HabitScheduleAPITestCase(CleanCacheTestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="user", password="pass1234")
         self.token_url = reverse("token_obtain_pair")
@@ -94,8 +225,8 @@ class HabitScheduleAPITestCase(APITestCase):
         url = reverse("habit-schedule-list", args=[self.habit.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.json()), 1)
-        self.assertEqual(response.json()[0]["day_of_week"], 1)
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertEqual(response.json()["results"][0]["day_of_week"], 1)
 
     def test_create_schedule(self):
         self.authenticate()
@@ -110,10 +241,10 @@ class HabitScheduleAPITestCase(APITestCase):
         self.authenticate()
         url = reverse("habit-schedule-list", args=[other_habit.id])
         response = self.client.post(url, self.schedule_data, format="json")
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
-class HabitRecordAPITestCase(APITestCase):
+class HabitRecordAPITestCase(CleanCacheTestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="user", password="pass1234")
         self.token_url = reverse("token_obtain_pair")
@@ -143,85 +274,361 @@ class HabitRecordAPITestCase(APITestCase):
         url = reverse("habit-records-list", args=[self.habit.id])
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(len(response.json()["results"]), 1)
 
-    def test_cannot_create_record_for_other_users_habit(self):
-        other_user = User.objects.create_user(username="other", password="pass5678")
-        other_habit = Habit.objects.create(user=other_user, name="Read")
+    def test_record_change_invalidates_cached_analytics(self):
         self.authenticate()
-        url = reverse("habit-records-list", args=[other_habit.id])
-        response = self.client.post(url, self.record_data, format="json")
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
-
-
-class HabitScheduleAPITest(APITestCase):
-    def setUp(self):
-        self.user = User.objects.create_user(username="testuser", password="testpass")
-        self.client.login(username="testuser", password="testpass")
-        self.habit = Habit.objects.create(user=self.user, name="Test habit")
-
-    def tearDown(self):
-        PeriodicTask.objects.all().delete()
+        url = reverse("habit-analytics", kwargs={"habit_pk": self.habit.pk})
+        self.assertEqual(self.client.get(url).json(), [])
 
-    def authenticate(self):
-        self.token_url = reverse("token_obtain_pair")
-        response = self.client.post(self.token_url, {"username": "testuser", "password": "testpass"}, format="json")
-        token = response.json().get("access")
-        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("habit-records-list", args=[self.habit.id]), self.record_data, format="json")
+        self.assertEqual(self.client.get(url).json(), [{"date": str(date.today()), "completed_count": 1}])
 
-    def test_create_habit_schedule_creates_periodictask(self):
+    def test_list_records_cursor_pagination(self):
         self.authenticate()
+        dates = [date(2025, 1, 1) + timedelta(days=offset) for offset in range(5)]
+        for day in dates:
+            HabitRecord.objects.create(habit=self.habit, date=day, completed=True)
 
-        url = reverse("habit-schedule-list", kwargs={"habit_pk": self.habit.id})
-        data = {"habit": self.habit.id, "day_of_week": 0, "remind_hour": 9, "remind_minute": 0}
-        response = self.client.post(url, data, format="json")
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-
-        schedule_id = response.data["id"]
-        schedule = HabitSchedule.objects.get(id=schedule_id)
-
-        create_or_update_task_for_schedule(schedule)
-
-        task_name = f"remind_habit_{schedule_id}"
-        self.assertTrue(PeriodicTask.objects.filter(name=task_name).exists())
+        url = reverse("habit-records-list", args=[self.habit.id])
+        seen = []
+        response = self.client.get(url, {"page_size": 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item["date"] for item in response.json()["results"])
+            if response.json()["next"] is None:
+                break
+            response = self.client.get(response.json()["next"])
+
+        self.assertEqual(seen, [str(day) for day in reversed(dates)])
+
+    def test_list_records_invalid_cursor(self):
+        self.authenticate()
+        url = reverse("habit-records-list", args=[self.habit.id])
+        response = self.client.get(url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
-    def test_update_habit_schedule_updates_periodictask(self):
+    def test_bulk_upsert_records(self):
         self.authenticate()
+        second_habit = Habit.objects.create(user=self.user, name="Stretch")
+        HabitRecord.objects.create(habit=self.habit, date=date(2025, 1, 1), completed=False)
+        other_habit = Habit.objects.create(user=User.objects.create_user(username="other"), name="Read")
+
+        items = [
+            {"habit": self.habit.id, "date": "2025-01-01", "completed": True},
+            {"habit": self.habit.id, "date": "2025-01-02", "completed": True},
+            {"habit": second_habit.id, "date": "2025-01-01", "completed": False},
+            {"habit": other_habit.id, "date": "2025-01-01", "completed": True},
+            {"habit": self.habit.id, "date": "not-a-date"},
+        ]
+        response = self.client.post(reverse("habit-records-bulk"), items, format="json")
 
-        schedule = HabitSchedule.objects.create(habit=self.habit, day_of_week=2, remind_hour=9, remind_minute=30)
-        create_or_update_task_for_schedule(schedule)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["saved"], 3)
+        statuses = [result["status"] for result in response.json()["results"]]
+        self.assertEqual(statuses, ["ok", "ok", "ok", "error", "error"])
+        self.assertIn("date", response.json()["results"][4]["errors"])
 
-        schedule.remind_hour = 10
-        schedule.remind_minute = 15
-        schedule.save()
+        self.assertTrue(HabitRecord.objects.get(habit=self.habit, date=date(2025, 1, 1)).completed)
+        self.assertEqual(HabitRecord.objects.filter(habit__user=self.user).count(), 3)
+        self.assertFalse(HabitRecord.objects.filter(habit=other_habit).exists())
+        self.assertEqual(HabitStats.objects.get(habit=self.habit).current_streak, 2)
 
-        create_or_update_task_for_schedule(schedule)
+    def test_bulk_upsert_rejects_non_list(self):
+        self.authenticate()
+        response = self.client.post(reverse("habit-records-bulk"), {"habit": self.habit.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-        task_name = f"remind_habit_{schedule.id}"
-        task = PeriodicTask.objects.get(name=task_name)
-        crontab = task.crontab
+    def test_cannot_create_record_for_other_users_habit(self):
+        other_user = User.objects.create_user(username="other", password="pass5678")
+        other_habit = Habit.objects.create(user=other_user, name="Read")
+        self.authenticate()
+        url = reverse("habit-records-list", args=[other_habit.id])
+        response = self.client.post(url, self.record_data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
-        self.assertEqual(task.task, "habits.task.send_habit_email")
-        self.assertEqual(crontab.hour, str(10))
-        self.assertEqual(crontab.minute, str(15))
 
-    def test_delete_habit_schedule_deletes_periodictask(self):
-        self.authenticate()
+class HabitReminderDispatchTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass", email="test@example.com")
+        self.habit = Habit.objects.create(user=self.user, name="Test habit")
+        self.schedule = HabitSchedule.objects.create(habit=self.habit, day_of_week=0, remind_hour=9)
+        # Понеділок 09:00 за Києвом (UTC+3 влітку)
+        self.now = datetime(2025, 6, 2, 6, 0, tzinfo=dt_timezone.utc)
+        HabitSchedule.objects.filter(pk=self.schedule.pk).update(next_fire_at=self.now)
+
+    def dispatch(self, now=None):
+        with (
+            mock.patch("habits.tasks.timezone.now", return_value=now or self.now),
+            mock.patch.object(send_habit_reminders, "delay") as delay,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            dispatched = dispatch_habit_reminders()
+        return dispatched, delay
+
+    def next_fire_at(self):
+        return HabitSchedule.objects.get(pk=self.schedule.pk).next_fire_at
+
+    def test_schedule_does_not_create_periodic_task(self):
+        self.assertFalse(PeriodicTask.objects.filter(name__startswith="remind_habit_").exists())
+
+    def test_next_fire_at_is_set_in_project_timezone(self):
+        local = self.schedule.next_fire_at.astimezone(ZoneInfo("Europe/Kyiv"))
+        self.assertEqual((local.weekday(), local.hour, local.minute), (0, 9, 0))
+        self.assertGreater(self.schedule.next_fire_at, timezone.now())
+
+    def test_due_reminders(self):
+        self.assertEqual([schedule.id for schedule in due_reminders(self.now)], [self.schedule.id])
+        self.assertEqual(list(due_reminders(self.now - timedelta(minutes=1))), [])
+
+    def test_due_reminders_skip_inactive_habit(self):
+        self.habit.is_active = False
+        self.habit.save()
+        self.assertEqual(list(due_reminders(self.now)), [])
+
+    def test_dispatch_sends_due_reminders_once(self):
+        dispatched, delay = self.dispatch()
+        self.assertEqual(dispatched, 1)
+        delay.assert_called_once_with([(self.user.id, self.habit.id)])
+        self.assertEqual(self.next_fire_at(), self.now + timedelta(weeks=1))
+
+        dispatched, delay = self.dispatch()
+        self.assertEqual(dispatched, 0)
+        delay.assert_not_called()
+
+    def test_dispatch_skips_inactive_users(self):
+        self.user.is_active = False
+        self.user.save()
+
+        dispatched, delay = self.dispatch()
+        self.assertEqual(dispatched, 0)
+        delay.assert_not_called()
+        self.assertEqual(self.next_fire_at(), self.now + timedelta(weeks=1))
+
+    def test_dispatch_catches_up_after_restart(self):
+        dispatched, _ = self.dispatch(now=self.now + timedelta(minutes=5))
+        self.assertEqual(dispatched, 1)
+        self.assertEqual(self.next_fire_at(), self.now + timedelta(weeks=1))
+
+    def test_dispatch_skips_stale_reminders(self):
+        dispatched, delay = self.dispatch(now=self.now + timedelta(days=1))
+        self.assertEqual(dispatched, 0)
+        delay.assert_not_called()
+        self.assertEqual(self.next_fire_at(), self.now + timedelta(weeks=1))
+
+    @override_settings(REMINDER_BATCH_SIZE=2)
+    def test_dispatch_in_batches(self):
+        for day in range(1, 5):
+            HabitSchedule.objects.create(habit=self.habit, day_of_week=day, remind_hour=9)
+        HabitSchedule.objects.update(next_fire_at=self.now)
+
+        dispatched, delay = self.dispatch()
+        self.assertEqual(dispatched, 5)
+        self.assertEqual([len(call.args[0]) for call in delay.call_args_list], [2, 2, 1])
+        self.assertFalse(HabitSchedule.objects.filter(next_fire_at__lte=self.now).exists())
+
+
+class ReminderTimezoneTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234", email="user@example.com")
+        self.habit = Habit.objects.create(user=self.user, name="Workout")
+        self.client.force_authenticate(self.user)
+
+    def local_fire_time(self, schedule, time_zone):
+        local = HabitSchedule.objects.get(pk=schedule.pk).next_fire_at.astimezone(ZoneInfo(time_zone))
+        return local.weekday(), local.hour, local.minute
+
+    def test_spring_forward_gap_fires_after_transition(self):
+        kyiv = ZoneInfo("Europe/Kyiv")
+        # 29.03.2026 о 03:00 за Києвом годинники переводять на 04:00
+        fire_at = next_reminder_at(6, 3, 30, kyiv, datetime(2026, 3, 28, tzinfo=dt_timezone.utc))
+        self.assertEqual(fire_at, datetime(2026, 3, 29, 1, 30, tzinfo=dt_timezone.utc))
+        self.assertEqual(fire_at.astimezone(kyiv).hour, 4)
+
+    def test_fall_back_repeated_time_fires_once(self):
+        kyiv = ZoneInfo("Europe/Kyiv")
+        # 25.10.2026 о 04:00 за Києвом годинники переводять на 03:00, тож 03:30 буває двічі
+        fire_at = next_reminder_at(6, 3, 30, kyiv, datetime(2026, 10, 24, tzinfo=dt_timezone.utc))
+        self.assertEqual(fire_at, datetime(2026, 10, 25, 0, 30, tzinfo=dt_timezone.utc))
+        following = next_reminder_at(6, 3, 30, kyiv, fire_at)
+        self.assertEqual(following, datetime(2026, 11, 1, 1, 30, tzinfo=dt_timezone.utc))
+
+    def test_schedule_uses_owner_timezone(self):
+        self.user.profile.timezone = "America/New_York"
+        self.user.profile.save()
+
+        response = self.client.post(
+            reverse("habit-schedule-list", args=[self.habit.id]), {"day_of_week": 2, "remind_hour": 7}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("next_fire_at", response.data)
+        schedule = HabitSchedule.objects.get(pk=response.data["id"])
+        self.assertEqual(self.local_fire_time(schedule, "America/New_York"), (2, 7, 0))
 
-        schedule = HabitSchedule.objects.create(habit=self.habit, day_of_week=0, remind_hour=7, remind_minute=0)
-        create_or_update_task_for_schedule(schedule)
+    def test_timezone_change_reschedules_reminders(self):
+        schedules = [HabitSchedule.objects.create(habit=self.habit, day_of_week=day, remind_hour=8) for day in (0, 3)]
 
-        task_name = f"remind_habit_{schedule.id}"
-        self.assertTrue(PeriodicTask.objects.filter(name=task_name).exists())
+        response = self.client.patch(reverse("profile"), {"timezone": "Asia/Tokyo"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for schedule in schedules:
+            self.assertEqual(self.local_fire_time(schedule, "Asia/Tokyo"), (schedule.day_of_week, 8, 0))
 
-        url = reverse("habit-schedule-detail", kwargs={"habit_pk": self.habit.id, "pk": schedule.id})
-        response = self.client.delete(url)
-        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+    def test_bulk_schedule_and_import_use_owner_timezone(self):
+        self.user.profile.timezone = "America/Los_Angeles"
+        self.user.profile.save()
 
-        self.assertFalse(PeriodicTask.objects.filter(name=task_name).exists())
+        self.client.put(
+            reverse("habit-schedule-bulk", args=[self.habit.id]), [{"day_of_week": 1, "remind_hour": 6}], format="json"
+        )
+        import_habit_history(self.user, [{"type": "schedule", "habit": "Workout", "day_of_week": 5, "remind_hour": 10}])
+        for schedule in HabitSchedule.objects.filter(habit=self.habit):
+            self.assertEqual(
+                self.local_fire_time(schedule, "America/Los_Angeles"),
+                (schedule.day_of_week, schedule.remind_hour, 0),
+            )
 
 
-class HabitAnalyticsViewTest(APITestCase):
+class SendHabitRemindersTest(CleanCacheTestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f"user{i}", password="pass1234", email=f"user{i}@example.com")
+            for i in range(3)
+        ]
+        self.habits = [Habit.objects.create(user=user, name=f"Habit {user.username}") for user in self.users]
+        self.pairs = [[habit.user_id, habit.id] for habit in self.habits]
+
+    def test_sends_batch_over_one_connection(self):
+        with mock.patch("habits.tasks.get_connection", wraps=get_connection) as get_conn:
+            result = send_habit_reminders.apply(args=[self.pairs]).get()
+
+        get_conn.assert_called_once()
+        self.assertEqual(result, {"sent": 3, "failed": 0, "skipped": 0})
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(u.email for u in self.users))
+
+    def test_skips_pairs_with_foreign_habit(self):
+        result = send_habit_reminders.apply(args=[[[self.users[0].id, self.habits[1].id]]]).get()
+        self.assertEqual(result, {"sent": 0, "failed": 0, "skipped": 1})
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_skips_users_deactivated_after_dispatch(self):
+        User.objects.filter(pk=self.users[1].pk).update(is_active=False)
+        result = send_habit_reminders.apply(args=[self.pairs]).get()
+        self.assertEqual(result, {"sent": 2, "failed": 0, "skipped": 1})
+        self.assertNotIn(self.users[1].email, [message.to[0] for message in mail.outbox])
+
+    def test_retries_only_failed_messages(self):
+        connection = mock.MagicMock()
+        failing_email = self.users[1].email
+
+        def send_messages(messages):
+            if messages[0].to == [failing_email]:
+                raise SMTPException("rejected")
+            return len(messages)
+
+        connection.send_messages.side_effect = send_messages
+        with (
+            mock.patch("habits.tasks.get_connection", return_value=connection),
+            self.assertLogs("habits.tasks", level="ERROR"),
+        ):
+            send_habit_reminders.apply(args=[self.pairs])
+
+        recipients = [call.args[0][0].to[0] for call in connection.send_messages.call_args_list]
+        self.assertEqual(recipients.count(self.users[0].email), 1)
+        self.assertEqual(recipients.count(self.users[2].email), 1)
+        self.assertEqual(recipients.count(failing_email), 1 + send_habit_reminders.max_retries)
+
+
+class HabitStatsTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.habit = Habit.objects.create(user=self.user, name="Swim", start_date=date(2025, 6, 2))
+        # Понеділок, середа, п'ятниця
+        for day in (0, 2, 4):
+            HabitSchedule.objects.create(habit=self.habit, day_of_week=day)
+        self.monday = date(2025, 6, 2)
+
+    def complete(self, *offsets):
+        for offset in offsets:
+            HabitRecord.objects.create(habit=self.habit, date=self.monday + timedelta(days=offset), completed=True)
+
+    def stats(self):
+        return HabitStats.objects.get(habit=self.habit)
+
+    def test_streak_follows_schedule_days(self):
+        self.complete(0, 2, 4, 7)
+        stats = self.stats()
+        self.assertEqual(stats.current_streak, 4)
+        self.assertEqual(stats.longest_streak, 4)
+        self.assertEqual(stats.completed_count, 4)
+
+    def test_missed_scheduled_day_breaks_streak(self):
+        self.complete(0, 2, 7)
+        stats = self.stats()
+        self.assertEqual(stats.current_streak, 1)
+        self.assertEqual(stats.longest_streak, 2)
+
+    def test_backfilled_day_merges_streaks(self):
+        self.complete(0, 2, 7)
+        self.complete(4)
+        self.assertEqual(self.stats().current_streak, 4)
+
+    def test_deleting_record_updates_stats(self):
+        self.complete(0, 2, 4)
+        delete_habit_record(HabitRecord.objects.get(habit=self.habit, date=self.monday + timedelta(days=2)))
+        stats = self.stats()
+        self.assertEqual(stats.completed_count, 2)
+        self.assertEqual(stats.longest_streak, 1)
+
+    def test_current_streak_and_rate_on_read(self):
+        self.complete(0, 2)
+        stats = self.stats()
+        self.assertEqual(stats.current_streak_on(self.monday + timedelta(days=4)), 2)
+        self.assertEqual(stats.current_streak_on(self.monday + timedelta(days=5)), 0)
+        self.assertEqual(stats.completion_rate_on(self.monday + timedelta(days=6)), round(2 / 3, 4))
+
+    def test_habit_list_counts_streak_on_owners_date(self):
+        self.complete(0, 2)
+        self.user.profile.timezone = "Pacific/Kiritimati"
+        self.user.profile.save()
+        self.client.force_authenticate(self.user)
+        # У Києві ще п'ятниця, наступний запланований день; у Кірітіматі вже субота
+        now = datetime(2025, 6, 6, 18, 0, tzinfo=dt_timezone.utc)
+
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            response = self.client.get(reverse("habit-list"))
+
+        self.assertEqual(response.data["results"][0]["stats"]["current_streak"], 0)
+
+    def test_rebuild_command_matches_incremental_stats(self):
+        self.complete(0, 2, 7, 4, 11)
+        expected = self.stats()
+        HabitStats.objects.all().delete()
+
+        call_command("rebuild_habit_stats", stdout=StringIO())
+
+        rebuilt = self.stats()
+        for field in ("completed_count", "current_streak", "longest_streak", "last_completed_date", "weekday_mask"):
+            self.assertEqual(getattr(rebuilt, field), getattr(expected, field))
+
+    def test_migration_backfills_missing_stats(self):
+        self.complete(0, 2, 7, 4, 11)
+        expected = self.stats()
+        HabitStats.objects.all().delete()
+
+        backfill = import_module("habits.migrations.0017_backfill_habit_stats").backfill_habit_stats
+        backfill(django_apps, None)
+
+        backfilled = self.stats()
+        for field in ("completed_count", "current_streak", "longest_streak", "last_completed_date", "weekday_mask"):
+            self.assertEqual(getattr(backfilled, field), getattr(expected, field))
+
+    def test_scheduled_days_between(self):
+        self.assertEqual(scheduled_days_between(self.monday, self.monday + timedelta(days=20), 0b10101), 9)
+        self.assertEqual(scheduled_days_between(self.monday, self.monday + timedelta(days=20), 0), 21)
+
+
+class HabitAnalyticsViewTest(CleanCacheTestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="testuser", password="password")
         self.client.login(username="testuser", password="password")
@@ -282,3 +689,906 @@ class HabitAnalyticsViewTest(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
+
+
+class HabitAnalyticsEngineTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.monday = date(2025, 6, 2)
+        self.run = Habit.objects.create(name="Run", user=self.user, start_date=self.monday)
+        self.read = Habit.objects.create(name="Read", user=self.user, start_date=self.monday)
+        # Біг по понеділках і четвергах, читання щодня
+        for day in (0, 3):
+            HabitSchedule.objects.create(habit=self.run, day_of_week=day)
+
+        for offset, completed in ((0, True), (3, False), (7, True), (10, True)):
+            HabitRecord.objects.create(habit=self.run, date=self.monday + timedelta(days=offset), completed=completed)
+        for offset in range(5):
+            HabitRecord.objects.create(habit=self.read, date=self.monday + timedelta(days=offset), completed=True)
+
+        token = self.client.post(reverse("token_obtain_pair"), {"username": "testuser", "password": "password"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token.json()['access']}")
+
+    def get(self, url, **params):
+        params.setdefault("start_date", self.monday)
+        params.setdefault("end_date", self.monday + timedelta(days=13))
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_weekly_rollup_for_one_habit(self):
+        url = reverse("habit-analytics", kwargs={"habit_pk": self.run.pk})
+        data = self.get(url, granularity="week", metrics="completed_count,missed_count,scheduled_count,completion_rate")
+        self.assertEqual(
+            data,
+            [
+                {
+                    "date": self.monday,
+                    "completed_count": 1,
+                    "missed_count": 1,
+                    "scheduled_count": 2,
+                    "completion_rate": 0.5,
+                },
+                {
+                    "date": self.monday + timedelta(days=7),
+                    "completed_count": 2,
+                    "missed_count": 0,
+                    "scheduled_count": 2,
+                    "completion_rate": 1.0,
+                },
+            ],
+        )
+
+    def test_monthly_rollup_across_all_habits(self):
+        data = self.get(reverse("analytics"), granularity="month", metrics="completed_count,record_count")
+        self.assertEqual(data, [{"date": date(2025, 6, 1), "completed_count": 8, "record_count": 9}])
+
+    def test_weekday_breakdown(self):
+        data = self.get(reverse("analytics"), granularity="weekday", metrics="completed_count,scheduled_count")
+        by_day = {row["day_of_week"]: row for row in data}
+        self.assertEqual(by_day[0], {"day_of_week": 0, "completed_count": 3, "scheduled_count": 4})
+        self.assertEqual(by_day[3], {"day_of_week": 3, "completed_count": 2, "scheduled_count": 4})
+        self.assertEqual(by_day[5], {"day_of_week": 5, "completed_count": 0, "scheduled_count": 2})
+
+    def test_rejects_unknown_metric(self):
+        response = self.client.get(reverse("analytics"), {"metrics": "completed_count,unknown"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(ROLLUP_SAFETY_LAG_SECONDS=0)
+class HabitDailyRollupTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.monday = date(2025, 6, 2)
+        self.habit = Habit.objects.create(name="Run", user=self.user, start_date=self.monday)
+        HabitSchedule.objects.create(habit=self.habit, day_of_week=0)
+        for offset in range(3):
+            HabitRecord.objects.create(habit=self.habit, date=self.monday + timedelta(days=offset), completed=True)
+
+        token = self.client.post(reverse("token_obtain_pair"), {"username": "testuser", "password": "password"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token.json()['access']}")
+        self.url = reverse("analytics")
+        self.params = {"granularity": "week", "metrics": "completed_count,record_count,missed_count,completion_rate"}
+
+    def test_backfill_and_incremental_update(self):
+        call_command("backfill_habit_rollups", stdout=StringIO())
+        self.assertEqual(HabitDailyRollup.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(HabitDailyRollup.objects.get(date=self.monday).scheduled_completed_count, 1)
+
+        HabitRecord.objects.create(habit=self.habit, date=self.monday + timedelta(days=7), completed=True)
+        self.assertEqual(update_habit_rollups(), 1)
+        self.assertEqual(update_habit_rollups(), 0)
+        self.assertEqual(HabitDailyRollup.objects.filter(user=self.user).count(), 4)
+
+    def test_analytics_merges_rollup_with_fresh_records(self):
+        expected = self.client.get(self.url, self.params).data
+        call_command("backfill_habit_rollups", stdout=StringIO())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record = HabitRecord.objects.get(habit=self.habit, date=self.monday + timedelta(days=1))
+            record.completed = False
+            record.save()
+            delete_habit_record(HabitRecord.objects.get(habit=self.habit, date=self.monday + timedelta(days=2)))
+            HabitRecord.objects.create(habit=self.habit, date=self.monday + timedelta(days=1, weeks=1), completed=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url, self.params).data
+        self.assertTrue(any("habits_habitdailyrollup" in query["sql"] for query in queries.captured_queries))
+
+        self.assertEqual(expected[0]["completed_count"], 3)
+        self.assertEqual(
+            data[0],
+            {"date": self.monday, "completed_count": 1, "record_count": 2, "missed_count": 1, "completion_rate": 1},
+        )
+        self.assertEqual(data[1]["completed_count"], 1)
+
+    def test_moving_a_record_keeps_analytics_totals(self):
+        expected = self.client.get(self.url, self.params).data
+        call_command("backfill_habit_rollups", stdout=StringIO())
+        record = HabitRecord.objects.get(habit=self.habit, date=self.monday + timedelta(days=2))
+
+        url = reverse("habit-records-detail", args=[self.habit.id, record.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(url, {"date": self.monday + timedelta(days=3)}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        for _ in range(2):
+            data = self.client.get(self.url, self.params).data
+            self.assertEqual([row["completed_count"] for row in data], [row["completed_count"] for row in expected])
+            self.assertEqual(data[0]["record_count"], 3)
+            with override_settings(ROLLUP_SAFETY_LAG_SECONDS=0):
+                update_habit_rollups()
+        self.assertFalse(HabitDailyRollup.objects.filter(date=self.monday + timedelta(days=2)).exists())
+
+    def test_schedule_change_refreshes_planned_completions(self):
+        call_command("backfill_habit_rollups", stdout=StringIO())
+        HabitSchedule.objects.create(habit=self.habit, day_of_week=1)
+        planned = HabitDailyRollup.objects.filter(habit=self.habit, scheduled_completed_count=1)
+        self.assertEqual(sorted(planned.values_list("date", flat=True)), [self.monday, self.monday + timedelta(days=1)])
+
+
+class HabitRecordArchiveTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.client.force_authenticate(self.user)
+        self.habit = Habit.objects.create(user=self.user, name="Read", start_date=date(2023, 3, 1))
+        self.today = timezone.localdate()
+        for day, completed in [(date(2023, 3, 1), True), (date(2023, 3, 2), False), (date(2024, 2, 1), True)]:
+            HabitRecord.objects.create(habit=self.habit, date=day, completed=completed)
+        HabitRecord.objects.create(habit=self.habit, date=self.today, completed=True)
+        self.stats = HabitStats.objects.values().get(habit=self.habit)
+
+    def test_old_records_become_yearly_bitmaps(self):
+        self.assertEqual(archive_records(before=date(2024, 6, 1)), 3)
+
+        self.assertEqual(list(HabitRecord.objects.values_list("date", flat=True)), [self.today])
+        archive = HabitRecordArchive.objects.get(habit=self.habit, year=2023)
+        self.assertEqual(bytes_bitmap(archive.recorded), 0b11 << 59)
+        self.assertEqual(bytes_bitmap(archive.completed), 1 << 59)
+        self.assertEqual(HabitRecordArchive.objects.count(), 2)
+
+        rebuild_habit_stats(self.habit.id)
+        self.assertEqual(HabitStats.objects.values().get(habit=self.habit), {**self.stats, "updated_at": mock.ANY})
+
+    def test_records_list_pages_through_archived_days(self):
+        archive_records(before=date(2024, 6, 1))
+        url = reverse("habit-records-list", args=[self.habit.id])
+
+        days, ids = [], []
+        response = self.client.get(url, {"page_size": 2})
+        while True:
+            days += [record["date"] for record in response.data["results"]]
+            ids += [record["id"] for record in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        self.assertEqual(days, [self.today.isoformat(), "2024-02-01", "2023-03-02", "2023-03-01"])
+        self.assertEqual(ids[1:], [None, None, None])
+
+        response = self.client.get(url, {"completed": "false"})
+        self.assertEqual([record["date"] for record in response.data["results"]], ["2023-03-02"])
+
+    def test_analytics_calendar_and_export_read_archived_days(self):
+        params = {"granularity": "month", "metrics": "completed_count,record_count", "end_date": "2024-12-31"}
+        expected = self.client.get(reverse("analytics"), params).data
+        archive_records(before=date(2024, 6, 1))
+
+        self.assertEqual(self.client.get(reverse("analytics"), params).data, expected)
+        calendar = self.client.get(reverse("calendar"), {"year": 2023}).data["habits"][0]
+        self.assertEqual(decode_bitmap(calendar["completed"]), 1 << 59)
+
+        lines = b"".join(self.client.get(reverse("habit-export")).streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines if '"record"' in line]
+        self.assertEqual([record["date"] for record in records][:3], ["2023-03-01", "2023-03-02", "2024-02-01"])
+        self.assertIsNone(records[0]["id"])
+
+    def test_hot_record_replaces_archived_day(self):
+        archive_records(before=date(2024, 6, 1))
+        HabitRecord.objects.create(habit=self.habit, date=date(2023, 3, 1), completed=False)
+
+        url = reverse("habit-records-list", args=[self.habit.id])
+        dates = [(record["date"], record["completed"]) for record in self.client.get(url).data["results"]]
+        self.assertEqual(dates.count(("2023-03-01", False)), 1)
+        self.assertEqual(HabitStats.objects.get(habit=self.habit).completed_count, self.stats["completed_count"] - 1)
+
+        archive_records(before=date(2024, 6, 1))
+        archive = HabitRecordArchive.objects.get(habit=self.habit, year=2023)
+        self.assertEqual(bytes_bitmap(archive.completed), 0)
+
+    def test_rollup_rebuild_and_restore(self):
+        archive_records(before=date(2024, 6, 1))
+        call_command("backfill_habit_rollups", stdout=StringIO())
+        rolled_up = HabitDailyRollup.objects.filter(habit=self.habit).values_list("date", "completed_count")
+        self.assertEqual(sorted(rolled_up), [(date(2023, 3, 1), 1), (date(2023, 3, 2), 0), (date(2024, 2, 1), 1)])
+
+        self.assertEqual(restore_records(), 2)
+        self.assertEqual(HabitRecord.objects.filter(habit=self.habit).count(), 4)
+        self.assertFalse(HabitRecordArchive.objects.exists())
+
+
+class NestedEndpointQueryCountTest(CleanCacheTestCase):
+    """Pins the number of queries each nested endpoint needs, so N+1 regressions fail loudly."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.habit = Habit.objects.create(user=self.user, name="Workout")
+        self.schedule = HabitSchedule.objects.create(habit=self.habit, day_of_week=0)
+        for offset in range(5):
+            HabitRecord.objects.create(habit=self.habit, date=date(2025, 1, 1) + timedelta(days=offset))
+        self.record = HabitRecord.objects.filter(habit=self.habit).first()
+
+        token = self.client.post(reverse("token_obtain_pair"), {"username": "user", "password": "pass1234"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token.json()['access']}")
+
+    def assert_queries(self, expected, method, url, data=None, expected_status=status.HTTP_200_OK):
+        with self.assertNumQueries(expected):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertEqual(response.status_code, expected_status)
+
+    def test_schedule_endpoints(self):
+        list_url = reverse("habit-schedule-list", args=[self.habit.id])
+        detail_url = reverse("habit-schedule-detail", args=[self.habit.id, self.schedule.id])
+
+        self.assert_queries(2, "get", list_url)
+        self.assert_queries(2, "get", detail_url)
+        self.assert_queries(12, "post", list_url, {"day_of_week": 1}, status.HTTP_201_CREATED)
+        self.assert_queries(13, "patch", detail_url, {"remind_hour": 7})
+        self.assert_queries(15, "delete", detail_url, expected_status=status.HTTP_204_NO_CONTENT)
+
+    def test_record_endpoints(self):
+        list_url = reverse("habit-records-list", args=[self.habit.id])
+        detail_url = reverse("habit-records-detail", args=[self.habit.id, self.record.id])
+
+        # Неповна сторінка сягає за горизонт архіву, тож список читає ще й архів
+        self.assert_queries(3, "get", list_url)
+        self.assert_queries(2, "get", detail_url)
+        self.assert_queries(12, "post", list_url, {"date": "2025-02-01", "completed": True}, status.HTTP_201_CREATED)
+        self.assert_queries(13, "patch", detail_url, {"completed": True})
+        self.assert_queries(13, "delete", detail_url, expected_status=status.HTTP_204_NO_CONTENT)
+
+    def test_missing_habit_returns_404(self):
+        url = reverse("habit-records-list", args=[self.habit.id + 1000])
+        self.assert_queries(1, "get", url, expected_status=status.HTTP_404_NOT_FOUND)
+
+    def test_other_users_habit_returns_404(self):
+        other = Habit.objects.create(user=User.objects.create_user(username="other"), name="Read")
+        self.assert_queries(1, "get", reverse("habit-records-list", args=[other.id]), None, status.HTTP_404_NOT_FOUND)
+
+
+class AsyncEndpointTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.token = str(UserRefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.habits = [Habit.objects.create(user=self.user, name=f"Habit {n}") for n in range(3)]
+        # Перша звичка запланована на завтра, тож сьогоднішній дашборд її не містить
+        HabitSchedule.objects.create(habit=self.habits[0], day_of_week=(timezone.localdate().weekday() + 1) % 7)
+        for habit in self.habits:
+            HabitRecord.objects.create(habit=habit, date=timezone.localdate(), completed=True)
+
+    def test_same_payload_and_queries_as_sync_views(self):
+        pairs = [
+            ("habit-list", "async-habit-list", [], ""),
+            ("today", "async-today", [], ""),
+            ("analytics", "async-analytics", [], "?metrics=completed_count,scheduled_count&granularity=week"),
+            ("habit-analytics", "async-habit-analytics", [self.habits[0].id], "?metrics=completion_rate"),
+        ]
+        for sync_name, async_name, args, query in pairs:
+            with self.subTest(async_name):
+                with CaptureQueriesContext(connection) as sync_queries:
+                    expected = self.client.get(reverse(sync_name, args=args) + query)
+                cache.clear()
+                with CaptureQueriesContext(connection) as async_queries:
+                    response = self.client.get(reverse(async_name, args=args) + query)
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.json(), expected.json())
+                self.assertLessEqual(len(async_queries), len(sync_queries))
+                self.assertIn("ETag", response)
+
+    def test_pagination(self):
+        response = self.client.get(reverse("async-habit-list"), {"page_size": 2})
+        self.assertEqual([habit["name"] for habit in response.json()["results"]], ["Habit 2", "Habit 1"])
+
+        response = self.client.get(response.json()["next"])
+        self.assertEqual([habit["name"] for habit in response.json()["results"]], ["Habit 0"])
+        self.assertIsNone(response.json()["next"])
+
+    def test_errors(self):
+        response = self.client.get(reverse("async-analytics"), {"granularity": "year"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("granularity", response.json())
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer broken")
+        self.assertEqual(self.client.get(reverse("async-today")).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        response = self.client.get(reverse("async-today"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("WWW-Authenticate", response)
+
+    async def test_served_through_asgi_handler(self):
+        response = await self.async_client.get(
+            reverse("async-today"), headers={"Authorization": f"Bearer {self.token}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["habits"]), 2)
+
+
+@override_settings(HABIT_EVENTS={"BACKEND": "habits.events.InMemoryEventBroker"})
+class HabitEventsTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.token = str(UserRefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.habit = Habit.objects.create(user=self.user, name="Read")
+
+    def published(self, action):
+        with mock.patch.object(InMemoryEventBroker, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                action()
+        events = []
+        for (user_id, frame), _ in publish.call_args_list:
+            event, data = frame.splitlines()[:2]
+            events.append((user_id, event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        return events
+
+    def test_changes_publish_deltas(self):
+        url = reverse("habit-records-list", args=[self.habit.id])
+        events = self.published(lambda: self.client.post(url, {"date": "2025-01-01", "completed": True}))
+        self.assertEqual(len(events), 1)
+        user_id, event, data = events[0]
+        self.assertEqual((user_id, event), (self.user.id, "record.saved"))
+        self.assertEqual((data["habit"], data["date"], data["completed"]), (self.habit.id, "2025-01-01", True))
+
+        record = HabitRecord.objects.get()
+        record_id = record.id
+        events = self.published(lambda: delete_habit_record(record))
+        self.assertEqual(
+            events, [(self.user.id, "record.deleted", {"id": record_id, "habit": self.habit.id, "date": "2025-01-01"})]
+        )
+
+        items = [{"habit": self.habit.id, "date": "2025-01-02", "completed": True}]
+        events = self.published(lambda: self.client.post(reverse("habit-records-bulk"), items, format="json"))
+        self.assertEqual(events[0][1], "records.saved")
+        self.assertEqual(events[0][2]["records"][0]["date"], "2025-01-02")
+
+        events = self.published(
+            lambda: self.client.patch(reverse("habit-detail", args=[self.habit.id]), {"name": "Write"})
+        )
+        self.assertEqual(events[0][1:], ("habit.saved", {**events[0][2], "id": self.habit.id, "name": "Write"}))
+        self.assertNotIn("stats", events[0][2])
+
+        events = self.published(lambda: self.client.delete(reverse("habit-detail", args=[self.habit.id])))
+        self.assertEqual(events, [(self.user.id, "habit.deleted", {"id": self.habit.id})])
+
+    def test_rolled_back_changes_are_not_published(self):
+        def action():
+            with transaction.atomic():
+                HabitRecord.objects.create(habit=self.habit, date=date(2025, 1, 1))
+                transaction.set_rollback(True)
+
+        self.assertEqual(self.published(action), [])
+
+    async def test_fan_out_to_the_users_listeners(self):
+        broker = get_event_broker()
+        async with broker.listen(1) as first, broker.listen(1) as second, broker.listen(2) as other:
+            send_event(1, "event: sync\ndata: {}\n\n")
+            self.assertEqual(await asyncio.wait_for(first.get(), 1), "event: sync\ndata: {}\n\n")
+            self.assertEqual(await asyncio.wait_for(second.get(), 1), "event: sync\ndata: {}\n\n")
+            self.assertTrue(other.empty())
+        self.assertEqual(broker.listeners, {})
+
+    @override_settings(HABIT_EVENTS_STREAM_SECONDS=1, HABIT_EVENTS_KEEPALIVE_SECONDS=5)
+    async def test_stream(self):
+        response = await self.async_client.get(
+            reverse("habit-events"), headers={"Authorization": f"Bearer {self.token}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+        send_event(self.user.id, "event: sync\ndata: {}\n\n")
+        self.assertEqual(await asyncio.wait_for(anext(stream), 1), b"event: sync\ndata: {}\n\n")
+        # Потік завершується сам, щойно минає HABIT_EVENTS_STREAM_SECONDS
+        self.assertEqual([chunk async for chunk in stream], [b": keepalive\n\n"])
+
+        response = await self.async_client.get(reverse("habit-events"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class QueryPlanTest(CleanCacheTestCase):
+    def test_hot_queries_use_their_indexes(self):
+        user = User.objects.create_user(username="user", password="pass1234")
+        habit = Habit.objects.create(user=user, name="Read")
+        HabitSchedule.objects.create(habit=habit, day_of_week=0)
+        HabitRecord.objects.create(habit=habit, date=date(2025, 1, 1), completed=True)
+
+        context = {"user": user, "habit": habit, "today": timezone.localdate()}
+        for name, index, ok, plan in check_query_plans(context, avoid_seq_scan=True):
+            with self.subTest(name):
+                self.assertTrue(ok, f"{name} does not use {index}:\n{plan}")
+
+
+@skipUnless(connection.vendor == "postgresql", "habit records are partitioned on Postgres only")
+class RecordPartitionTest(CleanCacheTestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="user", password="pass1234")
+        self.habit = Habit.objects.create(user=user, name="Read")
+
+    def test_partitions_are_created_ahead(self):
+        self.assertTrue(records_partitioned())
+        created = ensure_record_partitions(ahead=2, today=date(2031, 11, 15))
+        months = [date(2031, 11, 1), date(2031, 12, 1), date(2032, 1, 1)]
+        self.assertEqual(created, [partition_name(month) for month in months])
+        self.assertEqual(ensure_record_partitions(ahead=2, today=date(2031, 11, 15)), [])
+
+    def test_new_partition_takes_records_from_default(self):
+        record = HabitRecord.objects.create(habit=self.habit, date=date(2031, 11, 3), completed=True)
+        HabitRecord.objects.create(habit=self.habit, date=date(2031, 12, 3), completed=True)
+
+        ensure_record_partitions(ahead=0, today=date(2031, 11, 15))
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT id FROM "{partition_name(date(2031, 11, 1))}"')
+            self.assertEqual(cursor.fetchall(), [(record.id,)])
+        self.assertEqual(HabitRecord.objects.filter(habit=self.habit).count(), 2)
+
+    def test_date_bounded_query_reads_one_partition(self):
+        ensure_record_partitions(ahead=1, today=date(2031, 11, 1))
+        plan = HabitRecord.objects.filter(
+            habit=self.habit, date__range=(date(2031, 11, 1), date(2031, 11, 30))
+        ).explain()
+
+        self.assertIn(partition_name(date(2031, 11, 1)), plan)
+        self.assertNotIn(partition_name(date(2031, 12, 1)), plan)
+        self.assertNotIn("habits_habitrecord_default", plan)
+
+    def test_old_empty_partitions_are_detached(self):
+        ensure_record_partitions(ahead=1, today=date(2020, 11, 1))
+
+        detached = detach_record_partitions(date(2020, 12, 1))
+
+        self.assertIn(partition_name(date(2020, 11, 1)), detached)
+        self.assertNotIn(date(2020, 11, 1), record_partitions())
+        self.assertIn(date(2020, 12, 1), record_partitions())
+
+    def test_partition_holding_records_is_kept(self):
+        ensure_record_partitions(ahead=1, today=date(2020, 11, 1))
+        HabitRecord.objects.create(habit=self.habit, date=date(2020, 11, 3), completed=True)
+
+        detached = detach_record_partitions(date(2020, 12, 1))
+
+        self.assertNotIn(partition_name(date(2020, 11, 1)), detached)
+        self.assertIn(date(2020, 11, 1), record_partitions())
+        self.assertTrue(HabitRecord.objects.filter(date=date(2020, 11, 3)).exists())
+
+    def test_partitions_past_the_archive_horizon_are_kept(self):
+        ensure_record_partitions(ahead=1, today=date(2031, 11, 1))
+        horizon_month = month_start(archive_horizon())
+
+        detached = detach_record_partitions(date(2031, 12, 1))
+
+        self.assertNotIn(partition_name(date(2031, 11, 1)), detached)
+        self.assertTrue(all(month >= horizon_month for month in record_partitions()))
+
+
+class ApiBenchmarkTest(CleanCacheTestCase):
+    def test_every_route_has_a_scenario(self):
+        self.assertEqual(uncovered_routes(), [])
+
+    def test_query_count_regression_fails(self):
+        seed_dataset(users=2, habits_per_user=2, records_per_habit=10)
+        results = run_benchmarks(iterations=1, warmup=0)
+        self.assertEqual(set(results), {scenario["name"] for scenario in SCENARIOS})
+
+        environment = {"vendor": connection.vendor}
+        baseline = {"environment": environment, "endpoints": results}
+        self.assertEqual(compare_with_baseline(results, baseline, environment)[0], [])
+
+        fewer = {**results["habit-list GET"], "queries": results["habit-list GET"]["queries"] - 1}
+        baseline["endpoints"] = {**results, "habit-list GET": fewer}
+        regressions, _ = compare_with_baseline(results, baseline, {"vendor": "other"})
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("habit-list GET", regressions[0])
+
+
+@skipUnless(connection.vendor == "postgresql", "SQLite test databases keep their connections open")
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+class ConnectionChurnTest(TransactionTestCase):
+    def setUp(self):
+        seed_dataset(users=1, habits_per_user=1, records_per_habit=3)
+
+    def test_persistent_connections_are_reused_across_calls(self):
+        closed = measure_connection_churn(0, threads=2, calls_per_thread=4)
+        self.assertEqual((closed["calls"], closed["connections"]), (8, 8))
+
+        persistent = measure_connection_churn(60, threads=2, calls_per_thread=4)
+        self.assertEqual((persistent["calls"], persistent["connections"]), (8, 2))
+
+
+class LoadTestTest(CleanCacheTestCase):
+    def test_requests_every_route_with_the_token(self):
+        requested = set()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                requested.add((self.path, self.headers["Authorization"]))
+                self.send_response(200 if self.path != reverse("calendar") else 500)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            result = run_load(f"http://127.0.0.1:{server.server_port}", "token", concurrency=2, duration=0.5)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(requested, {(reverse(route), "Bearer token") for route in LOAD_TEST_ROUTES})
+        self.assertGreater(result["errors"], 0)
+        self.assertLess(result["errors"], result["requests"])
+
+    def test_seed_keeps_data_of_other_users(self):
+        user = User.objects.create_user(username="user", password="pass1234")
+        habit = Habit.objects.create(user=user, name="Read", start_date=date(2025, 6, 1))
+        HabitRecord.objects.create(habit=habit, date=date(2025, 6, 2), completed=True)
+        HabitDailyRollup.objects.create(
+            user=user, habit=habit, date=date(2025, 6, 2), record_count=1, completed_count=1
+        )
+
+        with self.assertRaises(CommandError):
+            call_command("load_test", "--seed", stdout=StringIO())
+        self.assertFalse(User.objects.filter(username="bench-0").exists())
+
+        probe = seed_probe_user("secret-pass", habits_per_user=2, records_per_habit=5)
+
+        self.assertTrue(probe.check_password("secret-pass"))
+        self.assertEqual(HabitStats.objects.get(habit=habit).completed_count, 1)
+        self.assertTrue(HabitDailyRollup.objects.filter(habit=habit).exists())
+        self.assertEqual(HabitStats.objects.filter(habit__user=probe).count(), 2)
+        self.assertEqual(HabitDailyRollup.objects.filter(user=probe).count(), 10)
+
+
+class TodayDashboardTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.client.force_authenticate(self.user)
+        # 2.06.2025 — понеділок
+        self.day = date(2025, 6, 2)
+        self.start = self.day - timedelta(days=30)
+        self.weekdays = Habit.objects.create(user=self.user, name="Gym", start_date=self.start)
+        for day_of_week in (0, 2, 4):
+            HabitSchedule.objects.create(habit=self.weekdays, day_of_week=day_of_week)
+        self.daily = Habit.objects.create(user=self.user, name="Water", start_date=self.start)
+        self.weekend = Habit.objects.create(user=self.user, name="Hike", start_date=self.start)
+        HabitSchedule.objects.create(habit=self.weekend, day_of_week=5)
+        Habit.objects.create(user=self.user, name="Paused", start_date=self.start, is_active=False)
+        Habit.objects.create(user=self.user, name="Later", start_date=self.day + timedelta(days=1))
+        self.record = HabitRecord.objects.create(habit=self.daily, date=self.day, completed=True)
+        HabitRecord.objects.create(habit=self.daily, date=self.day - timedelta(days=1), completed=True)
+
+    def test_lists_habits_planned_for_the_day_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("today"), {"date": self.day})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["date"], self.day)
+        habits = {habit["name"]: habit for habit in response.data["habits"]}
+        self.assertEqual(set(habits), {"Gym", "Water"})
+        self.assertIsNone(habits["Gym"]["record"])
+        self.assertEqual(habits["Gym"]["current_streak"], 0)
+        self.assertEqual(habits["Water"]["record"]["id"], self.record.id)
+        self.assertTrue(habits["Water"]["record"]["completed"])
+        self.assertEqual(habits["Water"]["current_streak"], 2)
+
+    def test_defaults_to_today_in_user_timezone(self):
+        self.user.profile.timezone = "Pacific/Kiritimati"
+        self.user.profile.save()
+        now = datetime(2025, 6, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            response = self.client.get(reverse("today"))
+
+        self.assertEqual(response.data["date"], self.day)
+
+    def test_bulk_check_off(self):
+        payload = {
+            "date": self.day.isoformat(),
+            "habits": [{"habit": self.weekdays.id, "completed": True}, {"habit": self.weekend.id, "completed": True}],
+        }
+        response = self.client.post(reverse("today"), payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result["status"] for result in response.data["results"]], ["ok", "ok"])
+        gym = next(habit for habit in response.data["habits"] if habit["name"] == "Gym")
+        self.assertTrue(gym["record"]["completed"])
+        self.assertEqual(gym["current_streak"], 1)
+        self.assertTrue(HabitRecord.objects.filter(habit=self.weekend, date=self.day, completed=True).exists())
+
+    def test_bulk_check_off_rejects_foreign_habits(self):
+        other = User.objects.create_user(username="other", password="pass1234")
+        foreign = Habit.objects.create(user=other, name="Foreign")
+
+        response = self.client.post(reverse("today"), {"habits": [{"habit": foreign.id}]}, format="json")
+        self.assertEqual(response.data["results"][0]["status"], "error")
+        self.assertFalse(HabitRecord.objects.filter(habit=foreign).exists())
+
+        response = self.client.post(reverse("today"), {"habits": "all"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HabitCalendarTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.client.force_authenticate(self.user)
+        self.habit = Habit.objects.create(user=self.user, name="Run", start_date=date(2024, 12, 1))
+        for day in (0, 2, 4):
+            HabitSchedule.objects.create(habit=self.habit, day_of_week=day)
+        self.first_day = date(2025, 1, 1)
+        self.completed = [date(2025, 1, 1), date(2025, 1, 3), date(2025, 7, 14), date(2025, 12, 31)]
+        for day in self.completed:
+            HabitRecord.objects.create(habit=self.habit, date=day, completed=True)
+        HabitRecord.objects.create(habit=self.habit, date=date(2025, 1, 6), completed=False)
+        HabitRecord.objects.create(habit=self.habit, date=date(2024, 12, 30), completed=True)
+
+    def days(self, bitmap):
+        bits = decode_bitmap(bitmap)
+        return [self.first_day + timedelta(days=n) for n in range(bits.bit_length()) if bits >> n & 1]
+
+    def test_bitmaps_of_completed_and_scheduled_days(self):
+        response = self.client.get(reverse("habit-calendar", args=[self.habit.id]), {"year": 2025})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["days"], 365)
+        [calendar] = response.data["habits"]
+        self.assertEqual(calendar["habit"], self.habit.id)
+        self.assertEqual(self.days(calendar["completed"]), self.completed)
+        scheduled = self.days(calendar["scheduled"])
+        self.assertEqual(len(scheduled), scheduled_days_between(self.first_day, date(2025, 12, 31), 0b10101))
+        self.assertTrue(all(day.weekday() in (0, 2, 4) for day in scheduled))
+
+    def test_unknown_or_other_users_habit_returns_404(self):
+        other = Habit.objects.create(user=User.objects.create_user(username="other"), name="Read")
+        for habit_id in (other.id, other.id + 1000):
+            response = self.client.get(reverse("habit-calendar", args=[habit_id]), {"year": 2025})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_scheduled_days_start_at_habit_start(self):
+        other = Habit.objects.create(user=self.user, name="Read", start_date=date(2025, 3, 10))
+        response = self.client.get(reverse("calendar"), {"year": 2025})
+
+        calendars = {calendar["habit"]: calendar for calendar in response.data["habits"]}
+        self.assertEqual(set(calendars), {self.habit.id, other.id})
+        scheduled = self.days(calendars[other.id]["scheduled"])
+        self.assertEqual(scheduled[0], date(2025, 3, 10))
+        self.assertEqual(len(scheduled), (date(2025, 12, 31) - date(2025, 3, 10)).days + 1)
+        self.assertEqual(decode_bitmap(calendars[other.id]["completed"]), 0)
+
+    def test_single_query_and_small_payload(self):
+        existing = set(HabitRecord.objects.filter(habit=self.habit).values_list("date", flat=True))
+        HabitRecord.objects.bulk_create(
+            HabitRecord(habit=self.habit, date=self.first_day + timedelta(days=n), completed=True)
+            for n in range(365)
+            if self.first_day + timedelta(days=n) not in existing
+        )
+        with self.assertNumQueries(1), override_settings(HABIT_RECORD_ARCHIVE_AFTER_DAYS=36500):
+            response = self.client.get(reverse("habit-calendar", args=[self.habit.id]), {"year": 2025})
+
+        records = HabitRecord.objects.filter(habit=self.habit, date__year=2025)
+        listed = json.dumps(HabitRecordSerializer(records, many=True).data, cls=DjangoJSONEncoder)
+        self.assertGreaterEqual(len(listed) / len(response.content), 100)
+
+    def test_invalid_year(self):
+        response = self.client.get(reverse("calendar"), {"year": "abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HabitExportTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.habit = Habit.objects.create(user=self.user, name="Workout", start_date=date(2025, 1, 1))
+        HabitSchedule.objects.create(habit=self.habit, day_of_week=0)
+        for offset in range(3):
+            HabitRecord.objects.create(habit=self.habit, date=date(2025, 1, 1) + timedelta(days=offset), completed=True)
+        other = Habit.objects.create(user=User.objects.create_user(username="other"), name="Read")
+        HabitRecord.objects.create(habit=other, date=date(2025, 1, 1))
+
+        token = self.client.post(reverse("token_obtain_pair"), {"username": "user", "password": "pass1234"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token.json()['access']}")
+
+    def test_streams_ndjson_with_constant_number_of_queries(self):
+        response = self.client.get(reverse("habit-export"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        with self.assertNumQueries(4):
+            rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual([row["type"] for row in rows], ["habit", "schedule", "record", "record", "record"])
+        self.assertEqual(rows[0]["name"], "Workout")
+        self.assertEqual(rows[-1]["date"], "2025-01-03")
+
+    def test_streams_csv(self):
+        response = self.client.get(reverse("habit-export"), {"file_format": "csv"})
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+
+        rows = list(csv.DictReader(StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1]["type"], "schedule")
+        self.assertEqual(rows[1]["day_of_week"], "0")
+
+    def test_background_export_produces_gzip_file(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse("export-job-list"), {"file_format": "ndjson"}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+            job = self.client.get(reverse("export-job-detail", args=[response.data["id"]])).data
+            self.assertEqual(job["status"], "done")
+
+            download = self.client.get(job["download_url"])
+            lines = gzip.decompress(b"".join(download.streaming_content)).decode().splitlines()
+            self.assertEqual(len(lines), 5)
+
+
+@override_settings(MEDIA_ROOT=tempfile.gettempdir())
+class HabitImportTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.habit = Habit.objects.create(user=self.user, name="Workout", start_date=date(2025, 1, 1))
+        HabitRecord.objects.create(habit=self.habit, date=date(2025, 1, 1))
+
+        token = self.client.post(reverse("token_obtain_pair"), {"username": "user", "password": "pass1234"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token.json()['access']}")
+        self.url = reverse("import-job-list")
+
+    def upload(self, name, content):
+        return self.client.post(self.url, {"file": SimpleUploadedFile(name, content)}, format="multipart")
+
+    def test_csv_upsert_creates_missing_habits(self):
+        content = (
+            "habit,date,completed\n"
+            "Workout,2025-01-01,true\n"
+            "Yoga,2025-01-06,true\n"
+            "Yoga,2025-01-05,false\n"
+            "Yoga,not-a-date,true\n"
+        )
+        response = self.upload("history.csv", content.encode())
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["status"], "done")
+        self.assertEqual((response.data["imported_rows"], response.data["failed_rows"]), (3, 1))
+        self.assertEqual(response.data["errors"][0]["line"], 4)
+
+        self.assertTrue(HabitRecord.objects.get(habit=self.habit, date=date(2025, 1, 1)).completed)
+        yoga = Habit.objects.get(user=self.user, name="Yoga")
+        self.assertEqual(yoga.start_date, date(2025, 1, 5))
+        self.assertEqual(yoga.stats.completed_count, 1)
+
+    def test_export_can_be_imported_back(self):
+        HabitSchedule.objects.create(habit=self.habit, day_of_week=2, remind_hour=7)
+        exported = "".join(export_lines(self.user, "ndjson")).encode()
+        other = User.objects.create_user(username="other", password="pass1234")
+
+        with tempfile.NamedTemporaryFile(suffix=".ndjson.gz") as file:
+            file.write(gzip.compress(exported))
+            file.flush()
+            call_command("import_habit_history", "other", file.name, stdout=StringIO(), stderr=StringIO())
+
+        habit = Habit.objects.get(user=other)
+        self.assertEqual((habit.name, habit.start_date), ("Workout", date(2025, 1, 1)))
+        self.assertEqual(habit.schedule.get().remind_hour, 7)
+        self.assertEqual(habit.records.count(), 1)
+
+    def test_number_of_queries_does_not_grow_with_rows(self):
+        def count_queries(rows):
+            lines = [
+                json.dumps({"habit": "Workout", "date": str(date(2024, 1, 1) + timedelta(days=n))}) for n in range(rows)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                import_habit_history(self.user, read_rows(BytesIO("\n".join(lines).encode()), "ndjson"))
+            return len(queries)
+
+        self.assertEqual(count_queries(10), count_queries(150))
+
+    def test_large_upload_is_imported_in_background(self):
+        with override_settings(HABIT_IMPORT_INLINE_MAX_BYTES=0), self.captureOnCommitCallbacks(execute=True):
+            response = self.upload("history.ndjson", b'{"habit": "Workout", "date": "2025-01-02"}\n')
+        self.assertEqual(response.data["status"], "pending")
+
+        job = self.client.get(reverse("import-job-detail", args=[response.data["id"]])).data
+        self.assertEqual((job["status"], job["processed_rows"], job["imported_rows"]), ("done", 1, 1))
+
+
+class HabitScheduleBulkTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234")
+        self.habit = Habit.objects.create(user=self.user, name="Workout", start_date=date(2025, 6, 2))
+        HabitSchedule.objects.create(habit=self.habit, day_of_week=5)
+        HabitSchedule.objects.create(habit=self.habit, day_of_week=0, remind_hour=9)
+        HabitRecord.objects.create(habit=self.habit, date=date(2025, 6, 3), completed=True)
+
+        token = self.client.post(reverse("token_obtain_pair"), {"username": "user", "password": "pass1234"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token.json()['access']}")
+        self.url = reverse("habit-schedule-bulk", args=[self.habit.id])
+        self.weekdays = [{"day_of_week": day, "remind_hour": 7} for day in range(5)]
+
+    def test_replaces_schedule_and_syncs_once(self):
+        with mock.patch("habits.schedule_sync.rebuild_habit_stats") as rebuild:
+            response = self.client.put(self.url, self.weekdays, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["day_of_week"] for item in response.data], [0, 1, 2, 3, 4])
+        self.assertEqual(rebuild.call_count, 1)
+        self.assertEqual(
+            list(self.habit.schedule.order_by("day_of_week").values_list("day_of_week", "remind_hour")),
+            [(day, 7) for day in range(5)],
+        )
+
+    def test_unchanged_schedule_writes_nothing(self):
+        self.client.put(self.url, self.weekdays, format="json")
+        self.habit.stats.refresh_from_db()
+        self.assertEqual(self.habit.stats.completed_count, 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.put(self.url, self.weekdays, format="json")
+        writes = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+        self.assertEqual(writes, [])
+
+    def test_rejects_duplicate_days(self):
+        response = self.client.put(self.url, [{"day_of_week": 1}, {"day_of_week": 1}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.habit.schedule.count(), 2)
+
+
+class HabitReminderStateTest(CleanCacheTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user", password="pass1234", email="user@example.com")
+        self.habit = Habit.objects.create(user=self.user, name="Workout")
+        for day in range(3):
+            HabitSchedule.objects.create(habit=self.habit, day_of_week=day, remind_hour=8)
+
+    def test_deactivating_habit_disables_reminders_with_one_update(self):
+        self.habit.is_active = False
+        with CaptureQueriesContext(connection) as queries:
+            self.habit.save()
+        updates = [
+            query["sql"] for query in queries.captured_queries if 'UPDATE "habits_habitschedule"' in query["sql"]
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(HabitSchedule.objects.filter(reminder_enabled=True).exists())
+
+        later = timezone.now() + timedelta(weeks=1)
+        self.assertEqual(list(due_reminders(later)), [])
+
+        HabitSchedule.objects.create(habit=self.habit, day_of_week=4)
+        self.assertFalse(HabitSchedule.objects.get(day_of_week=4).reminder_enabled)
+
+        self.habit.is_active = True
+        self.habit.save()
+        self.assertEqual(len(due_reminders(later)), 4)
+
+    def test_deleting_habits_removes_schedules_and_records_in_bulk(self):
+        for offset in range(20):
+            HabitRecord.objects.create(habit=self.habit, date=date(2025, 1, 1) + timedelta(days=offset))
+
+        with CaptureQueriesContext(connection) as queries:
+            Habit.objects.filter(user=self.user).delete()
+
+        sql = [query["sql"] for query in queries.captured_queries]
+        self.assertEqual(sum(query.startswith('DELETE FROM "habits_habitschedule"') for query in sql), 1)
+        self.assertEqual(sum(query.startswith('DELETE FROM "habits_habitrecord"') for query in sql), 1)
+        self.assertFalse(any(query.startswith('SELECT "habits_habitrecord"') for query in sql))
+        self.assertFalse(HabitSchedule.objects.exists())
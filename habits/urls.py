@@ -3,14 +3,22 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
 
 from .views import (
+    ExportJobViewSet,
     HabitAnalyticsView,
+    HabitCalendarView,
+    HabitExportView,
+    HabitRecordBulkView,
     HabitRecordViewSet,
     HabitScheduleViewSet,
     HabitViewSet,
+    ImportJobViewSet,
+    TodayView,
 )
 
 router = DefaultRouter()
 router.register(r"habits", HabitViewSet, basename="habit")
+router.register(r"export/jobs", ExportJobViewSet, basename="export-job")
+router.register(r"import/jobs", ImportJobViewSet, basename="import-job")
 
 nested_router = routers.NestedSimpleRouter(router, "habits", lookup="habit")
 nested_router.register(r"schedule", HabitScheduleViewSet, basename="habit-schedule")
@@ -19,9 +27,15 @@ nested_router.register(r"records", HabitRecordViewSet, basename="habit-records")
 urlpatterns = [
     path("", include(router.urls)),
     path("", include(nested_router.urls)),
+    path("records/bulk/", HabitRecordBulkView.as_view(), name="habit-records-bulk"),
+    path("analytics/", HabitAnalyticsView.as_view(), name="analytics"),
+    path("calendar/", HabitCalendarView.as_view(), name="calendar"),
+    path("today/", TodayView.as_view(), name="today"),
+    path("export/", HabitExportView.as_view(), name="habit-export"),
     path(
         "habits/<int:habit_pk>/analytics/",
         HabitAnalyticsView.as_view(),
         name="habit-analytics",
     ),
+    path("habits/<int:habit_pk>/calendar/", HabitCalendarView.as_view(), name="habit-calendar"),
 ]
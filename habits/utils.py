@@ -1,38 +1,22 @@
-import json
+from itertools import islice
 
-from django.conf import settings
-from django_celery_beat.models import CrontabSchedule, PeriodicTask
+from .models import Habit
 
 
-def create_or_update_task_for_schedule(habit_schedule):
-    hour = habit_schedule.remind_hour
-    minute = habit_schedule.remind_minute
+def chunked(iterable, size):
+    """Splits an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
 
-    # У моделі HabitSchedule 0 - це понеділок, а в Crontab 0 - це неділя,
-    # тому потрібно змістити дні тижня на 1 вправо, щоб перевести день тижня у формат,
-    # зрозумілий crontab.Наприклад: якщо habit_schedule.day_of_week == 0 (Понеділок),
-    # то day_map[0] поверне '1' - Понеділок для crontab.
-    day_map = {0: "1", 1: "2", 2: "3", 3: "4", 4: "5", 5: "6", 6: "0"}
-    day_of_week = day_map[habit_schedule.day_of_week]
 
-    schedule, _ = CrontabSchedule.objects.get_or_create(
-        minute=str(minute),
-        hour=str(hour),
-        day_of_week=day_of_week,  # тільки в потрібний день тижня
-        day_of_month="*",  # тільки в потрібний день тижня# у будь-який день місяця
-        month_of_year="*",  # у будь-який місяць
-        timezone=settings.TIME_ZONE,
-    )
+def habit_owner_id(instance):
+    """The user id of a schedule or record, without loading the habit when it is not cached."""
+    if type(instance).habit.is_cached(instance):
+        return instance.habit.user_id
+    return Habit.objects.filter(pk=instance.habit_id).values_list("user_id", flat=True).first()
 
-    task_name = f"remind_habit_{habit_schedule.id}"
-    task_args = json.dumps([habit_schedule.habit.user.id, habit_schedule.habit.id])
 
-    PeriodicTask.objects.update_or_create(
-        name=task_name,
-        defaults={
-            "crontab": schedule,
-            "task": "habits.task.send_habit_email",
-            "args": task_args,
-            "enabled": habit_schedule.habit.is_active,
-        },
-    )
+def guess_file_format(filename):
+    """Export/import format by file name: "csv" for .csv and .csv.gz files, NDJSON otherwise."""
+    return "csv" if ".csv" in filename.lower() else "ndjson"
@@ -1,45 +1,115 @@
-from django.db.models import Count
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import permissions, viewsets
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
 
-from .filters import HabitAnalyticsFilter, HabitRecordFilter
-from .models import Habit, HabitRecord, HabitSchedule
+from users.utils import user_localdate
+
+from .analytics import habit_analytics
+from .archive import archive_horizon, archived_records
+from .bitmaps import days_in_year, habit_calendar, year_bounds
+from .cache import CachedResponseMixin
+from .dashboard import due_habits
+from .exports import CONTENT_TYPES, export_lines
+from .filters import HabitAnalyticsFilter, HabitRecordFilter, filter_values
+from .models import (
+    ExportJob,
+    Habit,
+    HabitRecord,
+    HabitSchedule,
+    ImportJob,
+)
 from .permissions import IsOwner
-from .serializers import HabitRecordSerializer, HabitScheduleSerializer, HabitSerializer
+from .records import delete_habit_record, record_moved, upsert_habit_records
+from .rollups import analytics_sources, get_rollup_watermark
+from .schedule_sync import delete_habit_schedule, replace_habit_schedule
+from .serializers import (
+    ExportJobSerializer,
+    HabitAnalyticsParamsSerializer,
+    HabitCalendarParamsSerializer,
+    HabitExportParamsSerializer,
+    HabitRecordBulkItemSerializer,
+    HabitRecordSerializer,
+    HabitScheduleBulkItemSerializer,
+    HabitScheduleSerializer,
+    HabitSerializer,
+    ImportJobSerializer,
+    TodayHabitSerializer,
+    TodayParamsSerializer,
+)
+from .tasks import generate_habit_export, import_habit_file
 
 
-class HabitViewSet(viewsets.ModelViewSet):
+class HabitViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Habit.objects.all()
     serializer_class = HabitSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
-        return Habit.objects.filter(user=self.request.user)
+        return Habit.objects.filter(user_id=self.request.user.id).select_related("stats", "user__profile")
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        # Користувач із профілем береться з кешу: за його часовим поясом рахуються серії у відповіді
+        serializer.save(user=self.request.user.user)
 
 
 class HabitRelatedViewSet(viewsets.ModelViewSet):
     permission_classes = [IsOwner]
 
     def get_habit(self):
-        habit_id = self.kwargs["habit_pk"]
-        return Habit.objects.get(id=habit_id, user=self.request.user)
+        """
+        Loads the parent habit together with its owner once per request; 404 if it does not exist
+        or belongs to another user, so the two cases cannot be told apart.
+        """
+        if not hasattr(self.request, "habit"):
+            habits = Habit.objects.select_related("user__profile")
+            self.request.habit = get_object_or_404(habits, id=self.kwargs["habit_pk"], user_id=self.request.user.id)
+        return self.request.habit
 
 
-class HabitScheduleViewSet(HabitRelatedViewSet):
+class HabitScheduleViewSet(CachedResponseMixin, HabitRelatedViewSet):
     serializer_class = HabitScheduleSerializer
+    cursor_ordering = ("day_of_week", "id")
 
     def get_queryset(self):
-        habit = self.get_habit()
-        return HabitSchedule.objects.filter(habit=habit)
+        return HabitSchedule.objects.filter(habit=self.get_habit()).select_related("habit__user__profile")
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
 
     def perform_create(self, serializer):
-        habit = self.get_habit()
-        serializer.save(habit=habit)
+        serializer.save(habit=self.get_habit())
+
+    def perform_destroy(self, instance):
+        delete_habit_schedule(instance)
+
+    @action(detail=False, methods=["put"])
+    def bulk(self, request, habit_pk=None):
+        """Replaces the whole weekly schedule with the given list of days in one transaction."""
+        serializer = HabitScheduleBulkItemSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        days = [item["day_of_week"] for item in serializer.validated_data]
+        if len(days) != len(set(days)):
+            return Response({"detail": "Кожен день тижня можна вказати лише раз."}, status=status.HTTP_400_BAD_REQUEST)
+
+        schedule = replace_habit_schedule(self.get_habit(), serializer.validated_data)
+        return Response(HabitScheduleSerializer(schedule, many=True).data)
 
 
 class HabitRecordViewSet(HabitRelatedViewSet):
@@ -47,28 +117,259 @@ class HabitRecordViewSet(HabitRelatedViewSet):
     permission_classes = [IsOwner]
     filter_backends = [DjangoFilterBackend]
     filterset_class = HabitRecordFilter
+    # Дата унікальна в межах звички, а в архівних записів немає id
+    cursor_ordering = ("-date",)
 
     def get_queryset(self):
-        habit = self.get_habit()
-        return HabitRecord.objects.filter(habit=habit)
+        return HabitRecord.objects.filter(habit=self.get_habit()).select_related("habit__user")
+
+    def paginate_queryset(self, queryset):
+        """
+        Reads the page of hot records and, when it reaches past the archive horizon, merges in
+        the archived records of the habit (see habits.archive), which have no id.
+        """
+        paginator = self.paginator
+        rows = list(paginator.get_page_queryset(queryset, self.request, view=self))
+        # Архівні дні старші за горизонт, тож повна сторінка новіших записів їх не містить
+        if len(rows) > paginator.page_size and rows[-1].date >= archive_horizon():
+            return paginator.set_page(rows)
+
+        filters = filter_values(self, self.request)
+        if filters["habit"] not in (None, self.get_habit()):
+            return paginator.set_page(rows)
+        end = filters["date__lte"]
+        position = paginator.decode_cursor(self.request)
+        if position is not None:
+            before = HabitRecord._meta.get_field("date").to_python(position[0]) - timedelta(days=1)
+            end = min(end, before) if end else before
+
+        archived = archived_records([self.get_habit().id], filters["date__gte"], end, filters["completed"])
+        rows = sorted(rows + archived, key=lambda record: record.date, reverse=True)
+        return paginator.set_page(rows[: paginator.page_size + 1])
 
     def perform_create(self, serializer):
-        habit = self.get_habit()
-        serializer.save(habit=habit)
+        serializer.save(habit=self.get_habit())
+
+    def perform_update(self, serializer):
+        previous_date = serializer.instance.date
+        if serializer.validated_data.get("date", previous_date) == previous_date:
+            serializer.save()
+            return
+        with transaction.atomic():
+            record_moved(serializer.save(), previous_date)
 
+    def perform_destroy(self, instance):
+        delete_habit_record(instance)
+
+
+class HabitRecordBulkView(GenericAPIView):
+    """
+    Creates or updates records of many habits in one request, e.g. when a client syncs
+    check-ins made offline. Accepts a list of {habit, date, completed, completed_at} items.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = HabitRecordBulkItemSerializer
+
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({"detail": "Очікується список записів."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.HABIT_RECORDS_BULK_MAX_ITEMS:
+            return Response(
+                {"detail": f"Не більше {settings.HABIT_RECORDS_BULK_MAX_ITEMS} записів за один запит."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = upsert_habit_records(request.user, items, self.get_serializer())
+        saved = sum(1 for result in results if result["status"] == "ok")
+        return Response({"saved": saved, "failed": len(results) - saved, "results": results})
+
+
+class TodayView(CachedResponseMixin, GenericAPIView):
+    """
+    Home screen data: every active habit planned for a day (`date`, today in the user's time
+    zone by default) with its record for that day and current streak, read with one query.
+
+    POST checks habits off in bulk: it takes {"date", "habits": [{"habit", "completed",
+    "completed_at"}, ...]}, saves the records like /records/bulk/ and answers with the
+    refreshed dashboard plus the result of every item.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def cache_variant(self, request):
+        # Без ?date= «сьогодні» залежить від часового поясу користувача
+        return "" if "date" in request.query_params else str(user_localdate(request.user))
+
+    def get(self, request):
+        return self.cached_response(request, self.build_today)
+
+    def build_today(self, request):
+        return Response(self.dashboard(request.user, self.get_date(request.query_params)))
+
+    def post(self, request):
+        day = self.get_date(request.data)
+        items = request.data.get("habits")
+        if not isinstance(items, list):
+            return Response({"detail": "Очікується список звичок."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.HABIT_RECORDS_BULK_MAX_ITEMS:
+            return Response(
+                {"detail": f"Не більше {settings.HABIT_RECORDS_BULK_MAX_ITEMS} записів за один запит."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        items = [dict(item, date=day) if isinstance(item, dict) else item for item in items]
+        results = upsert_habit_records(request.user, items, HabitRecordBulkItemSerializer())
+        return Response({**self.dashboard(request.user, day), "results": results})
+
+    def get_date(self, data):
+        params = TodayParamsSerializer(data=data)
+        params.is_valid(raise_exception=True)
+        return params.validated_data.get("date") or user_localdate(self.request.user)
+
+    def dashboard(self, user, day):
+        habits = TodayHabitSerializer(due_habits(user, day), many=True, context={"date": day})
+        return {"date": day, "habits": habits.data}
+
+
+class HabitAnalyticsView(CachedResponseMixin, GenericAPIView):
+    """
+    Aggregated statistics over the records of one habit or of all habits of the user.
+
+    Query parameters: `granularity` (day, week, month or weekday), `metrics` (comma separated
+    completed_count, record_count, missed_count, scheduled_count, completion_rate),
+    `start_date`, `end_date` and `completed`.
+    """
 
-class HabitAnalyticsView(GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_class = HabitAnalyticsFilter
-    queryset = HabitRecord.objects.filter(completed=True)
+    queryset = HabitRecord.objects.all()
+
+    def get(self, request, habit_pk=None):
+        return self.cached_response(request, self.build_analytics, habit_pk=habit_pk)
+
+    def build_analytics(self, request, habit_pk=None):
+        params = HabitAnalyticsParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        records, habits, rollups = analytics_sources(
+            request.user,
+            self.filter_queryset(self.get_queryset()),
+            params.validated_data,
+            get_rollup_watermark(),
+            habit_pk=habit_pk,
+            use_rollups="completed" not in request.query_params,
+        )
+        # Rollup-таблиця вже містить архівні дні
+        archived = None
+        if rollups is None:
+            archived = archived_records(
+                habits,
+                params.validated_data.get("start_date"),
+                params.validated_data.get("end_date"),
+                filter_values(self, request)["completed"],
+            )
+        return Response(habit_analytics(records, habits, rollups=rollups, archived=archived, **params.validated_data))
+
+
+class HabitCalendarView(CachedResponseMixin, GenericAPIView):
+    """
+    Year heatmap of one habit or of all habits of the user: base64 bitmaps of the completed
+    and the scheduled days (see habits.bitmaps) for the year given in the `year` query parameter.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, habit_pk=None):
-        queryset = self.filter_queryset(self.get_queryset())
+        return self.cached_response(request, self.build_calendar, habit_pk=habit_pk)
+
+    def build_calendar(self, request, habit_pk=None):
+        params = HabitCalendarParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        year = params.validated_data["year"]
 
+        habits = Habit.objects.filter(user_id=request.user.id)
         if habit_pk:
-            queryset = queryset.filter(habit_id=habit_pk, habit__user=request.user)
+            habits = habits.filter(pk=habit_pk)
+
+        archived = archived_records(habits, *year_bounds(year), completed=True)
+        calendar = habit_calendar(habits, year, archived)
+        if habit_pk and not calendar:
+            raise Http404
+        return Response({"year": year, "days": days_in_year(year), "habits": calendar})
+
+
+class HabitExportView(GenericAPIView):
+    """
+    Streams all habits, schedules and records of the user as NDJSON (default) or CSV,
+    chosen with the `file_format` query parameter.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        params = HabitExportParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        file_format = params.validated_data["file_format"]
 
-        analytics = queryset.values("date").annotate(completed_count=Count("id")).order_by("date")
+        response = StreamingHttpResponse(
+            export_lines(request.user, file_format), content_type=f"{CONTENT_TYPES[file_format]}; charset=utf-8"
+        )
+        response["Content-Disposition"] = f'attachment; filename="habits.{file_format}"'
+        return response
 
-        return Response(analytics)
+
+class ExportJobViewSet(
+    mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+):
+    """Background exports for very large histories; the finished gzip file is fetched from `download`."""
+
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ("-created_at", "-id")
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(user_id=self.request.user.id)
+
+    def perform_create(self, serializer):
+        job = serializer.save(user_id=self.request.user.id)
+        transaction.on_commit(partial(generate_habit_export.delay, job.id))
+
+    @action(detail=True)
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != "done":
+            raise Http404
+        return FileResponse(
+            job.file.open("rb"),
+            as_attachment=True,
+            filename=f"habits.{job.file_format}.gz",
+            content_type="application/gzip",
+        )
+
+
+class ImportJobViewSet(
+    mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+):
+    """
+    Uploads of habit history files (multipart `file`, optional `file_format`). Files up to
+    HABIT_IMPORT_INLINE_MAX_BYTES are imported within the request; larger ones are imported in
+    the background and their progress is polled from the job.
+    """
+
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ("-created_at", "-id")
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(user_id=self.request.user.id)
+
+    def perform_create(self, serializer):
+        job = serializer.save(user_id=self.request.user.id)
+        if job.file.size <= settings.HABIT_IMPORT_INLINE_MAX_BYTES:
+            import_habit_file(job.id)
+            job.refresh_from_db()
+        else:
+            transaction.on_commit(partial(import_habit_file.delay, job.id))
@@ -0,0 +1,27 @@
+#!/bin/sh
+# Starts the WSGI or ASGI application on a port, e.g. `sh serve.sh asgi 8001`.
+# SERVER_MODE=dev (default) runs the single-process development server (runserver or uvicorn),
+# SERVER_MODE=production runs gunicorn with sync or uvicorn workers, configured in gunicorn.conf.py.
+set -e
+
+interface=${1:-wsgi}
+port=${2:-8000}
+
+# Статику, яку роздає nginx, збирає лише сервіс web
+if [ "$interface" = wsgi ]; then
+    python manage.py collectstatic --noinput --verbosity 0
+fi
+
+case "${SERVER_MODE:-dev}:$interface" in
+    dev:wsgi)
+        exec python manage.py runserver "0.0.0.0:$port" ;;
+    dev:asgi)
+        exec uvicorn habit_tracker.asgi:application --host 0.0.0.0 --port "$port" ;;
+    production:wsgi)
+        exec gunicorn habit_tracker.wsgi:application --bind "0.0.0.0:$port" ;;
+    production:asgi)
+        exec gunicorn habit_tracker.asgi:application --bind "0.0.0.0:$port" --worker-class uvicorn_worker.UvicornWorker ;;
+    *)
+        echo "Unknown SERVER_MODE \"$SERVER_MODE\" or interface \"$interface\"" >&2
+        exit 1 ;;
+esac
@@ -0,0 +1,160 @@
+"""
+Stateless JWT authentication.
+
+Access tokens carry the user's id, username and is_active (see UserRefreshToken), and
+request.user is a StatelessUser built from those claims, so authenticating a request does not
+query the database. Views filter by request.user.id; the few that need the User row itself (its
+profile, email, ...) get it through StatelessUser.user, which is cached for USER_CACHE_TIMEOUT
+seconds and dropped whenever the user or their profile is saved.
+
+Claims are a snapshot taken at login: a deactivated user keeps access until their access token
+expires, as refreshing checks the account again. A deleted user loses it at once: deleting
+leaves a tombstone in the cache for the lifetime of access tokens, which authentication checks.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+
+def user_cache_key(user_id):
+    return f"users:user:{user_id}"
+
+
+def get_cached_user(user_id):
+    """The User with their profile, from the cache when it was loaded in the last USER_CACHE_TIMEOUT seconds."""
+    user = cache.get(user_cache_key(user_id))
+    if user is None:
+        try:
+            user = User.objects.select_related("profile").get(pk=user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        cache.set(user_cache_key(user_id), user, timeout=settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+async def aget_cached_user(user_id):
+    user = await cache.aget(user_cache_key(user_id))
+    if user is None:
+        try:
+            user = await User.objects.select_related("profile").aget(pk=user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        await cache.aset(user_cache_key(user_id), user, timeout=settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def forget_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def deleted_user_key(user_id):
+    return f"users:deleted:{user_id}"
+
+
+def forget_deleted_user(user_id):
+    """Rejects the access tokens of a deleted user, which would otherwise stay valid until they expire."""
+    cache.set(deleted_user_key(user_id), True, timeout=api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    forget_cached_user(user_id)
+
+
+class UserRefreshToken(RefreshToken):
+    """RefreshToken with the claims StatelessUser is built from; access tokens copy them."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token["username"] = user.get_username()
+        token["is_active"] = user.is_active
+        return token
+
+
+class StatelessUser(TokenUser):
+    """
+    request.user of StatelessJWTAuthentication. id, username and is_active come from the
+    token; anything else is read from the cached User row, loaded on first use.
+    """
+
+    @cached_property
+    def is_active(self):
+        # Токени без цього claim видано до stateless-режиму, їх перевіряємо за базою
+        return self.token.get("is_active", False)
+
+    @cached_property
+    def user(self):
+        return get_cached_user(self.id)
+
+    async def aget_user(self):
+        """Loads `user` in async code, where the sync ORM cannot be used."""
+        if "user" not in self.__dict__:
+            self.__dict__["user"] = await aget_cached_user(self.id)
+        return self.user
+
+    @property
+    def email(self):
+        return self.user.email
+
+    @property
+    def profile(self):
+        return self.user.profile
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Authenticates by the token alone. Tokens issued while the account was inactive (the
+    ones returned on registration) are checked against the cached user instead, so they
+    start working once the email is verified, as they did with JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        user = self.build_user(validated_token)
+        self.check_exists(cache.get(deleted_user_key(user.id)))
+        if not user.is_active:
+            user.is_active = user.user.is_active
+        return self.check_active(user)
+
+    def build_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return StatelessUser(validated_token)
+
+    def check_exists(self, deleted):
+        if deleted:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+    def check_active(self, user):
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+
+class AsyncJWTAuthentication(StatelessJWTAuthentication):
+    """StatelessJWTAuthentication for async views; the cache and database are awaited."""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user = self.build_user(validated_token)
+        self.check_exists(await cache.aget(deleted_user_key(user.id)))
+        if not user.is_active:
+            user.is_active = (await user.aget_user()).is_active
+        return self.check_active(user)
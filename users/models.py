@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.db import models
+
+
+class Profile(models.Model):
+    """User settings that do not belong to the auth user model."""
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="profile")
+    # Назва часового поясу IANA, в якому користувач задає час нагадувань
+    timezone = models.CharField(max_length=64, default=settings.TIME_ZONE)
+
+    def __str__(self):
+        return f"{self.user} ({self.timezone})"
@@ -1,18 +1,41 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from .authentication import UserRefreshToken
+from .models import Profile
+from .utils import validate_timezone
 
 User = get_user_model()
 
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
+    timezone = serializers.CharField(write_only=True, required=False, validators=[validate_timezone])
 
     class Meta:
         model = User
-        fields = ("username", "email", "password")
+        fields = ("username", "email", "password", "timezone")
 
     def create(self, validated_data):
+        time_zone = validated_data.pop("timezone", None)
         user = User.objects.create_user(**validated_data)
         user.is_active = False
         user.save()
+        if time_zone:
+            Profile.objects.filter(user=user).update(timezone=time_zone)
         return user
+
+
+class ProfileSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source="user.username", read_only=True)
+    email = serializers.EmailField(source="user.email", read_only=True)
+    timezone = serializers.CharField(validators=[validate_timezone])
+
+    class Meta:
+        model = Profile
+        fields = ("username", "email", "timezone")
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = UserRefreshToken
@@ -0,0 +1,28 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_cached_user, forget_deleted_user
+from .models import Profile
+
+
+@receiver(post_save, sender=get_user_model())
+def create_profile(sender, instance, created, **kwargs):
+    if created:
+        Profile.objects.create(user=instance)
+    else:
+        forget_cached_user(instance.id)
+
+
+@receiver(post_save, sender=Profile)
+def profile_save(sender, instance, **kwargs):
+    forget_cached_user(instance.user_id)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_delete(sender, instance, **kwargs):
+    # Якщо видалення відкотиться, токени мають працювати далі
+    transaction.on_commit(partial(forget_deleted_user, instance.id))
@@ -1,7 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import get_cached_user
 
 User = get_user_model()
 
@@ -56,3 +60,92 @@ class AuthTests(APITestCase):
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
         response = self.client.get(protected_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ProfileTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="testuser@example.com", password="pass12345")
+        self.client.force_authenticate(self.user)
+        self.profile_url = reverse("profile")
+
+    def test_profile_created_with_project_timezone(self):
+        response = self.client.get(self.profile_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(), {"username": "testuser", "email": "testuser@example.com", "timezone": "Europe/Kyiv"}
+        )
+
+    def test_register_with_timezone(self):
+        data = {
+            "username": "newuser",
+            "email": "new@example.com",
+            "password": "strongpassword1",
+            "timezone": "Asia/Tokyo",
+        }
+        response = self.client.post(reverse("register"), data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(User.objects.get(username="newuser").profile.timezone, "Asia/Tokyo")
+
+    def test_update_timezone(self):
+        response = self.client.patch(self.profile_url, {"timezone": "America/New_York"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.timezone, "America/New_York")
+
+    def test_unknown_timezone_rejected(self):
+        response = self.client.patch(self.profile_url, {"timezone": "Mars/Olympus"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("timezone", response.json())
+
+
+class StatelessAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", email="testuser@example.com", password="pass12345")
+
+    def login(self, username="testuser", password="pass12345"):
+        response = self.client.post(reverse("token_obtain_pair"), {"username": username, "password": password})
+        return response.json()["access"]
+
+    def test_token_claims_replace_the_user_query(self):
+        access = self.login()
+        self.assertEqual(AccessToken(access)["username"], "testuser")
+        self.assertTrue(AccessToken(access)["is_active"])
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("habit-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_registration_token_works_after_activation(self):
+        data = {"username": "newuser", "email": "new@example.com", "password": "strongpassword1"}
+        access = self.client.post(reverse("register"), data, format="json").json()["access"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(self.client.get(reverse("habit-list")).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        user = User.objects.get(username="newuser")
+        user.is_active = True
+        user.save()
+        self.assertEqual(self.client.get(reverse("habit-list")).status_code, status.HTTP_200_OK)
+
+    def test_cached_user_follows_profile_changes(self):
+        self.assertEqual(get_cached_user(self.user.id).profile.timezone, "Europe/Kyiv")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.login()}")
+        self.client.patch(reverse("profile"), {"timezone": "Asia/Tokyo"}, format="json")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_cached_user(self.user.id).profile.timezone, "Asia/Tokyo")
+
+    def test_deleted_user_token_is_rejected(self):
+        # Після відкату транзакції тесту id видаленого користувача дістанеться наступному
+        self.addCleanup(cache.clear)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.login()}")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        for url in (reverse("habit-list"), reverse("async-habit-list")):
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+            self.assertEqual(response.json()["code"], "user_not_found")
+        response = self.client.post(reverse("habit-list"), {"name": "Read"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
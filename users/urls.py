@@ -1,8 +1,9 @@
 from django.urls import path
 
-from .views import RegisterView, VerifyEmailView
+from .views import ProfileView, RegisterView, VerifyEmailView
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
+    path("profile/", ProfileView.as_view(), name="profile"),
     path("verify-email/<uidb64>/<token>/", VerifyEmailView.as_view(), name="verify-email"),
 ]
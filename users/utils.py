@@ -1,8 +1,14 @@
+from functools import cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ObjectDoesNotExist
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
+from rest_framework import serializers
 
 
 def generate_email_verification_token(user):
@@ -13,3 +19,36 @@ def generate_email_verification_token(user):
     full_url = f"{settings.BASE_URL}{verify_url}"
 
     return full_url
+
+
+@cache
+def timezone_names():
+    """IANA time zone names known to the system; scanning tzdata is slow, so it is done once."""
+    return frozenset(available_timezones())
+
+
+def validate_timezone(value):
+    if value not in timezone_names():
+        raise serializers.ValidationError("Невідомий часовий пояс.")
+    return value
+
+
+def get_timezone(name=None):
+    """ZoneInfo for an IANA name, falling back to the project time zone when it is empty or unknown."""
+    try:
+        return ZoneInfo(name or settings.TIME_ZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(settings.TIME_ZONE)
+
+
+def get_user_timezone(user):
+    """The time zone the user's reminder times are given in."""
+    try:
+        return get_timezone(user.profile.timezone)
+    except ObjectDoesNotExist:
+        return get_timezone()
+
+
+def user_localdate(user):
+    """Today's date in the user's time zone."""
+    return timezone.localtime(timezone=get_user_timezone(user)).date()
@@ -4,9 +4,10 @@ from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode
 from rest_framework import generics, permissions, status, views
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from .serializers import RegisterSerializer
+from .authentication import UserRefreshToken
+from .models import Profile
+from .serializers import ProfileSerializer, RegisterSerializer
 from .tasks import send_email_verification
 from .utils import generate_email_verification_token
 
@@ -26,7 +27,7 @@ class RegisterView(generics.CreateAPIView):
 
         send_email_verification.delay(user.email, verification_path)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         return Response(
             {
                 "user": serializer.data,
@@ -38,6 +39,15 @@ class RegisterView(generics.CreateAPIView):
         )
 
 
+class ProfileView(generics.RetrieveUpdateAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = ProfileSerializer
+
+    def get_object(self):
+        profile, _ = Profile.objects.select_related("user").get_or_create(user_id=self.request.user.id)
+        return profile
+
+
 class VerifyEmailView(views.APIView):
     permission_classes = (permissions.AllowAny,)
 